@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class DeliveryConfig(AppConfig):
     name = 'delivery'
+
+    def ready(self):
+        from . import signals
+        signals.connect()
@@ -0,0 +1,308 @@
+import datetime
+import math
+import platform
+import random
+import time
+import tracemalloc
+
+import numpy
+from django.db import transaction
+
+from meal.models import (
+    Component, Component_ingredient, Incompatibility, Ingredient, Menu,
+    Menu_component, Restricted_item, COMPONENT_GROUP_CHOICES,
+    COMPONENT_GROUP_CHOICES_MAIN_DISH)
+from member.models import (
+    Client, Client_avoid_component, Client_avoid_ingredient, Client_option,
+    Member, Option, Restriction, Route)
+from order.models import Order, Order_item
+from . import tsp
+from .routing import SANTROPOL
+
+# Instance sizes and layouts of the default benchmark
+SIZES = (20, 50, 100, 200)
+
+# Default wall-clock budget in seconds of each solve, so that the
+#   default benchmark finishes in about a minute
+TIME_LIMIT = 2.0
+
+LAYOUT_UNIFORM = 'uniform'
+LAYOUT_CLUSTERED = 'clustered'
+
+LAYOUTS = (
+    LAYOUT_UNIFORM,
+    LAYOUT_CLUSTERED,
+)
+
+# Radius in meters of the area served around Santropol
+SERVICE_RADIUS = 8000
+# Standard deviation in meters of the stops around a cluster center
+CLUSTER_SPREAD = 400
+
+# The reference solver takes minutes above this number of stops
+REFERENCE_SOLVER_MAX_SIZE = 60
+
+# Day of the synthetic kitchen orders, far from any real order
+KITCHEN_DAY = datetime.date(2099, 1, 5)
+
+
+def make_instance(size, layout=LAYOUT_UNIFORM, seed=0):
+    """Generates a reproducible delivery tour around Santropol.
+
+    Args:
+        size: Number of stops.
+        layout: One of LAYOUTS. Uniform stops are spread evenly over
+            the served area. Clustered stops are grouped around a few
+            centers, like the buildings and neighborhoods where most
+            clients live.
+        seed: Seed of the random generator.
+
+    Returns:
+        List of tsp.Node, the first one being the depot.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError("Unknown layout: {}".format(layout))
+    rng = random.Random(seed)
+    depot = tsp.Node(None, *SANTROPOL)
+    # meters per degree around the depot
+    meters_latitude = math.radians(1) * tsp.EARTH_RADIUS
+    meters_longitude = meters_latitude * math.cos(math.radians(SANTROPOL[0]))
+
+    def point(radius, angle):
+        return (SANTROPOL[0] + radius * math.sin(angle) / meters_latitude,
+                SANTROPOL[1] + radius * math.cos(angle) / meters_longitude)
+
+    nodes = [depot]
+    if layout == LAYOUT_UNIFORM:
+        for i in range(size):
+            # uniform over the disc
+            latitude, longitude = point(
+                SERVICE_RADIUS * math.sqrt(rng.random()),
+                rng.uniform(0, 2 * math.pi))
+            nodes.append(tsp.Node(i, latitude, longitude))
+    else:
+        centers = [point(SERVICE_RADIUS * math.sqrt(rng.random()),
+                         rng.uniform(0, 2 * math.pi))
+                   for k in range(max(2, int(math.sqrt(size) / 2)))]
+        for i in range(size):
+            latitude, longitude = rng.choice(centers)
+            nodes.append(tsp.Node(
+                i,
+                latitude + rng.gauss(0, CLUSTER_SPREAD) / meters_latitude,
+                longitude + rng.gauss(0, CLUSTER_SPREAD) / meters_longitude))
+    return nodes
+
+
+def run(sizes=SIZES, layouts=LAYOUTS, solvers=None, seeds=(0,),
+        time_limit=TIME_LIMIT, metric=tsp.METRIC_HAVERSINE):
+    """Solves synthetic instances with each solver.
+
+    Args:
+        sizes: Numbers of stops of the instances.
+        layouts: Layouts of the instances, see make_instance().
+        solvers: Solvers to compare (default: tsp.SOLVERS). The
+            reference solver is skipped on instances larger than
+            REFERENCE_SOLVER_MAX_SIZE.
+        seeds: One instance is generated for each seed.
+        time_limit: Wall-clock budget in seconds of each solve, None
+            for none. The reference solver has no budget.
+        metric: Metric of the solvers other than the reference one,
+            which only supports tsp.METRIC_SQUARED_EUCLIDEAN.
+
+    Returns:
+        A dictionary that can be serialized to JSON, with the
+        environment, one result per instance and solver (solve time
+        in seconds, tour length in meters measured great-circle for
+        all the solvers, number of improving moves) and a summary per
+        solver, see summarize().
+    """
+    if solvers is None:
+        solvers = tsp.SOLVERS
+    results = []
+    for layout in layouts:
+        for size in sizes:
+            for seed in seeds:
+                tour = make_instance(size, layout, seed)
+                meters = tsp.distance_matrix(
+                    tour, tsp.METRIC_HAVERSINE).tolist()
+                index = {id(node): i for i, node in enumerate(tour)}
+                initial = tsp.tour_length(list(range(len(tour))), meters)
+                for solver in solvers:
+                    if solver == tsp.SOLVER_TWO_OPT:
+                        if size > REFERENCE_SOLVER_MAX_SIZE:
+                            continue
+                        kwargs = {}
+                    else:
+                        kwargs = {'time_limit': time_limit,
+                                  'metric': metric}
+                    start = time.perf_counter()
+                    solution = tsp.optimize(tour, solver, **kwargs)
+                    seconds = time.perf_counter() - start
+                    length = tsp.tour_length(
+                        [index[id(node)] for node in solution.tour], meters)
+                    results.append({
+                        'layout': layout,
+                        'size': size,
+                        'seed': seed,
+                        'solver': solver,
+                        'seconds': round(seconds, 6),
+                        'length': round(length, 1),
+                        'initial_length': round(initial, 1),
+                        'iterations': solution.iterations,
+                    })
+    report = {
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'machine': platform.machine(),
+        'time_limit': time_limit,
+        'metric': tsp.metric_name(metric),
+        'results': results,
+    }
+    report['summary'] = summarize(report)
+    return report
+
+
+def summarize(report):
+    """Returns, for each solver, its total solve time in seconds and
+    how much longer its tours are than the best tour found for each
+    instance, on average (0.01 for 1%)."""
+    best = {}
+    for result in report['results']:
+        instance = (result['layout'], result['size'], result['seed'])
+        best[instance] = min(best.get(instance, result['length']),
+                             result['length'])
+    summary = {}
+    for result in report['results']:
+        instance = (result['layout'], result['size'], result['seed'])
+        solver = summary.setdefault(
+            result['solver'], {'instances': 0, 'seconds': 0, 'gap': 0})
+        solver['instances'] += 1
+        solver['seconds'] += result['seconds']
+        if best[instance]:
+            solver['gap'] += result['length'] / best[instance] - 1
+    for solver in summary.values():
+        solver['seconds'] = round(solver['seconds'], 6)
+        solver['gap'] = round(solver['gap'] / solver['instances'], 6)
+    return summary
+
+
+def make_kitchen_day(num_orders, seed=0, delivery_date=KITCHEN_DAY):
+    """Creates the menu and the orders of a synthetic delivery day.
+
+    Each client orders a main dish and two other components, and some
+    of them avoid ingredients or components, have restrictions or
+    need a food preparation, so that the kitchen count finds clashes.
+    """
+    rng = random.Random(seed)
+    routes = [Route.objects.create(name='Benchmark {}'.format(k))
+              for k in range(10)]
+    ingredients = [Ingredient.objects.create(
+        name='Benchmark ingredient {}'.format(k)) for k in range(40)]
+    components = [Component.objects.create(
+        name='Benchmark {}'.format(group), component_group=group)
+        for group, label in COMPONENT_GROUP_CHOICES]
+    menu = Menu.objects.create(date=delivery_date)
+    Menu_component.objects.bulk_create(
+        Menu_component(menu=menu, component=component)
+        for component in components)
+    Component_ingredient.objects.bulk_create(
+        Component_ingredient(component=component, ingredient=ingredient,
+                             date=delivery_date)
+        for component in components
+        for ingredient in rng.sample(ingredients, 5))
+    restricted_items = [Restricted_item.objects.create(
+        name='Benchmark restriction {}'.format(k)) for k in range(8)]
+    Incompatibility.objects.bulk_create(
+        Incompatibility(restricted_item=restricted_item,
+                        ingredient=ingredient)
+        for restricted_item in restricted_items
+        for ingredient in rng.sample(ingredients, 3))
+    options = [Option.objects.create(
+        name='Benchmark preparation {}'.format(k),
+        option_group='preparation') for k in range(3)]
+
+    items = []
+    avoid_ingredients = []
+    avoid_components = []
+    restrictions = []
+    client_options = []
+    for k in range(num_orders):
+        member = Member.objects.create(
+            firstname='Benchmark', lastname='Client {}'.format(k))
+        client = Client.objects.create(
+            member=member, billing_member=member, status=Client.ACTIVE,
+            route=rng.choice(routes))
+        order = Order.objects.create(
+            client=client, creation_date=delivery_date,
+            delivery_date=delivery_date, status='O')
+        groups = [COMPONENT_GROUP_CHOICES_MAIN_DISH] + rng.sample(
+            [group for group, label in COMPONENT_GROUP_CHOICES[1:]], 2)
+        for group in groups:
+            items.append(Order_item(
+                order=order, component_group=group, price=5,
+                billable_flag=True, size=rng.choice('RL'),
+                order_item_type='B component', total_quantity=1))
+        for ingredient in rng.sample(ingredients, rng.randint(0, 3)):
+            avoid_ingredients.append(Client_avoid_ingredient(
+                client=client, ingredient=ingredient))
+        if rng.random() < 0.2:
+            avoid_components.append(Client_avoid_component(
+                client=client, component=rng.choice(components)))
+        for restricted_item in rng.sample(restricted_items,
+                                          rng.randint(0, 2)):
+            restrictions.append(Restriction(
+                client=client, restricted_item=restricted_item))
+        if rng.random() < 0.3:
+            client_options.append(Client_option(
+                client=client, option=rng.choice(options)))
+    Order_item.objects.bulk_create(items)
+    Client_avoid_ingredient.objects.bulk_create(avoid_ingredients)
+    Client_avoid_component.objects.bulk_create(avoid_components)
+    Restriction.objects.bulk_create(restrictions)
+    Client_option.objects.bulk_create(client_options)
+    return delivery_date
+
+
+def run_kitchen(num_orders=1000, seed=0, repeat=3):
+    """Measures Order.get_kitchen_items() on a synthetic delivery day.
+
+    The day is created by make_kitchen_day() in a transaction that is
+    rolled back, so the benchmark can run on any database.
+
+    Returns:
+        A dictionary that can be serialized to JSON, with the best and
+        all the timings in seconds of the kitchen count, and its memory
+        use in bytes: the peak while it is built and what the kitchen
+        list keeps, in total and per client. Memory is traced in a
+        separate run, since tracing slows Python down.
+    """
+    timings = []
+    with transaction.atomic():
+        delivery_date = make_kitchen_day(num_orders, seed)
+        for k in range(repeat):
+            start = time.perf_counter()
+            kitchen_list = Order.get_kitchen_items(delivery_date)
+            timings.append(round(time.perf_counter() - start, 6))
+        del kitchen_list
+        tracemalloc.start()
+        try:
+            kitchen_list = Order.get_kitchen_items(delivery_date)
+            retained, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        transaction.set_rollback(True)
+    return {
+        'python': platform.python_version(),
+        'orders': num_orders,
+        'clients': len(kitchen_list),
+        'clashes': sum(1 for item in kitchen_list.values()
+                       if item.incompatible_ingredients or
+                       item.incompatible_components),
+        'seconds': min(timings),
+        'timings': timings,
+        'memory': {
+            'peak': peak,
+            'retained': retained,
+            'per_client': retained // max(1, len(kitchen_list)),
+        },
+    }
@@ -0,0 +1,187 @@
+import collections
+import datetime
+import json
+
+from django.db.models import Q
+
+from meal.models import (
+    Component_ingredient, Menu_component,
+    COMPONENT_GROUP_CHOICES, COMPONENT_GROUP_CHOICES_MAIN_DISH)
+from member.models import (
+    Client, ClientScheduledStatus, Client_option, MealSchedule)
+from order.models import SIZE_CHOICES_LARGE
+from . import restrictions
+
+# Longest forecast in days
+MAX_DAYS = 28
+
+# Projected production of a delivery date
+ForecastDay = collections.namedtuple(
+    'ForecastDay',
+    ['date',
+     'clients',  # number of clients delivered
+     'lines',  # list of ForecastLine, one per component group
+     'clashes'])  # number of clients with a clash, None without menu
+
+ForecastLine = collections.namedtuple(
+    'ForecastLine',
+    ['component_group',
+     'rqty',
+     'lqty'])
+
+
+def forecast(start_date, num_days):
+    """Projects the kitchen production of the coming delivery dates.
+
+    The meals of each day are those that would be ordered by the
+    clients active on that day, from their meal defaults
+    (Client.meal_default_week) on their delivery days
+    (Client.simple_meals_schedule, all the days with meals when not
+    set). The scheduled status changes not processed yet are applied
+    on their date, so that paused clients resume and stopping clients
+    stop in the forecast. Clashes are counted as in the kitchen count,
+    for the days whose menu is known, with the restrictions.get_index()
+    of the clients.
+
+    The data of all the days is loaded with a fixed number of queries,
+    whatever the number of days and clients.
+
+    Args:
+        start_date: First date of the forecast.
+        num_days: Number of days of the forecast.
+
+    Returns:
+        List of ForecastDay, one per date.
+    """
+    dates = [start_date + datetime.timedelta(days=k)
+             for k in range(num_days)]
+    if not dates:
+        return []
+
+    index = restrictions.get_index()
+    # date -> component group -> clashing rows of the index, for the
+    #   dates with a menu
+    group_clashes = {
+        delivery_date: {
+            component_group: index.clashing(ingredient_ids, component_ids)
+            for component_group, (ingredient_ids, component_ids) in
+            menu.items()}
+        for delivery_date, menu in day_menus(dates).items()}
+
+    clients_count = collections.Counter()
+    clashes = collections.Counter()
+    quantities = collections.defaultdict(collections.Counter)
+    for client_id, delivery_date, size, items in expected_meals(dates):
+        row = index.rows.get(client_id)
+        clients_count[delivery_date] += 1
+        for component_group, quantity in items:
+            large = (component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH and
+                     size == SIZE_CHOICES_LARGE)
+            quantities[delivery_date][(component_group, large)] += quantity
+        if row is not None and delivery_date in group_clashes and any(
+                group_clashes[delivery_date][component_group][row]
+                for component_group, quantity in items
+                if component_group in group_clashes[delivery_date]):
+            clashes[delivery_date] += 1
+
+    return [
+        ForecastDay(
+            date=delivery_date,
+            clients=clients_count[delivery_date],
+            lines=[ForecastLine(
+                component_group,
+                rqty=quantities[delivery_date][(component_group, False)],
+                lqty=quantities[delivery_date][(component_group, True)])
+                for component_group, label in COMPONENT_GROUP_CHOICES],
+            clashes=clashes[delivery_date] if delivery_date in group_clashes
+            else None)
+        for delivery_date in dates]
+
+
+def expected_meals(dates):
+    """Yields the meals the clients would order on some dates.
+
+    The clients active on each date, after applying the scheduled
+    status changes not processed yet, are delivered their meal
+    defaults on their delivery days, see forecast(). The data is
+    loaded with 3 queries.
+
+    Args:
+        dates: Sorted list of delivery dates.
+
+    Yields:
+        (client id, date, size, list of (component group, quantity))
+    """
+    pending = ClientScheduledStatus.objects.filter(
+        operation_status=ClientScheduledStatus.TOBEPROCESSED,
+        change_date__lte=dates[-1])
+    clients = Client.objects.filter(
+        Q(status=Client.ACTIVE) |
+        Q(id__in=pending.values('client_id')))
+
+    # client id -> list of (change date, status from, status to)
+    changes = collections.defaultdict(list)
+    for client_id, change_date, status_from, status_to in pending.order_by(
+            'change_date', 'id').values_list(
+                'client_id', 'change_date', 'status_from', 'status_to'):
+        changes[client_id].append((change_date, status_from, status_to))
+
+    # client id -> list of delivery days
+    schedules = {
+        client_id: json.loads(value) for client_id, value in
+        Client_option.objects.filter(
+            client__in=clients, option__name='meals_schedule'
+        ).values_list('client_id', 'value')}
+
+    for client_id, status, meal_default_week in clients.values_list(
+            'id', 'status', 'meal_default_week'):
+        week = MealSchedule(
+            meal_default_week, schedules.get(client_id)).week()
+        if not any(week):
+            continue
+        for delivery_date, day_status in zip(
+                dates, client_statuses(status, changes[client_id], dates)):
+            meals = week[delivery_date.weekday()]
+            if day_status == Client.ACTIVE and meals:
+                yield (client_id, delivery_date) + meals
+
+
+def client_statuses(status, changes, dates):
+    # Status of a client on each date, applying its scheduled changes
+    #   like ClientScheduledStatus.process(): a change only applies
+    #   when the client has the status it changes from.
+    changes = iter(changes)
+    change = next(changes, None)
+    for delivery_date in dates:
+        while change is not None and change[0] <= delivery_date:
+            change_date, status_from, status_to = change
+            if status == status_from:
+                status = status_to
+            change = next(changes, None)
+        yield status
+
+
+def day_menus(dates):
+    """Returns the dictionary of date: {component group: (ids of the
+    ingredients, ids of the menu components)} of the dates that have a
+    menu."""
+    menus = {}
+    # date -> component id -> component group, of the menu components
+    menu_groups = collections.defaultdict(dict)
+    for delivery_date, component_id, component_group in \
+            Menu_component.objects.filter(
+                menu__date__in=dates
+            ).values_list('menu__date', 'component_id',
+                          'component__component_group'):
+        menu = menus.setdefault(delivery_date, {})
+        menu.setdefault(component_group, (set(), set()))[1].add(
+            component_id)
+        menu_groups[delivery_date][component_id] = component_group
+    for delivery_date, component_id, ingredient_id in \
+            Component_ingredient.objects.filter(
+                date__in=dates
+            ).values_list('date', 'component_id', 'ingredient_id'):
+        component_group = menu_groups[delivery_date].get(component_id)
+        if component_group is not None:
+            menus[delivery_date][component_group][0].add(ingredient_id)
+    return menus
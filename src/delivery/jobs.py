@@ -0,0 +1,214 @@
+import datetime
+import threading
+import time
+import traceback
+
+from django.conf import settings
+from django.contrib.admin.models import LogEntry, ADDITION
+from django.db import close_old_connections, connections
+from django.db.models import Q
+from django.utils import timezone
+
+from member.apps import db_sa_session
+from member.models import Route
+from order.generation import refresh_orders
+from order.models import Order
+from .models import Job
+from . import meal_labels, routing
+
+# Seconds between two looks at the queue of an idle runner
+POLL_INTERVAL = 2.0
+
+# Seconds between two heartbeats of the runner of a job
+HEARTBEAT_INTERVAL = 30
+
+# Seconds without heartbeat after which a running job is taken for dead,
+#   its runner having been stopped
+HEARTBEAT_TIMEOUT = 300
+
+
+def enqueue(kind, **arguments):
+    """Queues a job for the runjobs command.
+
+    A job is not queued again while the same job, with the same
+    arguments, is waiting or running. With the DELIVERY_JOBS_EAGER
+    setting, the job is run at once in the current process instead.
+
+    Args:
+        kind: One of Job.KINDS.
+        arguments: Keyword arguments of the job, serializable to JSON.
+
+    Returns:
+        The Job.
+    """
+    if kind not in HANDLERS:
+        raise ValueError("Unknown job: {}".format(kind))
+    for job in Job.objects.filter(
+            kind=kind, status__in=(Job.QUEUED, Job.RUNNING)):
+        if job.arguments == arguments:
+            return job
+    job = Job.objects.create(kind=kind, arguments=arguments)
+    if getattr(settings, 'DELIVERY_JOBS_EAGER', False):
+        if claim(job):
+            run(job)
+    return job
+
+
+def claim(job):
+    # marks a queued job as running, unless another runner took it
+    started_at = timezone.now()
+    if Job.objects.filter(id=job.id, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=started_at,
+            heartbeat_at=started_at) != 1:
+        return False
+    job.status = Job.RUNNING
+    job.started_at = job.heartbeat_at = started_at
+    return True
+
+
+def run(job, heartbeat_interval=HEARTBEAT_INTERVAL):
+    """Runs a claimed job and records its result or its error.
+
+    While the job runs, a thread records a heartbeat every
+    heartbeat_interval seconds, so that fail_stale() can tell a long
+    job from one whose runner was stopped.
+    """
+    stopped = threading.Event()
+    heartbeat = threading.Thread(
+        target=heartbeat_thread, args=(job.id, stopped, heartbeat_interval),
+        daemon=True)
+    heartbeat.start()
+    try:
+        job.result = HANDLERS[job.kind](job, **job.arguments)
+        job.status = Job.DONE
+    except Exception:
+        job.error = traceback.format_exc()
+        job.status = Job.FAILED
+    finally:
+        stopped.set()
+        heartbeat.join()
+    job.finished_at = timezone.now()
+    Job.objects.filter(id=job.id).update(
+        status=job.status, result=job.result, error=job.error,
+        finished_at=job.finished_at)
+    return job
+
+
+def run_pending(max_jobs=None):
+    """Runs the queued jobs, oldest first, until there are none left.
+
+    Several runners can share the queue: each job is claimed by one of
+    them only. The jobs left running by a runner that was stopped are
+    failed first, see fail_stale().
+
+    Returns:
+        Number of jobs run.
+    """
+    fail_stale()
+    count = 0
+    while max_jobs is None or count < max_jobs:
+        job = Job.objects.filter(status=Job.QUEUED).order_by('id').first()
+        if job is None:
+            break
+        if claim(job):
+            run(job)
+            count += 1
+    return count
+
+
+def beat(job_id, stopped, interval):
+    # records the heartbeat of a running job every interval seconds,
+    #   until stopped is set
+    while not stopped.wait(interval):
+        Job.objects.filter(id=job_id, status=Job.RUNNING).update(
+            heartbeat_at=timezone.now())
+
+
+def heartbeat_thread(job_id, stopped, interval):
+    # the heartbeat thread of run(), with its own database connection
+    try:
+        beat(job_id, stopped, interval)
+    finally:
+        connections.close_all()
+
+
+def fail_stale(timeout=HEARTBEAT_TIMEOUT):
+    """Fails the running jobs without heartbeat for more than timeout
+    seconds, their runner having been stopped, so that the pages stop
+    following them.
+
+    Returns:
+        Number of jobs failed.
+    """
+    now = timezone.now()
+    since = now - datetime.timedelta(seconds=timeout)
+    return Job.objects.filter(
+        Q(heartbeat_at__lt=since) |
+        Q(heartbeat_at__isnull=True, started_at__lt=since),
+        status=Job.RUNNING,
+    ).update(status=Job.FAILED, finished_at=now,
+             error="The runner of the job stopped: no heartbeat for "
+                   "{} s.".format(timeout))
+
+
+def run_forever(poll_interval=POLL_INTERVAL):
+    # loop of the runjobs command
+    while True:
+        close_old_connections()
+        if not run_pending():
+            time.sleep(poll_interval)
+
+
+def parse_date(value):
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def refresh_orders_job(job, delivery_date, replace=False):
+    delivery_date = parse_date(delivery_date)
+    job.report(0, 1, "Refreshing the orders of {}".format(delivery_date))
+    deleted, created = refresh_orders(
+        datetime.date.today(), delivery_date, replace)
+    # logged once the orders are created, as the last generation
+    LogEntry.objects.log_action(
+        user_id=1, content_type_id=1,
+        object_id="", object_repr="Generation of order for " + str(
+            datetime.datetime.now().strftime('%Y-%m-%d %H:%M')),
+        action_flag=ADDITION,
+    )
+    job.report(1, 1, "{} orders created".format(created))
+    return {'deleted': deleted, 'created': created}
+
+
+def meal_labels_job(job, delivery_date):
+    delivery_date = parse_date(delivery_date)
+    job.report(0, 1, "Rendering the labels of {}".format(delivery_date))
+    kitchen_list = Order.get_kitchen_items(delivery_date)
+    db_sa_session.remove()
+    path = meal_labels.get_labels_file(delivery_date, kitchen_list)
+    count = meal_labels.count_labels(kitchen_list)
+    job.report(1, 1, "{} labels".format(count))
+    return {'labels': count, 'file': path}
+
+
+def optimize_routes_job(job, delivery_date, route_ids=None, workers=None,
+                        time_limit=None, metric=None):
+    delivery_date = parse_date(delivery_date)
+    routes = Route.objects.order_by('id')
+    if route_ids is not None:
+        routes = routes.filter(id__in=route_ids)
+    routes = list(routes)
+    job.report(0, len(routes),
+               "Optimizing the routes of {}".format(delivery_date))
+    route_tours = routing.optimize_routes(
+        delivery_date, routes, workers, time_limit,
+        metric or routing.distance_provider())
+    job.report(len(routes), len(routes),
+               "{} routes optimized".format(len(route_tours)))
+    return {'routes': [route_tour.route_id for route_tour in route_tours]}
+
+
+HANDLERS = {
+    Job.REFRESH_ORDERS: refresh_orders_job,
+    Job.MEAL_LABELS: meal_labels_job,
+    Job.OPTIMIZE_ROUTES: optimize_routes_job,
+}
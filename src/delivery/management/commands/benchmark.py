@@ -0,0 +1,93 @@
+import json
+
+from django.core.management.base import BaseCommand
+from delivery import benchmarks, tsp
+
+
+class Command(BaseCommand):
+    help = 'Measure the speed and quality of the route solvers, or the ' \
+        'speed of the kitchen count'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            choices=('routes', 'kitchen'),
+            default='routes',
+            help='What to measure (default: routes)',
+        )
+        parser.add_argument(
+            '--orders',
+            type=int,
+            default=1000,
+            help='With --target kitchen, number of orders of the day',
+        )
+        parser.add_argument(
+            '--sizes',
+            default=','.join(str(size) for size in benchmarks.SIZES),
+            help='Comma separated numbers of stops of the instances',
+        )
+        parser.add_argument(
+            '--layouts',
+            default=','.join(benchmarks.LAYOUTS),
+            help='Comma separated layouts of the instances, among: '
+                 '{}'.format(', '.join(benchmarks.LAYOUTS)),
+        )
+        parser.add_argument(
+            '--solvers',
+            default=','.join(tsp.SOLVERS),
+            help='Comma separated solvers, among: '
+                 '{}'.format(', '.join(tsp.SOLVERS)),
+        )
+        parser.add_argument(
+            '--seeds',
+            type=int,
+            default=1,
+            help='Number of instances of each size and layout',
+        )
+        parser.add_argument(
+            '--time_limit',
+            type=float,
+            default=benchmarks.TIME_LIMIT,
+            help='Seconds allowed for each solve, 0 for no limit '
+                 '(default: %(default)s)',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file instead of the '
+                 'standard output',
+        )
+
+    def handle(self, *args, **options):
+        if options['target'] == 'kitchen':
+            report = benchmarks.run_kitchen(options['orders'])
+            self.write_report(report, options['output'])
+            if options['output']:
+                self.stdout.write(
+                    "{} orders, {} clients in the kitchen count: "
+                    "{:.3f} s, {:.0f} KiB peak, {} bytes per client".format(
+                        report['orders'], report['clients'],
+                        report['seconds'], report['memory']['peak'] / 1024,
+                        report['memory']['per_client']))
+            return
+
+        report = benchmarks.run(
+            sizes=[int(size) for size in options['sizes'].split(',')],
+            layouts=options['layouts'].split(','),
+            solvers=options['solvers'].split(','),
+            seeds=range(options['seeds']),
+            time_limit=options['time_limit'] or None,
+        )
+        self.write_report(report, options['output'])
+        if options['output']:
+            for solver, summary in sorted(report['summary'].items()):
+                self.stdout.write(
+                    "{}: {} instances, {:.2f} s, {:.2%} above best".format(
+                        solver, summary['instances'], summary['seconds'],
+                        summary['gap']))
+
+    def write_report(self, report, output):
+        if output:
+            with open(output, 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+        else:
+            self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from member.models import Route
+from delivery import jobs, roads, routing, tsp
+from delivery.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Precompute the tours of the routes for a delivery date'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'delivery_date',
+            help='The date must be in the format YYYY-MM-DD',
+        )
+        parser.add_argument(
+            '--routes',
+            help='Comma separated ids of the routes to optimize '
+                 '(default: all routes)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of worker processes (default: one per CPU)',
+        )
+        parser.add_argument(
+            '--time_limit',
+            type=float,
+            default=10.0,
+            help='Seconds allowed for sequencing each route',
+        )
+        parser.add_argument(
+            '--metric',
+            choices=tsp.METRICS,
+            help='Distance between the stops (default: along the '
+                 'road network when one is configured, great-circle '
+                 'otherwise)',
+        )
+        parser.add_argument(
+            '--queue',
+            action='store_true',
+            help='Queue the optimization for the runjobs command instead '
+                 'of running it now',
+        )
+
+    def handle(self, *args, **options):
+        delivery_date = datetime.strptime(
+            options['delivery_date'], '%Y-%m-%d'
+        ).date()
+        routes = Route.objects.order_by('id')
+        if options['routes']:
+            routes = routes.filter(
+                id__in=[int(i) for i in options['routes'].split(',')])
+        routes = list(routes)
+        if not routes:
+            raise CommandError('No route available')
+
+        if options['queue']:
+            job = jobs.enqueue(
+                Job.OPTIMIZE_ROUTES,
+                delivery_date=delivery_date.isoformat(),
+                route_ids=[route.id for route in routes],
+                workers=options['workers'],
+                time_limit=options['time_limit'],
+                metric=options['metric'])
+            self.stdout.write(self.style.SUCCESS(str(job)))
+            return
+
+        metric = options['metric'] or routing.distance_provider()
+        route_tours = routing.optimize_routes(
+            delivery_date, routes, options['workers'],
+            options['time_limit'], metric)
+
+        for route_tour in route_tours:
+            if tsp.metric_name(metric) == roads.RoadNetworkProvider.name:
+                length = "{:.0f} min".format(route_tour.distance / 60)
+            else:
+                length = "{:.1f} km".format(route_tour.distance / 1000)
+            self.stdout.write(
+                "{}: {} stops, {}".format(
+                    route_tour.route.name,
+                    len(route_tour.client_id_sequence),
+                    length))
+        self.stdout.write(self.style.SUCCESS(
+            "{} route(s) optimized for {}".format(
+                len(route_tours), delivery_date)))
@@ -0,0 +1,83 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from member.models import Route
+from delivery import routing
+
+
+class Command(BaseCommand):
+    help = 'Propose how to split the orders of a day between the routes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'delivery_date',
+            help='The date must be in the format YYYY-MM-DD',
+        )
+        parser.add_argument(
+            '--capacity',
+            type=int,
+            help='Maximum number of items delivered by a route',
+        )
+        parser.add_argument(
+            '--routes',
+            help='Comma separated ids of the available routes '
+                 '(default: all routes)',
+        )
+        parser.add_argument(
+            '--time_limit',
+            type=float,
+            default=10.0,
+            help='Seconds allowed for sequencing the routes',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the proposal as JSON',
+        )
+
+    def handle(self, *args, **options):
+        delivery_date = datetime.strptime(
+            options['delivery_date'], '%Y-%m-%d'
+        ).date()
+        routes = Route.objects.order_by('id')
+        if options['routes']:
+            routes = routes.filter(
+                id__in=[int(i) for i in options['routes'].split(',')])
+        routes = list(routes)
+        if not routes:
+            raise CommandError('No route available')
+
+        proposal, unassigned = routing.plan_routes(
+            delivery_date, routes, options['capacity'],
+            options['time_limit'])
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'date': str(delivery_date),
+                'routes': [
+                    {'id': route.id,
+                     'name': route.name,
+                     'load': load,
+                     'distance': round(length),
+                     'clients': [stop['client_id'] for stop in stops]}
+                    for route, stops, load, length in proposal],
+                'unassigned': [stop['client_id'] for stop in unassigned],
+            }, indent=2))
+            return
+
+        for route, stops, load, length in proposal:
+            self.stdout.write(
+                "{}: {} stops, {} items, {:.1f} km".format(
+                    route.name, len(stops), load, length / 1000))
+            for stop in stops:
+                self.stdout.write("    {} {}, {}".format(
+                    stop['client__member__firstname'],
+                    stop['client__member__lastname'],
+                    stop['client__member__address__street']))
+        if unassigned:
+            self.stdout.write(self.style.WARNING(
+                "{} stop(s) could not be assigned: {}".format(
+                    len(unassigned),
+                    ", ".join(str(stop['client_id'])
+                              for stop in unassigned))))
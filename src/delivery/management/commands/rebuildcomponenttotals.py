@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from delivery.models import ComponentTotal
+
+
+class Command(BaseCommand):
+    help = 'Recompute the totals of the component groups ordered for ' \
+        'each route and size from the order items'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'delivery_dates',
+            nargs='*',
+            help='Dates to recompute, in the format YYYY-MM-DD '
+                 '(default: all the dates)',
+        )
+
+    def handle(self, *args, **options):
+        delivery_dates = [
+            datetime.strptime(delivery_date, '%Y-%m-%d').date()
+            for delivery_date in options['delivery_dates']] or None
+        count = ComponentTotal.objects.refresh(delivery_dates)
+        self.stdout.write(self.style.SUCCESS(
+            "{} component total(s) rebuilt".format(count)))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from delivery import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run the jobs queued by the pages: order refreshes, meal ' \
+        'labels and route optimizations'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the queued jobs and stop, instead of waiting for '
+                 'new ones',
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=jobs.POLL_INTERVAL,
+            help='Seconds between two looks at an empty queue',
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            count = jobs.run_pending()
+            self.stdout.write(self.style.SUCCESS(
+                "{} job(s) run".format(count)))
+        else:
+            jobs.run_forever(options['poll'])
@@ -0,0 +1,157 @@
+import glob
+import hashlib
+import os
+import tempfile
+import textwrap
+
+import labels  # package pylabels
+from django.conf import settings
+from reportlab.graphics import shapes
+
+from order.models import SIZE_CHOICES_LARGE
+
+
+def labels_hash(delivery_date, kitchen_list):
+    """Hash of everything printed on the labels of a date."""
+    data = [(obj.lastname, obj.firstname, obj.routename, obj.meal_qty,
+             obj.meal_size, obj.preparation, obj.incompatible_ingredients,
+             obj.other_ingredients, obj.restricted_items)
+            for obj in sorted_items(kitchen_list)]
+    return hashlib.sha1(
+        repr((delivery_date.isoformat(), data)).encode('utf-8')
+    ).hexdigest()
+
+
+def labels_path(delivery_date, digest):
+    """Path of the label file of a date for the given labels_hash."""
+    return os.path.join(
+        settings.MEAL_LABELS_DIR,
+        'labels-{}-{}.pdf'.format(delivery_date.isoformat(), digest))
+
+
+def count_labels(kitchen_list):
+    """Number of labels, one for each meal, without rendering them."""
+    return sum(obj.meal_qty for obj in kitchen_list.values())
+
+
+def sorted_items(kitchen_list):
+    # labels are printed by client name
+    return [obj for cid, obj in sorted(
+        kitchen_list.items(),
+        key=lambda item: (item[1].lastname + item[1].firstname, item[0]))]
+
+
+def get_labels_file(delivery_date, kitchen_list, render=True):
+    """Returns the path of the label file of a date, rendering it when
+    the labels changed since it was last rendered.
+
+    Files are named by the hash of the kitchen data, so an unchanged
+    kitchen count never renders its labels again and concurrent
+    requests never overwrite a file that is being read.
+
+    Args:
+        delivery_date: Date of the labels.
+        kitchen_list: See Order.get_kitchen_items.
+        render: Render the file when it does not exist. Otherwise the
+            file is left to a meal labels job, see delivery.jobs.
+
+    Returns:
+        The path of the file, which may not exist yet when not rendered
+        or when there are no labels.
+    """
+    path = labels_path(delivery_date,
+                       labels_hash(delivery_date, kitchen_list))
+    if render and not os.path.exists(path) and count_labels(kitchen_list):
+        render_labels(delivery_date, kitchen_list, path)
+    return path
+
+
+def render_labels(delivery_date, kitchen_list, path):
+    """Renders the labels into the file at path, replacing the older
+    label files of the date."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # write to a temporary file first, so that the file only appears
+    #   once complete
+    descriptor, temporary = tempfile.mkstemp(suffix='.pdf', dir=directory)
+    os.close(descriptor)
+    try:
+        kcr_make_labels(kitchen_list, temporary, delivery_date)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    for old_path in glob.glob(labels_path(delivery_date, '*')):
+        if old_path != path:
+            os.remove(old_path)
+
+
+def kcr_make_labels(kitchen_list, path, delivery_date):
+    # see https://github.com/bcbnz/pylabels
+
+    # dimensions are in millimeters; 1 inch = 25.4 mm
+    specs = labels.Specification(
+        sheet_width=8.5 * 25.4, sheet_height=11 * 25.4,
+        columns=2, rows=7,
+        label_width=4 * 25.4, label_height=1.33 * 25.4,
+        top_margin=20, bottom_margin=20,
+        corner_radius=2)
+
+    def draw_label(label, width, height, data):
+        # callback function
+        obj, j, qty = data
+        label.add(shapes.String(2, height * 0.8,
+                                obj.lastname + ", " + obj.firstname[0:2] + ".",
+                                fontName="Helvetica-Bold",
+                                fontSize=12))
+        label.add(shapes.String(width-2, height * 0.8,
+                                "{}".format(delivery_date.
+                                            strftime("%a, %b-%d")),
+                                fontName="Helvetica",
+                                fontSize=10,
+                                textAnchor="end"))
+        if obj.meal_size == SIZE_CHOICES_LARGE:
+            label.add(shapes.String(2, height * 0.65,
+                                    "LARGE",
+                                    fontName="Helvetica",
+                                    fontSize=10))
+        if qty > 1:
+            label.add(shapes.String(width * 0.5, height * 0.65,
+                                    "(" + str(j) + " of " + str(qty) + ")",
+                                    fontName="Helvetica",
+                                    fontSize=10))
+        label.add(shapes.String(width-3, height * 0.65,
+                                obj.routename,
+                                fontName="Helvetica-Oblique",
+                                fontSize=8,
+                                textAnchor="end"))
+
+        special = list(obj.preparation)
+        special.extend(["No " + item for item in obj.incompatible_ingredients])
+        special.extend(["No " + item for item in obj.other_ingredients])
+        special.extend(["No " + item for item in obj.restricted_items])
+        special = textwrap.wrap(
+            ' / '.join(special), width=68,
+            break_long_words=False, break_on_hyphens=False)
+        position = height * 0.45
+        for line in special:
+            label.add(shapes.String(2, position,
+                                    line,
+                                    fontName="Helvetica",
+                                    fontSize=9))
+            position -= 10
+
+    sheet = labels.Sheet(specs, draw_label, border=True)
+
+    # obj is a KitchenItem instance (see order/models.py)
+    for obj in sorted_items(kitchen_list):
+        qty = obj.meal_qty
+        for j in range(1, qty + 1):
+            sheet.add_label((obj, j, qty))
+
+    if sheet.label_count > 0:
+        sheet.save(path)
+        print("SousChef Printed {} meal label(s) on {} page(s)"
+              " into file {}".format(
+                  sheet.label_count, sheet.page_count, path))
+    return sheet.label_count
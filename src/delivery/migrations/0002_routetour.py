@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2026-10-18 05:54
+from __future__ import unicode_literals
+
+import annoying.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('member', '0016_auto_20160912_1509'),
+        ('delivery', '0001_fix004a'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteTour',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivery_date', models.DateField(verbose_name='delivery date')),
+                ('client_id_sequence', annoying.fields.JSONField()),
+                ('signature', models.CharField(max_length=40)),
+                ('distance', models.FloatField(verbose_name='distance')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tours', to='member.Route', verbose_name='route')),
+            ],
+            options={
+                'verbose_name_plural': 'route tours',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='routetour',
+            unique_together=set([('route', 'delivery_date')]),
+        ),
+    ]
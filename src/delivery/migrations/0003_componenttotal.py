@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2026-10-18 06:14
+from __future__ import unicode_literals
+
+import collections
+
+from django.db import migrations, models
+from django.db.models import Sum
+import django.db.models.deletion
+
+
+def fill_component_totals(apps, schema_editor):
+    # totals of the existing orders, as ComponentTotal.objects.refresh()
+    Order_item = apps.get_model('order', 'Order_item')
+    ComponentTotal = apps.get_model('delivery', 'ComponentTotal')
+    sums = collections.Counter()
+    for row in Order_item.objects.filter(
+        component_group__isnull=False,
+    ).exclude(
+        component_group='',
+    ).values(
+        'order__delivery_date',
+        'order__client__route',
+        'component_group',
+        'size',
+    ).annotate(
+        total=Sum('total_quantity'),
+    ).order_by():
+        sums[(row['order__delivery_date'],
+              row['order__client__route'],
+              row['component_group'],
+              row['size'] or '')] += row['total'] or 0
+    ComponentTotal.objects.bulk_create(
+        [ComponentTotal(delivery_date=delivery_date,
+                        route_id=route_id,
+                        component_group=component_group,
+                        size=size,
+                        total_quantity=total_quantity)
+         for (delivery_date, route_id, component_group, size),
+         total_quantity in sums.items() if total_quantity],
+        batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('member', '0016_auto_20160912_1509'),
+        ('delivery', '0002_routetour'),
+        ('order', '0008_auto_20160912_1509'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComponentTotal',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivery_date', models.DateField(verbose_name='delivery date')),
+                ('component_group', models.CharField(choices=[('main_dish', 'Main Dish'), ('dessert', 'Dessert'), ('diabetic', 'Diabetic Dessert'), ('fruit_salad', 'Fruit Salad'), ('green_salad', 'Green Salad'), ('pudding', 'Pudding'), ('compote', 'Compote')], max_length=100, verbose_name='component group')),
+                ('size', models.CharField(blank=True, choices=[('', 'Serving size'), ('R', 'Regular'), ('L', 'Large')], max_length=1, verbose_name='size')),
+                ('total_quantity', models.IntegerField(default=0, verbose_name='total quantity')),
+                ('route', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='component_totals', to='member.Route', verbose_name='route')),
+            ],
+            options={
+                'verbose_name_plural': 'component totals',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='componenttotal',
+            unique_together=set([('delivery_date', 'route', 'component_group', 'size')]),
+        ),
+        migrations.RunPython(
+            fill_component_totals, migrations.RunPython.noop),
+    ]
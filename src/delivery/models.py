@@ -1,5 +1,12 @@
-from django.db import models
+import collections
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q, Sum
 from django.utils.translation import ugettext_lazy as _
+from annoying.fields import JSONField
+
+from meal.models import COMPONENT_GROUP_CHOICES
+from order.models import Order_item, SIZE_CHOICES
 
 # Create your models here.
 
@@ -9,3 +16,334 @@ class Delivery(models.Model):
         verbose_name_plural = _('deliveries')
 
     pass
+
+
+class RouteTour(models.Model):
+
+    class Meta:
+        verbose_name_plural = _('route tours')
+        unique_together = ('route', 'delivery_date')
+
+    # Tour of a route for a delivery date, precomputed by the
+    #   optimizeroutes command and served by the route sequencing page
+    route = models.ForeignKey(
+        'member.Route',
+        verbose_name=_('route'),
+        related_name='tours',
+        on_delete=models.CASCADE,
+    )
+
+    delivery_date = models.DateField(
+        verbose_name=_('delivery date')
+    )
+
+    # ordered client ids of the tour
+    client_id_sequence = JSONField()
+
+    # hash of the ids and coordinates of the stops of the tour and of its
+    #   metric, see delivery.routing.stops_signature
+    signature = models.CharField(
+        max_length=40,
+    )
+
+    # length of the tour in meters, or duration in seconds along the
+    #   road network (see delivery.routing.distance_provider)
+    distance = models.FloatField(
+        verbose_name=_('distance'),
+    )
+
+    computed_at = models.DateTimeField(
+        auto_now=True,
+    )
+
+    def __str__(self):
+        return "Tour of {} on {}".format(self.route, self.delivery_date)
+
+
+class ComponentTotalManager(models.Manager):
+
+    def refresh(self, delivery_dates=None, route_ids=None):
+        """Recomputes totals from the order items, with a single query.
+
+        Args:
+            delivery_dates: Dates of the orders (default: all the dates).
+            route_ids: Only recompute the totals of these routes, None
+                standing for the clients without a route (default: all
+                the routes).
+
+        Returns:
+            The number of totals.
+        """
+        totals = self.all()
+        items = Order_item.objects.all()
+        if delivery_dates is not None:
+            totals = totals.filter(delivery_date__in=delivery_dates)
+            items = items.filter(order__delivery_date__in=delivery_dates)
+        if route_ids is not None:
+            totals = totals.filter(route_filter('route', route_ids))
+            items = items.filter(route_filter('order__client__route',
+                                              route_ids))
+        sums = item_sums(items)
+        with transaction.atomic():
+            totals.delete()
+            self.bulk_create(
+                [ComponentTotal(delivery_date=delivery_date,
+                                route_id=route_id,
+                                component_group=component_group,
+                                size=size,
+                                total_quantity=total_quantity)
+                 for (delivery_date, route_id, component_group, size),
+                 total_quantity in sums.items() if total_quantity],
+                batch_size=500)
+        return len(sums)
+
+    def add_orders(self, delivery_date, client_ids):
+        """Adds the items of the orders of some clients for a date to the
+        totals, without recounting the orders of the other clients.
+
+        Used once these orders are created: the tasks creating the
+        orders of a date in parallel then only update the totals of
+        their own clients.
+        """
+        sums = item_sums(Order_item.objects.filter(
+            order__delivery_date=delivery_date,
+            order__client_id__in=client_ids))
+        # always update the totals in the same order, so that concurrent
+        #   transactions wait for each other rather than deadlock
+        for key in sorted(sums, key=lambda key: (
+                key[1] is None, key[1] or 0, key[2], key[3])):
+            if sums[key]:
+                self.add(*key, quantity=sums[key])
+
+    def add(self, delivery_date, route_id, component_group, size, quantity):
+        """Adds a quantity to one total, without recounting the order
+        items. The total is created when missing and deleted when it
+        drops to zero.
+        """
+        totals = self.filter(
+            delivery_date=delivery_date, route_id=route_id,
+            component_group=component_group, size=size)
+        with transaction.atomic():
+            if not totals.update(
+                    total_quantity=F('total_quantity') + quantity):
+                try:
+                    with transaction.atomic():
+                        self.create(
+                            delivery_date=delivery_date, route_id=route_id,
+                            component_group=component_group, size=size,
+                            total_quantity=quantity)
+                except IntegrityError:
+                    # created meanwhile by another process
+                    totals.update(
+                        total_quantity=F('total_quantity') + quantity)
+            totals.filter(total_quantity=0).delete()
+
+
+def item_sums(items):
+    # quantities of order items by (delivery date, route id, component
+    #   group, size), summed with a single query
+    rows = items.filter(
+        component_group__isnull=False,
+    ).exclude(
+        component_group='',
+    ).values(
+        'order__delivery_date',
+        'order__client__route',
+        'component_group',
+        'size',
+    ).annotate(
+        total=Sum('total_quantity'),
+    ).order_by()
+    sums = collections.Counter()
+    for row in rows:
+        # items without a size are counted with the empty size
+        sums[(row['order__delivery_date'],
+              row['order__client__route'],
+              row['component_group'],
+              row['size'] or '')] += row['total'] or 0
+    return sums
+
+
+def route_filter(field, route_ids):
+    # Q object selecting the routes of route_ids, None standing for no
+    #   route
+    route_ids = set(route_ids)
+    q = Q(**{field + '__in': [route_id for route_id in route_ids
+                              if route_id is not None]})
+    if None in route_ids:
+        q |= Q(**{field + '__isnull': True})
+    return q
+
+
+class ComponentTotal(models.Model):
+
+    class Meta:
+        verbose_name_plural = _('component totals')
+        unique_together = (
+            'delivery_date', 'route', 'component_group', 'size')
+
+    # Quantity of a component group ordered for a delivery date by the
+    #   clients of a route, for a size. The totals are maintained when
+    #   the orders change (see delivery.signals) and can be rebuilt by
+    #   the rebuildcomponenttotals command.
+    delivery_date = models.DateField(
+        verbose_name=_('delivery date')
+    )
+
+    # the current route of the clients, null for clients without route
+    route = models.ForeignKey(
+        'member.Route',
+        verbose_name=_('route'),
+        related_name='component_totals',
+        null=True,
+        on_delete=models.CASCADE,
+    )
+
+    component_group = models.CharField(
+        max_length=100,
+        choices=COMPONENT_GROUP_CHOICES,
+        verbose_name=_('component group'),
+    )
+
+    size = models.CharField(
+        verbose_name=_('size'),
+        max_length=1,
+        blank=True,
+        choices=SIZE_CHOICES,
+    )
+
+    total_quantity = models.IntegerField(
+        verbose_name=_('total quantity'),
+        default=0,
+    )
+
+    objects = ComponentTotalManager()
+
+    def __str__(self):
+        return "{} {} {} on {}".format(
+            self.total_quantity, self.component_group, self.size,
+            self.delivery_date)
+
+
+class RestrictionChange(models.Model):
+
+    class Meta:
+        verbose_name_plural = _('restriction changes')
+
+    # Clients whose requirements changed, announced to the restriction
+    #   index of each process (see delivery.restrictions). The id is the
+    #   version of the index that includes the change.
+    client_ids = JSONField()
+
+    changed_at = models.DateTimeField(
+        auto_now_add=True,
+    )
+
+    def __str__(self):
+        return "Restriction change #{}".format(self.id)
+
+
+class Job(models.Model):
+
+    class Meta:
+        verbose_name_plural = _('jobs')
+
+    # Work run outside of the requests by the runjobs command, see
+    #   delivery.jobs
+    REFRESH_ORDERS = 'refresh_orders'
+    MEAL_LABELS = 'meal_labels'
+    OPTIMIZE_ROUTES = 'optimize_routes'
+
+    KINDS = (
+        (REFRESH_ORDERS, _('Refresh orders')),
+        (MEAL_LABELS, _('Meal labels')),
+        (OPTIMIZE_ROUTES, _('Optimize routes')),
+    )
+
+    QUEUED = 'Q'
+    RUNNING = 'R'
+    DONE = 'D'
+    FAILED = 'F'
+
+    STATUSES = (
+        (QUEUED, _('Queued')),
+        (RUNNING, _('Running')),
+        (DONE, _('Done')),
+        (FAILED, _('Failed')),
+    )
+
+    kind = models.CharField(
+        max_length=20,
+        choices=KINDS,
+        verbose_name=_('kind'),
+    )
+
+    # keyword arguments of the job, serializable to JSON
+    arguments = JSONField()
+
+    status = models.CharField(
+        max_length=1,
+        choices=STATUSES,
+        default=QUEUED,
+        db_index=True,
+        verbose_name=_('status'),
+    )
+
+    # steps done out of total, as reported by the job
+    done = models.IntegerField(
+        default=0,
+    )
+
+    total = models.IntegerField(
+        default=0,
+    )
+
+    message = models.CharField(
+        max_length=200,
+        blank=True,
+    )
+
+    result = JSONField(
+        blank=True,
+        null=True,
+    )
+
+    error = models.TextField(
+        blank=True,
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+    )
+
+    started_at = models.DateTimeField(
+        null=True,
+    )
+
+    # last sign of life of the runner of a running job, see
+    #   delivery.jobs.run
+    heartbeat_at = models.DateTimeField(
+        null=True,
+    )
+
+    finished_at = models.DateTimeField(
+        null=True,
+    )
+
+    def __str__(self):
+        return "{} job #{} ({})".format(
+            self.get_kind_display(), self.id, self.get_status_display())
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    def report(self, done, total=None, message=None):
+        """Records the progress of a running job."""
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message is not None:
+            self.message = message[:200]
+        Job.objects.filter(id=self.id).update(
+            done=self.done, total=self.total, message=self.message)
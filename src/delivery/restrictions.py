@@ -0,0 +1,219 @@
+import collections
+import threading
+
+import numpy
+from django.db import transaction
+from django.db.models import Max
+
+from meal.models import Incompatibility
+from member.models import (
+    Client_avoid_component, Client_avoid_ingredient, Restriction)
+from .models import RestrictionChange
+
+# The index of each process follows the changes announced by the others
+#   through the RestrictionChange table: the id of a change is the
+#   version of the index that includes it. Only the last changes are
+#   kept, the indexes further behind are rebuilt.
+CHANGES_KEPT = 1000
+
+_index = None
+_index_lock = threading.Lock()
+
+
+class RestrictionIndex:
+    """In-memory index of the ingredients and components that clients
+    must not be served.
+
+    Each client with requirements has a row of two boolean matrices:
+    one column per ingredient it avoids or is restricted from (through
+    the incompatibilities of its restricted items), and one column per
+    component it avoids. The clients meeting a set of ingredients and
+    components are then found with a vectorized operation across all
+    the clients.
+    """
+
+    def __init__(self, version=0):
+        self.version = version
+        # row -> client id
+        self.client_ids = []
+        # client id -> row
+        self.rows = {}
+        # ingredient or component id -> column
+        self.ingredient_columns = {}
+        self.component_columns = {}
+        self.ingredients = numpy.zeros((0, 0), dtype=bool)
+        self.components = numpy.zeros((0, 0), dtype=bool)
+
+    @classmethod
+    def build(cls, version=0):
+        """Loads the requirements of all the clients."""
+        index = cls(version)
+        requirements = load_requirements()
+        index.client_ids = sorted(requirements)
+        index.rows = {client_id: row for row, client_id in
+                      enumerate(index.client_ids)}
+        ingredient_ids = sorted(set().union(
+            *(ingredients for ingredients, components in
+              requirements.values())))
+        component_ids = sorted(set().union(
+            *(components for ingredients, components in
+              requirements.values())))
+        index.ingredient_columns = {ingredient_id: column for column,
+                                    ingredient_id in enumerate(ingredient_ids)}
+        index.component_columns = {component_id: column for column,
+                                   component_id in enumerate(component_ids)}
+        index.ingredients = numpy.zeros(
+            (len(index.client_ids), len(ingredient_ids)), dtype=bool)
+        index.components = numpy.zeros(
+            (len(index.client_ids), len(component_ids)), dtype=bool)
+        for client_id, (ingredients, components) in requirements.items():
+            index.set_row(client_id, ingredients, components)
+        return index
+
+    def refresh(self, client_ids):
+        """Reloads the requirements of some clients."""
+        requirements = load_requirements(client_ids)
+        for client_id in client_ids:
+            ingredients, components = requirements.get(
+                client_id, (set(), set()))
+            if client_id in self.rows or ingredients or components:
+                self.set_row(client_id, ingredients, components)
+
+    def set_row(self, client_id, ingredient_ids, component_ids):
+        # replaces the requirements of a client, growing the matrices
+        #   for new clients, ingredients and components
+        if client_id not in self.rows:
+            self.rows[client_id] = len(self.client_ids)
+            self.client_ids.append(client_id)
+        for ingredient_id in ingredient_ids:
+            self.ingredient_columns.setdefault(
+                ingredient_id, len(self.ingredient_columns))
+        for component_id in component_ids:
+            self.component_columns.setdefault(
+                component_id, len(self.component_columns))
+        self.ingredients = grow(self.ingredients, len(self.client_ids),
+                                len(self.ingredient_columns))
+        self.components = grow(self.components, len(self.client_ids),
+                               len(self.component_columns))
+        row = self.rows[client_id]
+        self.ingredients[row] = False
+        self.ingredients[row, [self.ingredient_columns[ingredient_id]
+                               for ingredient_id in ingredient_ids]] = True
+        self.components[row] = False
+        self.components[row, [self.component_columns[component_id]
+                              for component_id in component_ids]] = True
+
+    def clashing(self, ingredient_ids=(), component_ids=()):
+        """Returns the boolean vector of the rows of the clients that
+        must not be served any of the given ingredients or components.
+        """
+        ingredient_columns = [self.ingredient_columns[ingredient_id]
+                              for ingredient_id in ingredient_ids
+                              if ingredient_id in self.ingredient_columns]
+        component_columns = [self.component_columns[component_id]
+                             for component_id in component_ids
+                             if component_id in self.component_columns]
+        return (
+            self.ingredients[:, ingredient_columns].any(axis=1) |
+            self.components[:, component_columns].any(axis=1))
+
+    def clients(self, rows):
+        """Returns the set of the ids of the clients of a boolean
+        vector of rows."""
+        return {self.client_ids[row] for row in numpy.flatnonzero(rows)}
+
+
+def grow(matrix, num_rows, num_columns):
+    # pads a matrix with False up to num_rows rows and num_columns columns
+    rows, columns = matrix.shape
+    if rows == num_rows and columns == num_columns:
+        return matrix
+    return numpy.pad(
+        matrix, ((0, num_rows - rows), (0, num_columns - columns)),
+        'constant')
+
+
+def load_requirements(client_ids=None):
+    """Returns the dictionary of client id: (ids of the ingredients it
+    must avoid, ids of the components it must avoid), for all the
+    clients with requirements or for the given clients."""
+    avoid_ingredients = Client_avoid_ingredient.objects.all()
+    avoid_components = Client_avoid_component.objects.all()
+    restrictions = Restriction.objects.all()
+    if client_ids is not None:
+        avoid_ingredients = avoid_ingredients.filter(client_id__in=client_ids)
+        avoid_components = avoid_components.filter(client_id__in=client_ids)
+        restrictions = restrictions.filter(client_id__in=client_ids)
+
+    requirements = collections.defaultdict(lambda: (set(), set()))
+    for client_id, ingredient_id in avoid_ingredients.values_list(
+            'client_id', 'ingredient_id'):
+        requirements[client_id][0].add(ingredient_id)
+    for client_id, component_id in avoid_components.values_list(
+            'client_id', 'component_id'):
+        requirements[client_id][1].add(component_id)
+    incompatible = collections.defaultdict(set)
+    for restricted_item_id, ingredient_id in Incompatibility.objects.filter(
+            restricted_item_id__in=restrictions.values('restricted_item_id')
+    ).values_list('restricted_item_id', 'ingredient_id'):
+        incompatible[restricted_item_id].add(ingredient_id)
+    for client_id, restricted_item_id in restrictions.values_list(
+            'client_id', 'restricted_item_id'):
+        requirements[client_id][0].update(incompatible[restricted_item_id])
+    return dict(requirements)
+
+
+def get_index():
+    """Returns the RestrictionIndex of this process, up to date with
+    the changes announced by clients_changed()."""
+    global _index
+    with _index_lock:
+        version = RestrictionChange.objects.aggregate(
+            version=Max('id'))['version'] or 0
+        if _index is not None and _index.version != version:
+            changes = list(RestrictionChange.objects.filter(
+                id__gt=_index.version, id__lte=version
+            ).order_by('id').values_list('id', 'client_ids')) \
+                if _index.version < version else []
+            if [change_id for change_id, client_ids in changes] == \
+                    list(range(_index.version + 1, version + 1)):
+                _index.refresh(sorted(set().union(
+                    *(client_ids for change_id, client_ids in changes))))
+                _index.version = version
+            else:
+                # the changes are lost, or not committed yet: start
+                #   again from the committed requirements
+                _index = None
+        if _index is None:
+            _index = RestrictionIndex.build(version)
+        return _index
+
+
+def clients_changed(client_ids):
+    """Announces that the requirements of some clients changed, to the
+    index of each process.
+
+    The index of this process is updated at once. The change is
+    recorded for the other processes once the transaction commits, so
+    that they see the new requirements when they see the change.
+    """
+    client_ids = sorted(set(client_ids))
+    if not client_ids:
+        return
+    with _index_lock:
+        if _index is not None:
+            _index.refresh(client_ids)
+    transaction.on_commit(lambda: record_change(client_ids))
+
+
+def record_change(client_ids):
+    change = RestrictionChange.objects.create(client_ids=client_ids)
+    RestrictionChange.objects.filter(
+        id__lte=change.id - CHANGES_KEPT).delete()
+
+
+def reset():
+    # forgets the index of this process
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,210 @@
+import csv
+import heapq
+import os
+import sqlite3
+
+import numpy
+
+from . import tsp
+
+# Speed in meters per second between an address and the nearest
+# vertex of the road network, or across the gaps of the network
+ACCESS_SPEED = 5.0
+
+
+class RoadGraph:
+    """Directed graph of the road network.
+
+    Vertices are (latitude, longitude) pairs and edges are weighted by
+    the time in seconds needed to drive along them.
+    """
+
+    def __init__(self, vertices, edges):
+        # list of (latitude, longitude)
+        self.vertices = vertices
+        # vertex index -> list of (vertex index, seconds)
+        self.edges = edges
+        self.coordinates = numpy.radians(
+            numpy.array(vertices, dtype=float).reshape(-1, 2))
+
+    @classmethod
+    def from_csv(cls, path):
+        """Loads a graph from a CSV edge list, exported for instance
+        from an OpenStreetMap extract.
+
+        The file has a header and the columns from_latitude,
+        from_longitude, to_latitude, to_longitude, seconds and,
+        optionally, oneway ('1' when the street can only be driven
+        from the first point to the second).
+        """
+        index = {}
+        vertices = []
+        edges = {}
+
+        def vertex(latitude, longitude):
+            key = (round(float(latitude), 6), round(float(longitude), 6))
+            if key not in index:
+                index[key] = len(vertices)
+                vertices.append(key)
+                edges[index[key]] = []
+            return index[key]
+
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                a = vertex(row['from_latitude'], row['from_longitude'])
+                b = vertex(row['to_latitude'], row['to_longitude'])
+                seconds = float(row['seconds'])
+                edges[a].append((b, seconds))
+                if row.get('oneway', '0') != '1':
+                    edges[b].append((a, seconds))
+        return cls(vertices, edges)
+
+    def nearest(self, node):
+        """Returns (index of the vertex closest to node, distance to it
+        in meters)."""
+        latitude = numpy.radians(node.latitude)
+        longitude = numpy.radians(node.longitude)
+        x = (self.coordinates[:, 1] - longitude) * numpy.cos(
+            (self.coordinates[:, 0] + latitude) / 2)
+        y = self.coordinates[:, 0] - latitude
+        distances = tsp.EARTH_RADIUS * numpy.hypot(x, y)
+        i = int(numpy.argmin(distances))
+        return i, float(distances[i])
+
+    def durations(self, source, targets):
+        """Returns the dictionary of the shortest time in seconds from
+        the source vertex to each reachable target vertex (Dijkstra).
+        The search stops once all the targets are reached."""
+        remaining = set(targets)
+        found = {}
+        best = {source: 0.0}
+        queue = [(0.0, source)]
+        while queue and remaining:
+            seconds, vertex = heapq.heappop(queue)
+            if seconds > best[vertex]:
+                continue
+            if vertex in remaining:
+                remaining.discard(vertex)
+                found[vertex] = seconds
+            for target, edge in self.edges[vertex]:
+                candidate = seconds + edge
+                if candidate < best.get(target, candidate + 1):
+                    best[target] = candidate
+                    heapq.heappush(queue, (candidate, target))
+        return found
+
+
+class DurationCache:
+    """Persists travel durations between addresses in a SQLite file,
+    so that each pair of addresses is only computed once."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def connect(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        connection = sqlite3.connect(self.path)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS duration ("
+            "origin TEXT, destination TEXT, seconds REAL, "
+            "PRIMARY KEY (origin, destination)) WITHOUT ROWID")
+        return connection
+
+    def get_many(self, keys):
+        """Returns the dictionary of (origin, destination): seconds of
+        the known durations between the given addresses."""
+        keys = sorted(set(keys))
+        wanted = set(keys)
+        known = {}
+        connection = self.connect()
+        try:
+            # stay below the SQLite limit of 999 parameters
+            for k in range(0, len(keys), 900):
+                chunk = keys[k:k + 900]
+                marks = ','.join('?' * len(chunk))
+                rows = connection.execute(
+                    "SELECT origin, destination, seconds FROM duration "
+                    "WHERE origin IN ({})".format(marks), chunk)
+                for origin, destination, seconds in rows:
+                    if destination in wanted:
+                        known[(origin, destination)] = seconds
+        finally:
+            connection.close()
+        return known
+
+    def set_many(self, durations):
+        """Stores a dictionary of (origin, destination): seconds."""
+        connection = self.connect()
+        try:
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO duration VALUES (?, ?, ?)",
+                    [(origin, destination, seconds) for
+                     (origin, destination), seconds in durations.items()])
+        finally:
+            connection.close()
+
+
+class RoadNetworkProvider(tsp.DistanceProvider):
+    """Driving duration in seconds along a RoadGraph.
+
+    Each address is attached to the closest vertex of the graph, the
+    time to reach it being counted at ACCESS_SPEED. The search is done
+    in both directions and the matrix holds the mean of the two
+    durations, since one-way streets make them differ but the solvers
+    need a symmetric matrix. Durations are kept in an optional
+    DurationCache.
+    """
+    name = 'road_network'
+
+    def __init__(self, graph, cache=None):
+        self.graph = graph
+        self.cache = cache
+
+    def matrix(self, nodes):
+        keys = [address_key(node) for node in nodes]
+        known = self.cache.get_many(keys) if self.cache else {}
+        computed = {}
+
+        attached = None
+        for i, origin in enumerate(keys):
+            missing = [j for j, destination in enumerate(keys)
+                       if origin != destination and
+                       (origin, destination) not in known and
+                       (origin, destination) not in computed]
+            if not missing:
+                continue
+            if attached is None:
+                attached = [self.graph.nearest(node) for node in nodes]
+            source, access = attached[i]
+            reached = self.graph.durations(
+                source, [attached[j][0] for j in missing])
+            for j in missing:
+                target, egress = attached[j]
+                if target in reached:
+                    seconds = (access + egress) / ACCESS_SPEED + \
+                        reached[target]
+                else:
+                    # not connected: cross the gap at ACCESS_SPEED
+                    seconds = tsp.distance_matrix(
+                        [nodes[i], nodes[j]],
+                        tsp.METRIC_HAVERSINE)[0, 1] / ACCESS_SPEED
+                computed[(origin, keys[j])] = seconds
+
+        if computed and self.cache:
+            self.cache.set_many(computed)
+        known.update(computed)
+
+        durations = numpy.zeros((len(nodes), len(nodes)))
+        for i, origin in enumerate(keys):
+            for j, destination in enumerate(keys):
+                if origin != destination:
+                    durations[i, j] = known[(origin, destination)]
+        return (durations + durations.T) / 2
+
+
+def address_key(node):
+    # an address is identified by its geocoded coordinates
+    return '{:.6f},{:.6f}'.format(node.latitude, node.longitude)
@@ -0,0 +1,316 @@
+import collections
+import functools
+import hashlib
+import multiprocessing
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Sum
+
+from member.models import Route
+from order.models import Order
+from .models import RouteTour
+from . import roads, tsp, vrp
+
+# Where all the routes start and end
+SANTROPOL = (45.516564, -73.575145)
+
+# Seconds a solved tour is kept in the cache
+TOUR_CACHE_TIMEOUT = 30 * 24 * 3600
+
+
+def get_day_stops(delivery_date, route_id=None):
+    """Returns the geolocated orders to deliver on a date.
+
+    Each stop is a dictionary with the client, its address, its
+    current route and its demand: the total quantity of its order
+    items. All the stops are loaded with a single query.
+
+    Args:
+        delivery_date: Date of the orders.
+        route_id: Only return the stops of this Route (default: all).
+    """
+    orders = Order.objects.get_orders_for_date(delivery_date).filter(
+        client__member__address__latitude__isnull=False,
+        client__member__address__longitude__isnull=False,
+    )
+    if route_id is not None:
+        orders = orders.filter(client__route_id=route_id)
+    rows = orders.values(
+        'id',
+        'client_id',
+        'client__route_id',
+        'client__member_id',
+        'client__member__firstname',
+        'client__member__lastname',
+        'client__member__address__street',
+        'client__member__address__latitude',
+        'client__member__address__longitude',
+        'client__member__address__distance',
+    ).annotate(
+        demand=Sum('orders__total_quantity'),
+    ).order_by('client_id')
+    return [row for row in rows]
+
+
+def waypoint(stop):
+    # waypoint dictionary sent to the route sequencing page
+    return {
+        'id': stop['client__member_id'],
+        'latitude': stop['client__member__address__latitude'],
+        'longitude': stop['client__member__address__longitude'],
+        'distance': stop['client__member__address__distance'],
+        'member': "{} {}".format(
+            stop['client__member__firstname'],
+            stop['client__member__lastname']),
+        'address': stop['client__member__address__street'],
+    }
+
+
+def plan_routes(delivery_date, routes=None, capacity=None,
+                time_limit=None):
+    """Proposes how to split the orders of a date between routes.
+
+    Args:
+        delivery_date: Date of the orders.
+        routes: List of the available Route objects (default: all).
+        capacity: Maximum number of items delivered by a route.
+        time_limit: Wall-clock budget in seconds for sequencing the
+            routes.
+
+    Returns:
+        (list of (route, stops, load, length in meters) with the stops
+         in delivery order, list of the stops that could not be
+         assigned)
+    """
+    if routes is None:
+        routes = list(Route.objects.order_by('id'))
+    stops = get_day_stops(delivery_date)
+    nodes = [tsp.Node(stop['client_id'],
+                      float(stop['client__member__address__latitude']),
+                      float(stop['client__member__address__longitude']))
+             for stop in stops]
+    demands = [stop['demand'] or 0 for stop in stops]
+
+    plan = vrp.solve(tsp.Node(None, *SANTROPOL), nodes, demands,
+                     len(routes), capacity, time_limit)
+
+    by_client = {stop['client_id']: stop for stop in stops}
+    groups = [[node.id for node in tour[1:]] for tour in plan.tours]
+    route_ids = vrp.match_routes(
+        groups,
+        {stop['client_id']: stop['client__route_id'] for stop in stops},
+        [route.id for route in routes])
+    routes_by_id = {route.id: route for route in routes}
+
+    proposal = []
+    for route_id, group, load, value in zip(
+            route_ids, groups, plan.loads, plan.values):
+        proposal.append((routes_by_id[route_id],
+                         [by_client[client_id] for client_id in group],
+                         load, value))
+    unassigned = [by_client[node.id] for node in plan.unassigned]
+    return proposal, unassigned
+
+
+def sequence_route(route_id, delivery_date, nodes, time_limit=None,
+                   metric=tsp.METRIC_HAVERSINE, sequence=None):
+    """Returns the nodes of a route in delivery order.
+
+    Solved tours are cached for each route and weekday with the ids
+    and coordinates of their stops. When the stops are the same as in
+    the cached tour, it is returned without any search. When a few
+    stops were added, removed or moved, the cached tour is repaired:
+    the new stops are inserted where they cost the least and the tour
+    is polished with a quick local search instead of being solved from
+    scratch.
+
+    Without a cached tour, the tour precomputed by optimize_routes()
+    for the date is used in the same way, or else the sequence
+    approved for the route, when there is one, so that drivers keep
+    familiar routes.
+
+    Args:
+        route_id: Id of the Route.
+        delivery_date: Date of the delivery.
+        nodes: List of tsp.Node, the first one being the depot. Node
+            ids identify the stops.
+        time_limit: Wall-clock budget in seconds for solving the tour.
+        metric: One of tsp.METRICS or a tsp.DistanceProvider.
+        sequence: Node ids in a previously approved order, such as
+            Route.get_client_sequence().
+    """
+    key = tour_cache_key(route_id, delivery_date.weekday(), metric)
+    stops = [stop_key(node) for node in nodes[1:]]
+    signature = stops_signature(stops)
+    cached = cache.get(key)
+
+    if cached and cached['signature'] == signature:
+        position = {stop: k for k, stop in enumerate(cached['stops'])}
+        return nodes[:1] + sorted(
+            nodes[1:], key=lambda node: position[stop_key(node)])
+
+    if cached:
+        unchanged = set(stops)
+        sequence = [stop[0] for stop in cached['stops']
+                    if stop in unchanged]
+    else:
+        stored = RouteTour.objects.filter(
+            route_id=route_id, delivery_date=delivery_date).first()
+        if stored and stored.signature == stops_signature(stops, metric):
+            position = {client_id: k for k, client_id in
+                        enumerate(stored.client_id_sequence)}
+            tour = nodes[:1] + sorted(
+                nodes[1:], key=lambda node: position[node.id])
+            cache_tour(route_id, delivery_date, tour, metric)
+            return tour
+        elif stored:
+            sequence = stored.client_id_sequence
+    if sequence:
+        tour = tsp.warm_start(nodes, sequence, metric)
+        tour = tsp.solve(tour, solver=tsp.SOLVER_OR_OPT,
+                         time_limit=time_limit, metric=metric)
+    else:
+        tour = tsp.solve(nodes, solver=tsp.SOLVER_CHAINED,
+                         time_limit=time_limit, metric=metric)
+
+    cache_tour(route_id, delivery_date, tour, metric)
+    return tour
+
+
+def cache_tour(route_id, delivery_date, tour, metric):
+    stops = [stop_key(node) for node in tour[1:]]
+    cache.set(tour_cache_key(route_id, delivery_date.weekday(), metric),
+              {'signature': stops_signature(stops), 'stops': stops},
+              TOUR_CACHE_TIMEOUT)
+
+
+def optimize_routes(delivery_date, routes=None, workers=None,
+                    time_limit=None, metric=tsp.METRIC_HAVERSINE):
+    """Precomputes the tours of all the routes for a delivery date.
+
+    The routes are solved in parallel by a pool of worker processes,
+    each starting from the sequence approved for its route. The tours
+    are stored as RouteTour objects and put in the tour cache, so that
+    the route sequencing page does not have to search in the morning.
+
+    Args:
+        delivery_date: Date of the orders.
+        routes: List of Route objects (default: all).
+        workers: Number of processes (default: one per CPU). With 1,
+            the routes are solved in the current process.
+        time_limit: Wall-clock budget in seconds for each route.
+        metric: One of tsp.METRICS or a tsp.DistanceProvider.
+
+    Returns:
+        List of the RouteTour objects that were stored.
+    """
+    if routes is None:
+        routes = list(Route.objects.order_by('id'))
+    by_route = collections.defaultdict(list)
+    for stop in get_day_stops(delivery_date):
+        by_route[stop['client__route_id']].append(
+            (stop['client_id'],
+             float(stop['client__member__address__latitude']),
+             float(stop['client__member__address__longitude'])))
+    tasks = [(route.id, by_route[route.id],
+              route.get_client_sequence(delivery_date), time_limit, metric)
+             for route in routes if by_route[route.id]]
+
+    if workers == 1 or len(tasks) < 2:
+        results = [solve_route_task(task) for task in tasks]
+    else:
+        # Worker processes do not use the database: do not let them
+        #   inherit its connections.
+        connections.close_all()
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(solve_route_task, tasks)
+
+    route_tours = []
+    for route_id, client_ids, distance in results:
+        position = {client_id: k for k, client_id in enumerate(client_ids)}
+        tour = [tsp.Node(None, *SANTROPOL)] + sorted(
+            (tsp.Node(*stop) for stop in by_route[route_id]),
+            key=lambda node: position[node.id])
+        route_tour, created = RouteTour.objects.update_or_create(
+            route_id=route_id, delivery_date=delivery_date,
+            defaults={
+                'client_id_sequence': client_ids,
+                'signature': stops_signature(
+                    [stop_key(node) for node in tour[1:]], metric),
+                'distance': distance,
+            })
+        route_tours.append(route_tour)
+        cache_tour(route_id, delivery_date, tour, metric)
+    return route_tours
+
+
+def solve_route_task(task):
+    # Solves one route in a worker process of optimize_routes().
+    #   Only uses picklable arguments and results.
+    route_id, stops, sequence, time_limit, metric = task
+    nodes = [tsp.Node(None, *SANTROPOL)] + \
+        [tsp.Node(*stop) for stop in stops]
+    if sequence:
+        nodes = tsp.warm_start(nodes, sequence, metric)
+    solution = tsp.optimize(nodes, tsp.SOLVER_CHAINED,
+                            time_limit=time_limit, metric=metric)
+    return (route_id, [node.id for node in solution.tour[1:]],
+            solution.value)
+
+
+def forget_route_tour(route_id, delivery_date):
+    # the next sequencing of the route starts from its saved sequence:
+    #   forget the cached tours of the weekday, and the tours stored by
+    #   optimize_routes() for the date and the next ones of the weekday
+    cache.delete_many([tour_cache_key(route_id, delivery_date.weekday(),
+                                      metric)
+                       for metric in tsp.METRICS +
+                       (roads.RoadNetworkProvider.name,)])
+    RouteTour.objects.filter(
+        route_id=route_id, delivery_date__gte=delivery_date,
+        # Sunday is 1 in the week_day lookup, Monday 0 in weekday()
+        delivery_date__week_day=(delivery_date.weekday() + 1) % 7 + 1,
+    ).delete()
+
+
+def tour_cache_key(route_id, weekday, metric):
+    return 'delivery:tour:{}:{}:{}'.format(
+        route_id, weekday, tsp.metric_name(metric))
+
+
+def distance_provider():
+    """Returns how the distance between stops is measured.
+
+    Driving durations along the road network of the
+    DELIVERY_ROAD_NETWORK edge list when it is set, and great-circle
+    distances otherwise.
+    """
+    path = getattr(settings, 'DELIVERY_ROAD_NETWORK', None)
+    if not path:
+        return tsp.HaversineProvider()
+    return road_network_provider(
+        path, getattr(settings, 'DELIVERY_DURATION_CACHE', None))
+
+
+@functools.lru_cache()
+def road_network_provider(path, cache_path):
+    # the graph is loaded once per process
+    duration_cache = roads.DurationCache(cache_path) if cache_path else None
+    return roads.RoadNetworkProvider(roads.RoadGraph.from_csv(path),
+                                     duration_cache)
+
+
+def stop_key(node):
+    # a stop is identified by its id and coordinates
+    return (node.id, round(node.latitude, 6), round(node.longitude, 6))
+
+
+def stops_signature(stops, metric=None):
+    # hash of the set of stops, whatever their order, and of the metric
+    #   of the tour when given
+    data = sorted(stops)
+    if metric is not None:
+        data = (tsp.metric_name(metric), data)
+    return hashlib.sha1(repr(data).encode('utf-8')).hexdigest()
@@ -0,0 +1,217 @@
+import collections
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, pre_save
+
+from meal.models import (
+    Component, Component_ingredient, Incompatibility, Ingredient, Menu,
+    Menu_component, Restricted_item)
+from member.models import (
+    Client, Client_avoid_component, Client_avoid_ingredient, Client_option,
+    Member, Option, Restriction, Route)
+from order.models import Order, Order_item
+from order.signals import orders_created
+from .models import ComponentTotal
+from . import restrictions
+
+# Seconds a kitchen count is kept in the cache
+KITCHEN_COUNT_CACHE_TIMEOUT = 7 * 24 * 3600
+
+
+def kitchen_count_cache_key(delivery_date):
+    return 'delivery:kitchen_count:{}'.format(delivery_date.isoformat())
+
+
+def forget_kitchen_count(*delivery_dates):
+    """Drops the cached kitchen counts of the given dates, or of all
+    the dates when none is given."""
+    if not delivery_dates:
+        delivery_dates = Order.objects.values_list(
+            'delivery_date', flat=True).distinct()
+    cache.delete_many([kitchen_count_cache_key(delivery_date)
+                       for delivery_date in delivery_dates
+                       if delivery_date is not None])
+
+
+def forget_client_kitchen_counts(*client_ids):
+    # the requirements of a client show in the count of each day it
+    #   has an order
+    forget_kitchen_count(*Order.objects.filter(
+        client_id__in=client_ids
+    ).values_list('delivery_date', flat=True).distinct())
+
+
+def refresh_component_totals(delivery_date, client_id):
+    # recomputes the totals of the route of a client for a date
+    route_ids = Client.objects.filter(
+        id=client_id).values_list('route_id', flat=True)
+    ComponentTotal.objects.refresh(
+        [delivery_date], list(route_ids) or None)
+
+
+def order_saving(sender, instance, **kwargs):
+    # remembers the date and the client of an order, that can change
+    instance._previous_delivery = Order.objects.filter(
+        id=instance.id).values_list('delivery_date', 'client_id').first() \
+        if instance.id is not None else None
+
+
+def order_changed(sender, instance, **kwargs):
+    forget_kitchen_count(instance.delivery_date)
+    # the items count for the date and route of their order, and are
+    #   counted by their own signal when created or deleted
+    previous = getattr(instance, '_previous_delivery', None)
+    if kwargs['signal'] is post_save and previous and \
+            previous != (instance.delivery_date, instance.client_id):
+        forget_kitchen_count(previous[0])
+        refresh_component_totals(instance.delivery_date, instance.client_id)
+        refresh_component_totals(*previous)
+
+
+def order_item_saving(sender, instance, **kwargs):
+    # remembers what an order item counted for, that can change
+    instance._previous_count = Order_item.objects.filter(
+        id=instance.id).values_list(
+            'order_id', 'component_group', 'size', 'total_quantity'
+    ).first() if instance.id is not None else None
+
+
+def order_item_changed(sender, instance, **kwargs):
+    # applies the change of an item to the totals it counts for, without
+    #   recounting the other items
+    quantities = collections.Counter()
+    if kwargs['signal'] is post_delete:
+        previous = (instance.order_id, instance.component_group,
+                    instance.size, instance.total_quantity)
+    else:
+        previous = getattr(instance, '_previous_count', None)
+        quantities[(instance.order_id, instance.component_group,
+                    instance.size or '')] += instance.total_quantity or 0
+    if previous is not None:
+        order_id, component_group, size, quantity = previous
+        quantities[(order_id, component_group, size or '')] -= quantity or 0
+
+    deliveries = {}
+    for (order_id, component_group, size), quantity in quantities.items():
+        if order_id not in deliveries:
+            deliveries[order_id] = order_delivery(order_id)
+        delivery = deliveries[order_id]
+        if delivery is not None and component_group and quantity:
+            ComponentTotal.objects.add(
+                delivery[0], delivery[1], component_group, size, quantity)
+    forget_kitchen_count(*set(delivery[0] for delivery in deliveries.values()
+                              if delivery is not None))
+
+
+def order_delivery(order_id):
+    # (delivery date, route id) of an order, None when it is deleted
+    return Order.objects.filter(id=order_id).values_list(
+        'delivery_date', 'client__route_id').first()
+
+
+def orders_bulk_created(sender, delivery_date, client_ids, **kwargs):
+    # the orders created in bulk do not send post_save: count them all
+    #   at once, leaving the totals of the other clients to the tasks
+    #   creating their orders
+    forget_kitchen_count(delivery_date)
+    ComponentTotal.objects.add_orders(delivery_date, client_ids)
+
+
+def client_saving(sender, instance, **kwargs):
+    # remembers the route of a client, that can change
+    instance._previous_route_id = Client.objects.filter(
+        id=instance.id).values_list('route_id', flat=True).first() \
+        if instance.id is not None else None
+
+
+def client_changed(sender, instance, **kwargs):
+    # the orders of a client that changed route count for its new route
+    previous_route_id = getattr(instance, '_previous_route_id', None)
+    if instance.id is None or previous_route_id == instance.route_id:
+        return
+    delivery_dates = list(Order.objects.filter(
+        client_id=instance.id
+    ).values_list('delivery_date', flat=True).distinct())
+    if delivery_dates:
+        forget_kitchen_count(*delivery_dates)
+        ComponentTotal.objects.refresh(
+            delivery_dates, [previous_route_id, instance.route_id])
+
+
+def menu_component_changed(sender, instance, **kwargs):
+    forget_kitchen_count(*Menu.objects.filter(
+        id=instance.menu_id).values_list('date', flat=True))
+
+
+def component_ingredient_changed(sender, instance, **kwargs):
+    if instance.date:
+        forget_kitchen_count(instance.date)
+    else:
+        forget_kitchen_count()
+
+
+def client_requirement_changed(sender, instance, **kwargs):
+    forget_client_kitchen_counts(instance.client_id)
+
+
+def client_restriction_changed(sender, instance, **kwargs):
+    forget_client_kitchen_counts(instance.client_id)
+    restrictions.clients_changed([instance.client_id])
+
+
+def incompatibility_changed(sender, instance, **kwargs):
+    # the clients with the restricted item must avoid other ingredients
+    client_ids = list(Restriction.objects.filter(
+        restricted_item_id=instance.restricted_item_id
+    ).values_list('client_id', flat=True))
+    if client_ids:
+        forget_client_kitchen_counts(*client_ids)
+        restrictions.clients_changed(client_ids)
+
+
+def name_changed(sender, instance, **kwargs):
+    # the names of the members, routes, components, ingredients,
+    #   restricted items and options show in the counts of any date
+    forget_kitchen_count()
+
+
+HANDLERS = (
+    (Order, order_changed),
+    (Order_item, order_item_changed),
+    (Menu_component, menu_component_changed),
+    (Component_ingredient, component_ingredient_changed),
+    (Restriction, client_restriction_changed),
+    (Client_avoid_ingredient, client_restriction_changed),
+    (Client_avoid_component, client_restriction_changed),
+    (Incompatibility, incompatibility_changed),
+    (Client_option, client_requirement_changed),
+    (Member, name_changed),
+    (Route, name_changed),
+    (Component, name_changed),
+    (Ingredient, name_changed),
+    (Restricted_item, name_changed),
+    (Option, name_changed),
+)
+
+# Remember what a change may move to another date or route
+PRE_SAVE_HANDLERS = (
+    (Order, order_saving),
+    (Order_item, order_item_saving),
+    (Client, client_saving),
+)
+
+
+def connect():
+    # called once the models are loaded, see DeliveryConfig.ready
+    for sender, handler in HANDLERS:
+        post_save.connect(handler, sender=sender,
+                          dispatch_uid='delivery.' + handler.__name__)
+        post_delete.connect(handler, sender=sender,
+                            dispatch_uid='delivery.' + handler.__name__)
+    for sender, handler in PRE_SAVE_HANDLERS:
+        pre_save.connect(handler, sender=sender,
+                         dispatch_uid='delivery.' + handler.__name__)
+    post_save.connect(client_changed, sender=Client,
+                      dispatch_uid='delivery.client_changed')
+    orders_created.connect(orders_bulk_created, sender=Order,
+                           dispatch_uid='delivery.orders_bulk_created')
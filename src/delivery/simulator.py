@@ -0,0 +1,106 @@
+import collections
+
+import numpy
+from django.db.models import Q
+
+from meal.models import (
+    Component, Component_ingredient, COMPONENT_GROUP_CHOICES_MAIN_DISH)
+from order.models import Order, Order_item
+from . import forecast, restrictions
+
+# Clashes of a candidate main dish with the clients of a date
+Clash = collections.namedtuple(
+    'Clash',
+    ['component_id',
+     'clients',  # number of clients that must not be served the dish
+     'meals'])  # number of main dishes these clients would receive
+
+
+def main_dish_candidates(delivery_date, component_ids=None):
+    """Returns the list of (component id, ingredient ids) of the main
+    dishes, with the ingredients chosen for the date or else those of
+    their recipe, loaded with 2 queries.
+
+    Args:
+        delivery_date: Date of the ingredients.
+        component_ids: Only include these main dishes (default: all).
+    """
+    components = Component.objects.filter(
+        component_group=COMPONENT_GROUP_CHOICES_MAIN_DISH)
+    if component_ids is not None:
+        components = components.filter(id__in=component_ids)
+    day = collections.defaultdict(set)
+    recipe = collections.defaultdict(set)
+    for component_id, ingredient_id, date in \
+            Component_ingredient.objects.filter(
+                Q(date=delivery_date) | Q(date__isnull=True),
+                component__in=components
+            ).values_list('component_id', 'ingredient_id', 'date'):
+        (recipe if date is None else day)[component_id].add(ingredient_id)
+    return [(component_id, day.get(component_id) or recipe[component_id])
+            for component_id in components.order_by(
+                'id').values_list('id', flat=True)]
+
+
+def day_main_dishes(delivery_date):
+    """Returns the dictionary of client id: number of main dishes
+    delivered on a date.
+
+    The orders of the date are used when they exist, and the meals the
+    clients would order otherwise, see forecast.expected_meals().
+    """
+    quantities = collections.Counter()
+    for client_id, quantity in Order_item.objects.filter(
+            order__in=Order.objects.get_orders_for_date(delivery_date),
+            component_group=COMPONENT_GROUP_CHOICES_MAIN_DISH
+    ).values_list('order__client_id', 'total_quantity'):
+        quantities[client_id] += quantity or 0
+    if quantities:
+        return quantities
+    for client_id, date, size, items in forecast.expected_meals(
+            [delivery_date]):
+        for component_group, quantity in items:
+            if component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH:
+                quantities[client_id] += quantity
+    return quantities
+
+
+def simulate(delivery_date, candidates=None):
+    """Counts the clients and meals that would clash with each candidate
+    main dish of a date.
+
+    A client clashes with a dish when it avoids the dish or one of its
+    ingredients, or is restricted from one of them, as in the kitchen
+    count. The clients and their main dishes are loaded once, see
+    day_main_dishes(), and the candidates are then matched against all
+    the clients at once with the restrictions.get_index() of the
+    clients, so that every main dish can be ranked while the menu is
+    chosen.
+
+    Args:
+        delivery_date: Date of the meals.
+        candidates: List of (component id, ingredient ids) (default:
+            all the main dishes, see main_dish_candidates()).
+
+    Returns:
+        List of Clash, in the order of the candidates.
+    """
+    if candidates is None:
+        candidates = main_dish_candidates(delivery_date)
+    index = restrictions.get_index()
+    # main dishes of the clients of each row of the index
+    meals = numpy.zeros(len(index.client_ids), dtype=int)
+    for client_id, quantity in day_main_dishes(delivery_date).items():
+        row = index.rows.get(client_id)
+        if row is not None:
+            meals[row] = quantity
+    delivered = meals > 0
+
+    clashes = []
+    for component_id, ingredient_ids in candidates:
+        rows = index.clashing(ingredient_ids, [component_id]) & delivered
+        clashes.append(Clash(
+            component_id,
+            clients=int(numpy.count_nonzero(rows)),
+            meals=int(meals[rows].sum())))
+    return clashes
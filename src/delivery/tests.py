@@ -1,12 +1,42 @@
+import collections
 import datetime
+import glob
+import importlib
 import json
+import math
+import os
+import random
+import tempfile
+import time
 
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.admin.models import LogEntry
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
 from django.core.urlresolvers import reverse_lazy
+from sqlalchemy import and_
+from sqlalchemy.sql import select
 
-from meal.models import Menu, Component, Component_ingredient, Ingredient
-from order.models import Order
-from member.models import Client, Member, Route
+from meal.models import (
+    COMPONENT_GROUP_CHOICES_MAIN_DISH, Menu, Menu_component, Component,
+    Component_ingredient, Incompatibility, Ingredient, Restricted_item)
+from order.generation import generate_orders
+from order.models import Order, Order_item
+from member.models import (
+    Client, ClientScheduledStatus, Client_avoid_component,
+    Client_avoid_ingredient, Client_option, Member, Option, Restriction,
+    Route, DAYS_OF_WEEK)
+from member.apps import db_sa_session, db_sa_table
+from delivery import (
+    benchmarks, forecast, jobs, meal_labels, restrictions, roads, routing,
+    signals, simulator, tsp, vrp)
+from delivery.models import (
+    ComponentTotal, Job, RestrictionChange, RouteTour)
+from delivery.views import drs_make_lines, kcr_make_lines
 
 
 class KitchenCountReportTestCase(TestCase):
@@ -49,7 +79,1110 @@ class KitchenCountReportTestCase(TestCase):
 
         self.client.get('/delivery/kitchen_count/')
         response = self.client.get('/delivery/viewMealLabels/')
-        self.assertTrue('ReportLab' in repr(response.content))
+        self.assertTrue(
+            'ReportLab' in repr(b''.join(response.streaming_content)))
+
+    def test_report_lines_queries(self):
+        """The ingredients, the menu and the component totals of the
+        day are loaded with one query each whatever the number of
+        clients."""
+        today = datetime.date.today()
+        Order.create_orders_on_defaults(today, today, Client.active.all())
+        Menu.create_menu_and_components(
+            today,
+            ['Ginger pork',
+             'Green Salad', 'Fruit Salad',
+             'Day s Dessert', 'Day s Diabetic Dessert',
+             'Day s Pudding', 'Day s Compote'])
+        main_dish = Component.objects.get(name='Ginger pork')
+        for ingredient in Ingredient.objects.all()[:3]:
+            Component_ingredient.objects.create(
+                component=main_dish, ingredient=ingredient, date=today)
+        kitchen_list = Order.get_kitchen_items(today)
+        self.assertGreater(len(kitchen_list), 1)
+        with self.assertNumQueries(3):
+            component_lines, meal_lines = kcr_make_lines(kitchen_list, today)
+        self.assertEqual(
+            component_lines[0].ingredients,
+            ', '.join(i.name for i in Ingredient.objects.all()[:3]))
+
+
+def previous_kitchen_items(delivery_date):
+    # Order.get_kitchen_items() before its queries were consolidated,
+    #   reduced to its results: a dictionary of client id: fields of its
+    #   KitchenItem, see kitchen_fields()
+    tcom = db_sa_table(Component)
+    tmen = db_sa_table(Menu)
+    tmencom = db_sa_table(Menu_component)
+    tresitm = db_sa_table(Restricted_item)
+    ting = db_sa_table(Ingredient)
+    tinc = db_sa_table(Incompatibility)
+    tcoming = db_sa_table(Component_ingredient)
+    tcli = db_sa_table(Client)
+    trou = db_sa_table(Route)
+    tmem = db_sa_table(Member)
+    topt = db_sa_table(Option)
+    tcliopt = db_sa_table(Client_option)
+    tres = db_sa_table(Restriction)
+    tcliavoing = db_sa_table(Client_avoid_ingredient)
+    tcliavocom = db_sa_table(Client_avoid_component)
+    tord = db_sa_table(Order)
+    torditm = db_sa_table(Order_item)
+
+    q_day_avo_ing = select(
+        [tcli.c.id.label('cid'), tmem.c.firstname, tmem.c.lastname,
+         tmencom.c.id.label('menucompid'), ting.c.name.label('ingredient'),
+         torditm.c.order_id.label('oiorderid')]).select_from(
+        tmem.
+        join(tcli, tcli.c.member_id == tmem.c.id).
+        join(tord, tord.c.client_id == tcli.c.id).
+        join(tmen, tmen.c.date == delivery_date).
+        join(tcliavoing, tcliavoing.c.client_id == tcli.c.id).
+        join(ting, ting.c.id == tcliavoing.c.ingredient_id).
+        outerjoin(tcoming, and_(tcoming.c.ingredient_id == ting.c.id,
+                                tcoming.c.date == delivery_date)).
+        outerjoin(tcom, tcom.c.id == tcoming.c.component_id).
+        outerjoin(torditm,
+                  and_(torditm.c.component_group == tcom.c.component_group,
+                       torditm.c.order_id == tord.c.id)).
+        outerjoin(tmencom, and_(tmencom.c.component_id == tcom.c.id,
+                                tmencom.c.menu_id == tmen.c.id))).where(
+        tord.c.delivery_date == delivery_date).order_by(tcli.c.id)
+    q_day_avo_com = select(
+        [tcli.c.id.label('cid'), tmem.c.firstname, tmem.c.lastname,
+         tmencom.c.id.label('menucompid'), tcom.c.name.label('component'),
+         torditm.c.order_id.label('oiorderid')]).select_from(
+        tmem.
+        join(tcli, tcli.c.member_id == tmem.c.id).
+        join(tord, and_(tord.c.client_id == tcli.c.id,
+                        tord.c.delivery_date == delivery_date)).
+        join(tmen, tmen.c.date == delivery_date).
+        join(tcliavocom, tcliavocom.c.client_id == tcli.c.id).
+        join(tcom, tcom.c.id == tcliavocom.c.component_id).
+        outerjoin(torditm,
+                  and_(torditm.c.component_group == tcom.c.component_group,
+                       torditm.c.order_id == tord.c.id)).
+        outerjoin(tmencom, and_(tmencom.c.component_id == tcom.c.id,
+                                tmencom.c.menu_id == tmen.c.id))).where(
+        tord.c.delivery_date == delivery_date).order_by(tcli.c.id)
+    q_day_res = select(
+        [tcli.c.id.label('cid'), tmem.c.firstname, tmem.c.lastname,
+         tmencom.c.id.label('menucompid'),
+         tresitm.c.name.label('restricted_item'),
+         ting.c.name.label('ingredient'),
+         torditm.c.order_id.label('oiorderid')]).select_from(
+        tmem.
+        join(tcli, tcli.c.member_id == tmem.c.id).
+        join(tord, tord.c.client_id == tcli.c.id).
+        join(tmen, tmen.c.date == delivery_date).
+        join(tres, tres.c.client_id == tcli.c.id).
+        join(tresitm, tresitm.c.id == tres.c.restricted_item_id).
+        outerjoin(tinc,
+                  tinc.c.restricted_item_id == tres.c.restricted_item_id).
+        outerjoin(ting, tinc.c.ingredient_id == ting.c.id).
+        outerjoin(tcoming, and_(tcoming.c.ingredient_id == ting.c.id,
+                                tcoming.c.date == delivery_date)).
+        outerjoin(tcom, tcoming.c.component_id == tcom.c.id).
+        outerjoin(torditm,
+                  and_(torditm.c.component_group == tcom.c.component_group,
+                       torditm.c.order_id == tord.c.id)).
+        outerjoin(tmencom, and_(tmencom.c.component_id == tcom.c.id,
+                                tmencom.c.menu_id == tmen.c.id))).where(
+        tord.c.delivery_date == delivery_date).order_by(tcli.c.id)
+    q_day_pre = select(
+        [tcli.c.id.label('cid'), tmem.c.firstname, tmem.c.lastname,
+         topt.c.name.label('food_prep')]).select_from(
+        tmem.
+        join(tcli, tcli.c.member_id == tmem.c.id).
+        join(tcliopt, tcliopt.c.client_id == tcli.c.id).
+        join(topt, topt.c.id == tcliopt.c.option_id).
+        join(tord, tord.c.client_id == tcli.c.id)).where(
+        and_(tord.c.delivery_date == delivery_date,
+             topt.c.option_group == 'preparation'))
+    q_day_del_lis = select(
+        [tcli.c.id.label('cid'), tmem.c.firstname, tmem.c.lastname,
+         trou.c.name.label('routename'),
+         torditm.c.total_quantity, torditm.c.size,
+         tcom.c.id.label('component_id'), tcom.c.component_group,
+         tcom.c.name.label('component_name')]).select_from(
+        tmem.
+        join(tcli, tcli.c.member_id == tmem.c.id).
+        join(trou, trou.c.id == tcli.c.route_id).
+        join(tmen, tmen.c.date == delivery_date).
+        join(tord, tord.c.client_id == tcli.c.id).
+        join(torditm, torditm.c.order_id == tord.c.id).
+        join(tmencom, tmencom.c.menu_id == tmen.c.id).
+        join(tcom, and_(tcom.c.id == tmencom.c.component_id,
+                        tcom.c.component_group ==
+                        torditm.c.component_group))).where(
+        tord.c.delivery_date == delivery_date)
+
+    kitchen_list = {}
+
+    def item(row):
+        return kitchen_list.setdefault(row.cid, {
+            'lastname': row.lastname, 'firstname': row.firstname,
+            'routename': None, 'meal_qty': 0, 'meal_size': '',
+            'incompatible_ingredients': [], 'incompatible_components': [],
+            'other_ingredients': [], 'other_components': [],
+            'restricted_items': [], 'preparation': [],
+            'meal_components': {}})
+
+    for row in db_sa_session.execute(q_day_avo_ing):
+        if row.oiorderid and row.menucompid:
+            item(row)['incompatible_ingredients'].append(row.ingredient)
+        elif row.ingredient not in item(row)['incompatible_ingredients']:
+            item(row)['other_ingredients'].append(row.ingredient)
+    for row in db_sa_session.execute(q_day_avo_com):
+        if row.oiorderid and row.menucompid:
+            item(row)['incompatible_components'].append(row.component)
+        elif row.component not in item(row)['incompatible_components']:
+            item(row)['other_components'].append(row.component)
+    for row in db_sa_session.execute(q_day_res):
+        if row.oiorderid and row.menucompid:
+            item(row)['incompatible_ingredients'].append(row.ingredient)
+        elif row.ingredient and \
+                row.ingredient not in item(row)['incompatible_ingredients']:
+            item(row)['other_ingredients'].append(row.ingredient)
+        if row.restricted_item not in item(row)['restricted_items']:
+            item(row)['restricted_items'].append(row.restricted_item)
+    for row in db_sa_session.execute(q_day_pre):
+        item(row)['preparation'].append(row.food_prep)
+    for row in db_sa_session.execute(q_day_del_lis):
+        fields = item(row)
+        if row.component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH:
+            fields['meal_qty'] += row.total_quantity
+            fields['meal_size'] = row.size
+        fields['meal_components'][row.component_group] = (
+            row.component_id, row.component_name, row.total_quantity)
+        fields['routename'] = row.routename
+    db_sa_session.remove()
+
+    for fields in kitchen_list.values():
+        # the previous lists could hold the same item twice, and an
+        #   ingredient both clashing and not
+        for name in REQUIREMENTS:
+            fields[name] = sorted(set(fields[name]))
+        fields['other_ingredients'] = [
+            ingredient for ingredient in fields['other_ingredients']
+            if ingredient not in fields['incompatible_ingredients']]
+    return kitchen_list
+
+
+# requirement lists of a KitchenItem
+REQUIREMENTS = (
+    'incompatible_ingredients', 'incompatible_components',
+    'other_ingredients', 'other_components', 'restricted_items',
+    'preparation')
+
+
+def kitchen_fields(kitchen_list):
+    # the fields of the KitchenItems of Order.get_kitchen_items(), like
+    #   previous_kitchen_items()
+    return {
+        client_id: dict(
+            {name: getattr(item, name) for name in (
+                'lastname', 'firstname', 'routename', 'meal_qty',
+                'meal_size') + REQUIREMENTS},
+            meal_components={
+                component_group: tuple(component)
+                for component_group, component in
+                item.meal_components.items()})
+        for client_id, item in kitchen_list.items()}
+
+
+class KitchenItemsTestCase(TestCase):
+
+    fixtures = ['delivery_route_data']
+
+    def assertSameKitchenItems(self, delivery_date):
+        previous = previous_kitchen_items(delivery_date)
+        kitchen_list = Order.get_kitchen_items(delivery_date)
+        db_sa_session.remove()
+        self.assertTrue(previous)
+        self.assertEqual(kitchen_fields(kitchen_list), previous)
+        return kitchen_list
+
+    def test_same_as_previous_implementation(self):
+        """The kitchen items of a day with clashes are those of the
+        previous implementation."""
+        delivery_date = datetime.date(2016, 5, 21)
+        Order.create_orders_on_defaults(
+            delivery_date, delivery_date, Client.active.all())
+        Menu.create_menu_and_components(
+            delivery_date,
+            ['Ginger pork',
+             'Green Salad', 'Fruit Salad',
+             'Day s Dessert', 'Day s Diabetic Dessert',
+             'Day s Pudding', 'Day s Compote'])
+        kitchen_list = self.assertSameKitchenItems(delivery_date)
+        self.assertTrue(any(item.incompatible_ingredients
+                            for item in kitchen_list.values()))
+
+    def test_same_as_previous_implementation_synthetic(self):
+        """The kitchen items of a synthetic day are those of the previous
+        implementation."""
+        delivery_date = benchmarks.make_kitchen_day(200, seed=3)
+        kitchen_list = self.assertSameKitchenItems(delivery_date)
+        for name in REQUIREMENTS:
+            self.assertTrue(any(getattr(item, name)
+                                for item in kitchen_list.values()), name)
+
+
+class KitchenCountCacheTestCase(TestCase):
+
+    fixtures = ['delivery_route_data']
+
+    def setUp(self):
+        cache.clear()
+        self.today = datetime.date.today()
+        Order.create_orders_on_defaults(
+            self.today, self.today, Client.active.all())
+        Menu.create_menu_and_components(
+            self.today,
+            ['Ginger pork',
+             'Green Salad', 'Fruit Salad',
+             'Day s Dessert', 'Day s Diabetic Dessert',
+             'Day s Pudding', 'Day s Compote'])
+        self.url = reverse_lazy('delivery:kitchen_count')
+
+    def get_count(self):
+        # returns whether the kitchen items were computed
+        with mock.patch.object(Order, 'get_kitchen_items',
+                               wraps=Order.get_kitchen_items) as items:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return items.called
+
+    def test_reload_uses_cache(self):
+        """Reloading the kitchen count does not compute it again."""
+        self.assertTrue(self.get_count())
+        self.assertFalse(self.get_count())
+
+    def test_order_changes_invalidate(self):
+        """Changes to the orders of the day are reflected at once."""
+        self.get_count()
+        order_item = Order_item.objects.filter(
+            order__delivery_date=self.today).first()
+        order_item.total_quantity += 1
+        order_item.save()
+        self.assertTrue(self.get_count())
+        self.assertFalse(self.get_count())
+        Order.objects.filter(delivery_date=self.today).first().delete()
+        self.assertTrue(self.get_count())
+
+    def test_client_changes_invalidate(self):
+        """Changes to the requirements of a client are reflected at
+        once on the days it has orders, other days are kept."""
+        other_day = datetime.date(2015, 5, 21)
+        self.client.get(reverse_lazy(
+            'delivery:kitchen_count_date',
+            kwargs={'year': '2015', 'month': '05', 'day': '21'}))
+        self.get_count()
+        client = Order.objects.filter(
+            delivery_date=self.today).first().client
+        Restriction.objects.create(
+            client=client, restricted_item=Restricted_item.objects.first())
+        self.assertTrue(self.get_count())
+        self.assertIsNotNone(
+            cache.get(signals.kitchen_count_cache_key(other_day)))
+
+    def test_menu_changes_invalidate(self):
+        """Changing the menu of the day is reflected at once."""
+        self.get_count()
+        Menu_component.objects.filter(menu__date=self.today).delete()
+        self.assertTrue(self.get_count())
+        Component_ingredient.objects.create(
+            component=Component.objects.get(name='Ginger pork'),
+            ingredient=Ingredient.objects.first(),
+            date=self.today)
+        self.assertTrue(self.get_count())
+
+    def test_name_changes_invalidate(self):
+        """Renaming a component, or anything else the count shows, is
+        reflected at once."""
+        self.get_count()
+        component = Component.objects.get(name='Ginger pork')
+        component.name = 'Honey pork'
+        component.save()
+        self.assertTrue(self.get_count())
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Honey pork')
+        self.assertNotContains(response, 'Ginger pork')
+        self.assertFalse(self.get_count())
+        route = Route.objects.first()
+        route.name = 'Renamed route'
+        route.save()
+        self.assertTrue(self.get_count())
+
+
+class MealLabelsTestCase(TestCase):
+
+    fixtures = ['delivery_route_data']
+
+    def setUp(self):
+        cache.clear()
+        self.today = datetime.date.today()
+        Order.create_orders_on_defaults(
+            self.today, self.today, Client.active.all())
+        Menu.create_menu_and_components(
+            self.today,
+            ['Ginger pork',
+             'Green Salad', 'Fruit Salad',
+             'Day s Dessert', 'Day s Diabetic Dessert',
+             'Day s Pudding', 'Day s Compote'])
+        self.kitchen_list = Order.get_kitchen_items(self.today)
+
+    def tearDown(self):
+        for path in glob.glob(meal_labels.labels_path(self.today, '*')):
+            os.remove(path)
+
+    def test_labels_rendered_in_background(self):
+        """The page shows the label count before the labels exist, and
+        leaves them to a job."""
+        with self.settings(DELIVERY_JOBS_EAGER=False):
+            response = self.client.get(reverse_lazy('delivery:kitchen_count'))
+        self.assertEqual(response.context['num_labels'],
+                         meal_labels.count_labels(self.kitchen_list))
+        self.assertGreater(response.context['num_labels'], 0)
+        path = meal_labels.labels_path(
+            self.today,
+            meal_labels.labels_hash(self.today, self.kitchen_list))
+        self.assertFalse(os.path.exists(path))
+        job = Job.objects.get()
+        self.assertEqual(job.kind, Job.MEAL_LABELS)
+        self.assertEqual(job.arguments,
+                         {'delivery_date': self.today.isoformat()})
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.result['file'], path)
+        self.assertTrue(os.path.exists(path))
+
+    def test_unchanged_labels_not_rendered(self):
+        """Labels are named by the hash of the kitchen data and only
+        rendered again when it changes."""
+        path = meal_labels.get_labels_file(
+            self.today, self.kitchen_list)
+        self.assertTrue(os.path.exists(path))
+        with mock.patch.object(meal_labels, 'render_labels') as render:
+            self.assertEqual(meal_labels.get_labels_file(
+                self.today, Order.get_kitchen_items(self.today)), path)
+        render.assert_not_called()
+
+        order_item = Order_item.objects.filter(
+            order__delivery_date=self.today,
+            component_group=COMPONENT_GROUP_CHOICES_MAIN_DISH).first()
+        order_item.total_quantity += 1
+        order_item.save()
+        new_path = meal_labels.get_labels_file(
+            self.today, Order.get_kitchen_items(self.today))
+        self.assertNotEqual(new_path, path)
+        self.assertTrue(os.path.exists(new_path))
+        self.assertFalse(os.path.exists(path))
+
+    def labels_url(self):
+        return reverse_lazy(
+            'delivery:mealLabels_date',
+            kwargs={'year': self.today.strftime('%Y'),
+                    'month': self.today.strftime('%m'),
+                    'day': self.today.strftime('%d')})
+
+    def test_download_labels(self):
+        """The labels of a date can be downloaded."""
+        response = self.client.get(self.labels_url())
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertEqual(int(response['Content-Length']), len(content))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        response = self.client.get(reverse_lazy(
+            'delivery:mealLabels_date',
+            kwargs={'year': '2015', 'month': '05', 'day': '21'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_download_labels_not_modified(self):
+        """The labels are not sent again while they are unchanged."""
+        response = self.client.get(self.labels_url())
+        etag = response['ETag']
+        response = self.client.get(self.labels_url(),
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        order_item = Order_item.objects.filter(
+            order__delivery_date=self.today,
+            component_group=COMPONENT_GROUP_CHOICES_MAIN_DISH).first()
+        order_item.total_quantity += 1
+        order_item.save()
+        response = self.client.get(self.labels_url(),
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_download_labels_range(self):
+        """A part of the labels can be downloaded."""
+        content = b''.join(
+            self.client.get(self.labels_url()).streaming_content)
+        response = self.client.get(self.labels_url(),
+                                   HTTP_RANGE='bytes=10-99')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'],
+                         'bytes 10-99/{}'.format(len(content)))
+        self.assertEqual(b''.join(response.streaming_content),
+                         content[10:100])
+        response = self.client.get(self.labels_url(),
+                                   HTTP_RANGE='bytes=-10')
+        self.assertEqual(b''.join(response.streaming_content),
+                         content[-10:])
+        response = self.client.get(
+            self.labels_url(),
+            HTTP_RANGE='bytes={}-'.format(len(content)))
+        self.assertEqual(response.status_code, 416)
+
+    def test_download_labels_through_nginx(self):
+        """nginx can send the labels file."""
+        with self.settings(MEAL_LABELS_ACCEL_REDIRECT='/protected-labels/'):
+            response = self.client.get(self.labels_url())
+        path = meal_labels.labels_path(
+            self.today, meal_labels.labels_hash(
+                self.today, self.kitchen_list))
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-labels/' + os.path.basename(path))
+        self.assertEqual(response.content, b'')
+
+
+class JobTestCase(TestCase):
+
+    fixtures = ['delivery_route_data']
+
+    def setUp(self):
+        cache.clear()
+        self.today = datetime.date.today()
+
+    def test_run_queued_jobs(self):
+        """Queued jobs wait for the runner, which records their result."""
+        with self.settings(DELIVERY_JOBS_EAGER=False):
+            job = jobs.enqueue(Job.REFRESH_ORDERS,
+                               delivery_date=self.today.isoformat())
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertFalse(Order.objects.filter(
+            delivery_date=self.today).exists())
+        out = StringIO()
+        call_command('runjobs', '--once', stdout=out)
+        self.assertTrue('1 job(s) run' in out.getvalue())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.done, job.total)
+        created = Order.objects.filter(delivery_date=self.today).count()
+        self.assertEqual(job.result, {'deleted': 0, 'created': created})
+        self.assertIsNotNone(job.finished_at)
+
+    def test_same_job_queued_once(self):
+        """A job is not queued again while it is waiting or running."""
+        with self.settings(DELIVERY_JOBS_EAGER=False):
+            job = jobs.enqueue(Job.MEAL_LABELS,
+                               delivery_date=self.today.isoformat())
+            self.assertEqual(jobs.enqueue(
+                Job.MEAL_LABELS, delivery_date=self.today.isoformat()), job)
+            other = jobs.enqueue(Job.MEAL_LABELS, delivery_date='2016-05-21')
+            self.assertNotEqual(other, job)
+            # a job is run by one runner only
+            self.assertTrue(jobs.claim(Job.objects.get(id=job.id)))
+            self.assertFalse(jobs.claim(Job.objects.get(id=job.id)))
+            self.assertEqual(jobs.enqueue(
+                Job.MEAL_LABELS, delivery_date=self.today.isoformat()), job)
+        self.assertEqual(jobs.run_pending(), 1)
+        self.assertEqual(Job.objects.get(id=other.id).status, Job.DONE)
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_stale_job(self):
+        """A job left running by a stopped runner is failed, and does not
+        keep the same job from being queued."""
+        with self.settings(DELIVERY_JOBS_EAGER=False):
+            job = jobs.enqueue(Job.REFRESH_ORDERS,
+                               delivery_date=self.today.isoformat())
+            self.assertTrue(jobs.claim(job))
+            Job.objects.filter(id=job.id).update(
+                heartbeat_at=job.started_at - datetime.timedelta(
+                    seconds=jobs.HEARTBEAT_TIMEOUT + 1))
+            self.assertEqual(jobs.fail_stale(), 1)
+            other = jobs.enqueue(Job.REFRESH_ORDERS,
+                                 delivery_date=self.today.isoformat())
+        self.assertNotEqual(other, job)
+        self.assertEqual(jobs.run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertTrue(job.is_finished)
+        self.assertEqual(Job.objects.get(id=other.id).status, Job.DONE)
+
+    def test_long_job_heartbeat(self):
+        """A job running for long is not failed while its runner records
+        its heartbeat."""
+        with self.settings(DELIVERY_JOBS_EAGER=False):
+            job = jobs.enqueue(Job.MEAL_LABELS,
+                               delivery_date=self.today.isoformat())
+        self.assertTrue(jobs.claim(job))
+        long_ago = job.started_at - datetime.timedelta(days=1)
+        Job.objects.filter(id=job.id).update(
+            started_at=long_ago, heartbeat_at=long_ago)
+        stopped = mock.Mock()
+        stopped.wait.side_effect = [False, True]
+        jobs.beat(job.id, stopped, jobs.HEARTBEAT_INTERVAL)
+        stopped.wait.assert_called_with(jobs.HEARTBEAT_INTERVAL)
+        self.assertEqual(jobs.fail_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertGreater(job.heartbeat_at, long_ago)
+
+    def test_heartbeat_thread(self):
+        """The heartbeat thread of a job stops with the job."""
+        with mock.patch.object(jobs, 'heartbeat_thread') as heartbeat:
+            job = jobs.enqueue(Job.MEAL_LABELS,
+                               delivery_date=self.today.isoformat())
+        self.assertEqual(job.status, Job.DONE)
+        job_id, stopped, interval = heartbeat.call_args[0]
+        self.assertEqual((job_id, interval),
+                         (job.id, jobs.HEARTBEAT_INTERVAL))
+        self.assertTrue(stopped.is_set())
+
+    def test_regenerate_changed_orders(self):
+        """The review orders page can replace the orders of the clients
+        whose meals changed."""
+        response = self.client.get(reverse_lazy('delivery:order'))
+        url = '{}?replace=1'.format(reverse_lazy('delivery:refresh_orders'))
+        self.assertTrue(url.encode() in response.content)
+        with self.settings(DELIVERY_JOBS_EAGER=False):
+            self.client.get(url)
+        self.assertEqual(Job.objects.get().arguments, {
+            'delivery_date': self.today.isoformat(), 'replace': True})
+
+    def test_failed_job(self):
+        """The error of a failed job is recorded."""
+        job = jobs.enqueue(Job.REFRESH_ORDERS, delivery_date='tomorrow')
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertTrue('ValueError' in job.error)
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.FAILED)
+        # only the orders actually generated are logged
+        self.assertFalse(LogEntry.objects.exists())
+
+    def test_refresh_logged_when_done(self):
+        """The generation of the orders is logged once the refresh job
+        is done, not when it is queued."""
+        with self.settings(DELIVERY_JOBS_EAGER=False):
+            self.client.get(reverse_lazy('delivery:refresh_orders'))
+        self.assertFalse(LogEntry.objects.exists())
+        jobs.run_pending()
+        self.assertTrue(LogEntry.objects.get().object_repr.startswith(
+            'Generation of order for '))
+
+    def test_refresh_orders_progress(self):
+        """The review orders page follows the progress of the refresh
+        job it queued."""
+        with self.settings(DELIVERY_JOBS_EAGER=False):
+            response = self.client.get(reverse_lazy('delivery:refresh_orders'))
+        job = Job.objects.get()
+        self.assertEqual(job.arguments, {
+            'delivery_date': self.today.isoformat(), 'replace': False})
+        self.assertRedirects(
+            response,
+            '{}?job={}'.format(reverse_lazy('delivery:order'), job.id))
+        url = reverse_lazy('delivery:job_status', kwargs={'id': job.id})
+        response = self.client.get(response.url)
+        self.assertEqual(response.context['job'], job)
+        self.assertTrue(str(url).encode() in response.content)
+        status = json.loads(self.client.get(url).content.decode('utf-8'))
+        self.assertEqual(status['status'], Job.QUEUED)
+        self.assertFalse(status['finished'])
+
+        jobs.run_pending()
+        status = json.loads(self.client.get(url).content.decode('utf-8'))
+        self.assertEqual(status['status'], Job.DONE)
+        self.assertTrue(status['finished'])
+        self.assertEqual(
+            status['result']['created'],
+            Order.objects.filter(delivery_date=self.today).count())
+        response = self.client.get(reverse_lazy(
+            'delivery:job_status', kwargs={'id': job.id + 1}))
+        self.assertEqual(response.status_code, 404)
+
+
+class ComponentTotalTestCase(TestCase):
+
+    fixtures = ['delivery_route_data']
+
+    def setUp(self):
+        self.today = datetime.date.today()
+        Order.create_orders_on_defaults(
+            self.today, self.today, Client.active.all())
+        Menu.create_menu_and_components(
+            self.today,
+            ['Ginger pork',
+             'Green Salad', 'Fruit Salad',
+             'Day s Dessert', 'Day s Diabetic Dessert',
+             'Day s Pudding', 'Day s Compote'])
+        self.route = Route.objects.get(name='ndg')
+
+    def totals(self, delivery_date=None):
+        # the totals of a date, by route, component group and size
+        return {(total.route_id, total.component_group, total.size):
+                total.total_quantity
+                for total in ComponentTotal.objects.filter(
+                    delivery_date=delivery_date or self.today)}
+
+    def item_totals(self, delivery_date=None):
+        # the same totals summed from the order items
+        totals = collections.Counter()
+        for item in Order_item.objects.filter(
+                order__delivery_date=delivery_date or self.today,
+                component_group__isnull=False).select_related(
+                    'order__client'):
+            totals[(item.order.client.route_id, item.component_group,
+                    item.size or '')] += item.total_quantity
+        return dict(totals)
+
+    def test_totals_follow_order_items(self):
+        """The totals are updated when the order items change."""
+        self.assertTrue(self.totals())
+        self.assertEqual(self.totals(), self.item_totals())
+
+        item = Order_item.objects.filter(
+            order__delivery_date=self.today,
+            component_group=COMPONENT_GROUP_CHOICES_MAIN_DISH).first()
+        item.total_quantity += 2
+        item.save()
+        self.assertEqual(self.totals(), self.item_totals())
+
+        item.delete()
+        self.assertEqual(self.totals(), self.item_totals())
+
+        Order.objects.filter(delivery_date=self.today).first().delete()
+        self.assertEqual(self.totals(), self.item_totals())
+
+    def test_totals_updated_incrementally(self):
+        """A change to the order items only updates their own totals."""
+        order = Order.objects.filter(
+            delivery_date=self.today, orders__isnull=False).first()
+        with mock.patch.object(ComponentTotal.objects, 'refresh') as refresh:
+            item = order.orders.first()
+            item.total_quantity += 1
+            item.save()
+            Order_item.objects.create(
+                order=order, component_group=item.component_group,
+                order_item_type=item.order_item_type, price=item.price,
+                billable_flag=item.billable_flag, total_quantity=1,
+                size=item.size)
+            order.delete()
+        refresh.assert_not_called()
+        self.assertEqual(self.totals(), self.item_totals())
+
+    def test_totals_of_orders_created_in_chunks(self):
+        """The orders created in bulk only add their own items to the
+        totals, without recounting the date."""
+        next_week = self.today + datetime.timedelta(days=7)
+        with mock.patch.object(ComponentTotal.objects, 'refresh') as refresh:
+            generate_orders(self.today, [next_week], workers=1,
+                            chunk_size=2)
+        refresh.assert_not_called()
+        self.assertTrue(self.totals(next_week))
+        self.assertEqual(self.totals(next_week), self.item_totals(next_week))
+
+    def test_totals_follow_clients(self):
+        """The orders of a client count for its current route."""
+        client = Client.active.filter(
+            route=self.route, client_order__delivery_date=self.today).first()
+        client.route = Route.objects.exclude(id=self.route.id).first()
+        client.save()
+        self.assertEqual(self.totals(), self.item_totals())
+
+    def test_totals_follow_delivery_date(self):
+        """An order moved to another date counts for that date."""
+        other_day = datetime.date(2015, 5, 21)
+        order = Order.objects.filter(delivery_date=self.today).first()
+        order.delivery_date = other_day
+        order.save()
+        self.assertEqual(self.totals(), self.item_totals())
+        self.assertEqual(self.totals(other_day), self.item_totals(other_day))
+        self.assertTrue(self.totals(other_day))
+
+    def test_rebuild(self):
+        """The totals can be rebuilt from the order items."""
+        expected = self.totals()
+        ComponentTotal.objects.all().delete()
+        out = StringIO()
+        call_command('rebuildcomponenttotals', self.today.isoformat(),
+                     stdout=out)
+        self.assertEqual(self.totals(), expected)
+        self.assertIn('{} component total(s) rebuilt'.format(len(expected)),
+                      out.getvalue())
+        call_command('rebuildcomponenttotals', stdout=out)
+        self.assertEqual(self.totals(), expected)
+
+    def test_migration_fills_totals(self):
+        """The migration creating the totals fills them from the
+        existing orders."""
+        # items summing to zero have no total
+        Order_item.objects.filter(
+            component_group=COMPONENT_GROUP_CHOICES_MAIN_DISH
+        ).update(total_quantity=0)
+        ComponentTotal.objects.refresh()
+        expected = self.totals()
+        self.assertTrue(expected)
+        ComponentTotal.objects.all().delete()
+        migration = importlib.import_module(
+            'delivery.migrations.0003_componenttotal')
+        migration.fill_component_totals(apps, None)
+        self.assertEqual(self.totals(), expected)
+        self.assertFalse(ComponentTotal.objects.filter(
+            total_quantity=0).exists())
+
+    def test_report_lines(self):
+        """The kitchen count and the route sheet summaries add up the
+        meals of the clients."""
+        kitchen_list = Order.get_kitchen_items(self.today)
+        component_lines, meal_lines = kcr_make_lines(
+            kitchen_list, self.today)
+        self.assertEqual(component_lines[0].component_group,
+                         COMPONENT_GROUP_CHOICES_MAIN_DISH)
+        self.assertEqual(
+            component_lines[0].rqty + component_lines[0].lqty,
+            sum(item.meal_qty for item in kitchen_list.values()))
+
+        route_list = Order.get_delivery_list(self.today, self.route.id)
+        with self.assertNumQueries(1):
+            summary_lines, detail_lines = drs_make_lines(
+                route_list, self.today, self.route.id)
+        main_dish = [line for line in summary_lines if
+                     line.component_group ==
+                     COMPONENT_GROUP_CHOICES_MAIN_DISH][0]
+        self.assertEqual(
+            main_dish.rqty + main_dish.lqty,
+            sum(item.total_quantity
+                for client in route_list.values()
+                for item in client.delivery_items
+                if item.component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH))
+
+
+class KitchenForecastTestCase(TestCase):
+
+    fixtures = ['delivery_route_data']
+
+    def setUp(self):
+        cache.clear()
+        restrictions.reset()
+        self.start_date = datetime.date.today() + datetime.timedelta(days=1)
+
+    def order_totals(self, delivery_date):
+        # number of orders and lines of the orders created on defaults
+        Order.create_orders_on_defaults(
+            delivery_date, delivery_date, Client.active.all())
+        lines = collections.defaultdict(lambda: [0, 0])
+        for total in ComponentTotal.objects.filter(
+                delivery_date=delivery_date):
+            large = (total.component_group ==
+                     COMPONENT_GROUP_CHOICES_MAIN_DISH and
+                     total.size == 'L')
+            lines[total.component_group][large] += total.total_quantity
+        return (Order.objects.filter(delivery_date=delivery_date).count(),
+                {group: tuple(qty) for group, qty in lines.items()})
+
+    def forecast_totals(self, day):
+        return (day.clients,
+                {line.component_group: (line.rqty, line.lqty)
+                 for line in day.lines if line.rqty or line.lqty})
+
+    def test_forecast_matches_orders(self):
+        """The forecast of each day adds up the orders that would be
+        created on the meal defaults of the clients."""
+        days = forecast.forecast(self.start_date, 7)
+        self.assertEqual([day.date for day in days],
+                         [self.start_date + datetime.timedelta(days=k)
+                          for k in range(7)])
+        for day in days:
+            self.assertEqual(self.forecast_totals(day),
+                             self.order_totals(day.date))
+            self.assertGreater(day.clients, 0)
+
+    def test_forecast_queries(self):
+        """The forecast does not query the database for each day."""
+        restrictions.get_index()
+        with self.assertNumQueries(6):
+            forecast.forecast(self.start_date, 1)
+        with self.assertNumQueries(6):
+            forecast.forecast(self.start_date, 14)
+
+    def test_scheduled_status(self):
+        """Clients are paused and resumed on their scheduled dates."""
+        # this client has meals every day
+        client = Client.objects.get(pk=606)
+        clients = [day.clients for day in
+                   forecast.forecast(self.start_date, 7)]
+        ClientScheduledStatus.objects.create(
+            client=client, status_from=Client.ACTIVE,
+            status_to=Client.PAUSED,
+            change_date=self.start_date + datetime.timedelta(days=2))
+        ClientScheduledStatus.objects.create(
+            client=client, status_from=Client.PAUSED,
+            status_to=Client.ACTIVE,
+            change_date=self.start_date + datetime.timedelta(days=4))
+        self.assertEqual(
+            [day.clients for day in forecast.forecast(self.start_date, 7)],
+            clients[:2] + [n - 1 for n in clients[2:4]] + clients[4:])
+
+        # a change that does not apply to the status of the client
+        client.status = Client.PENDING
+        client.save()
+        ClientScheduledStatus.objects.filter(
+            status_from=Client.PAUSED).delete()
+        self.assertEqual(
+            [day.clients for day in forecast.forecast(self.start_date, 7)],
+            [n - 1 for n in clients])
+
+    def test_meals_schedule(self):
+        """Clients with a meals schedule are only delivered on their
+        delivery days."""
+        clients = [day.clients for day in
+                   forecast.forecast(self.start_date, 7)]
+        Option.objects.create(name='meals_schedule', option_group='dish')
+        client = Client.objects.get(pk=606)
+        client.set_meals_schedule(
+            [DAYS_OF_WEEK[self.start_date.weekday()][0]])
+        self.assertEqual(
+            [day.clients for day in forecast.forecast(self.start_date, 7)],
+            clients[:1] + [n - 1 for n in clients[1:]])
+
+    def test_clashes(self):
+        """Clashes are counted like in the kitchen count, for the days
+        that have a menu."""
+        delivery_date = self.start_date
+        Menu.create_menu_and_components(
+            delivery_date,
+            ['Ginger pork',
+             'Green Salad', 'Fruit Salad',
+             'Day s Dessert', 'Day s Diabetic Dessert',
+             'Day s Pudding', 'Day s Compote'])
+        for avoid in Client_avoid_ingredient.objects.filter(
+                client__status=Client.ACTIVE):
+            Component_ingredient.objects.create(
+                component=Component.objects.get(name='Ginger pork'),
+                ingredient=avoid.ingredient, date=delivery_date)
+        days = forecast.forecast(delivery_date, 2)
+        self.assertIsNone(days[1].clashes)
+        self.assertGreater(days[0].clashes, 0)
+
+        Order.create_orders_on_defaults(
+            delivery_date, delivery_date, Client.active.all())
+        kitchen_list = Order.get_kitchen_items(delivery_date)
+        self.assertEqual(
+            days[0].clashes,
+            sum(1 for item in kitchen_list.values()
+                if item.incompatible_ingredients or
+                item.incompatible_components))
+
+    def test_forecast_view(self):
+        """The forecast can be displayed and exported."""
+        url = reverse_lazy('delivery:kitchen_forecast')
+        response = self.client.get(
+            url, {'start': self.start_date.isoformat(), 'days': 14})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['days']), 14)
+
+        response = self.client.get(
+            url, {'start': self.start_date.isoformat(), 'days': 3,
+                  'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = response.content.decode('utf-8').splitlines()
+        self.assertEqual(len(rows), 4)
+        self.assertTrue(rows[0].startswith('Date,Clients,main_dish regular'))
+        self.assertTrue(rows[1].startswith(self.start_date.isoformat()))
+
+        response = self.client.get(url, {'days': 1000})
+        self.assertEqual(len(response.context['days']), forecast.MAX_DAYS)
+
+
+class RestrictionIndexTestCase(TestCase):
+
+    fixtures = ['delivery_route_data']
+
+    def setUp(self):
+        cache.clear()
+        restrictions.reset()
+        self.client_a = Client.objects.get(pk=606)
+        self.ingredient = Ingredient.objects.create(name='Index ingredient')
+
+    def avoiding(self, ingredient_id):
+        # ids of the clients that must avoid an ingredient
+        restricted_items = Incompatibility.objects.filter(
+            ingredient_id=ingredient_id).values('restricted_item_id')
+        return set(Client_avoid_ingredient.objects.filter(
+            ingredient_id=ingredient_id).values_list(
+                'client_id', flat=True)) | set(Restriction.objects.filter(
+                    restricted_item_id__in=restricted_items).values_list(
+                        'client_id', flat=True))
+
+    def test_index(self):
+        """The index finds the clients that avoid ingredients or
+        components."""
+        index = restrictions.get_index()
+        found = 0
+        for ingredient in Ingredient.objects.all():
+            clients = index.clients(index.clashing([ingredient.id]))
+            self.assertEqual(clients, self.avoiding(ingredient.id))
+            found += len(clients)
+        self.assertGreater(found, 0)
+        for avoid in Client_avoid_component.objects.all():
+            self.assertIn(avoid.client_id, index.clients(
+                index.clashing(component_ids=[avoid.component_id])))
+        self.assertEqual(index.clients(index.clashing()), set())
+
+    def test_incremental_update(self):
+        """The index follows the changes to the requirements without
+        being rebuilt."""
+        index = restrictions.get_index()
+        avoid = Client_avoid_ingredient.objects.create(
+            client=self.client_a, ingredient=self.ingredient)
+        with self.assertNumQueries(1):
+            self.assertIs(restrictions.get_index(), index)
+        self.assertEqual(index.clients(index.clashing([self.ingredient.id])),
+                         {self.client_a.id})
+        avoid.delete()
+        self.assertEqual(index.clients(index.clashing([self.ingredient.id])),
+                         set())
+
+        restricted_item = Restricted_item.objects.create(
+            name='Index restriction')
+        Restriction.objects.create(
+            client=self.client_a, restricted_item=restricted_item)
+        Incompatibility.objects.create(
+            restricted_item=restricted_item, ingredient=self.ingredient)
+        self.assertIs(restrictions.get_index(), index)
+        self.assertEqual(index.clients(index.clashing([self.ingredient.id])),
+                         {self.client_a.id})
+
+    def test_changes_of_other_processes(self):
+        """The changes announced by other processes are applied, and the
+        index is rebuilt when they are lost."""
+        index = restrictions.get_index()
+        # a change made by another process
+        Client_avoid_ingredient.objects.bulk_create([Client_avoid_ingredient(
+            client=self.client_a, ingredient=self.ingredient)])
+        restrictions.record_change([self.client_a.id])
+        self.assertIs(restrictions.get_index(), index)
+        self.assertEqual(index.version, RestrictionChange.objects.get().id)
+        self.assertEqual(index.clients(index.clashing([self.ingredient.id])),
+                         {self.client_a.id})
+
+        # the changes are pruned, or not committed yet
+        RestrictionChange.objects.all().delete()
+        restrictions.record_change([self.client_a.id])
+        restrictions.record_change([self.client_a.id])
+        RestrictionChange.objects.order_by('id').first().delete()
+        new_index = restrictions.get_index()
+        self.assertIsNot(new_index, index)
+        self.assertEqual(
+            new_index.clients(new_index.clashing([self.ingredient.id])),
+            {self.client_a.id})
+
+    def test_changes_recorded_on_commit(self):
+        """A change is announced to the other processes once committed."""
+        with mock.patch.object(restrictions.transaction,
+                               'on_commit') as on_commit:
+            Client_avoid_ingredient.objects.create(
+                client=self.client_a, ingredient=self.ingredient)
+        self.assertFalse(RestrictionChange.objects.exists())
+        on_commit.call_args[0][0]()
+        self.assertEqual(RestrictionChange.objects.get().client_ids,
+                         [self.client_a.id])
+
+
+class MealClashesTestCase(TestCase):
+
+    fixtures = ['delivery_route_data']
+
+    def setUp(self):
+        cache.clear()
+        restrictions.reset()
+        self.client_a = Client.objects.get(pk=606)
+        self.ingredient = Ingredient.objects.create(name='Clash ingredient')
+        self.dish = Component.objects.create(
+            name='Clash dish',
+            component_group=COMPONENT_GROUP_CHOICES_MAIN_DISH)
+        Component_ingredient.objects.create(
+            component=self.dish, ingredient=self.ingredient)
+        Client_avoid_ingredient.objects.create(
+            client=self.client_a, ingredient=self.ingredient)
+        # a date without orders, when client_a is delivered
+        self.future = datetime.date.today() + datetime.timedelta(days=1)
+
+    def test_simulate_orders(self):
+        """The clashes of a date with orders count the main dishes
+        ordered by the clashing clients."""
+        order = Order.objects.filter(client=self.client_a).first()
+        quantity = sum(
+            item.total_quantity for item in order.orders.filter(
+                component_group=COMPONENT_GROUP_CHOICES_MAIN_DISH))
+        clashes = simulator.simulate(
+            order.delivery_date,
+            [(self.dish.id, [self.ingredient.id]), (self.dish.id, [])])
+        self.assertEqual(clashes, [
+            simulator.Clash(self.dish.id, clients=1, meals=quantity),
+            simulator.Clash(self.dish.id, clients=0, meals=0)])
+
+    def test_simulate_forecast(self):
+        """Without orders, the clashes count the meals the clients
+        would order."""
+        day = DAYS_OF_WEEK[self.future.weekday()][0]
+        quantity = self.client_a.meal_default_week[
+            COMPONENT_GROUP_CHOICES_MAIN_DISH + '_' + day + '_quantity']
+        clashes = simulator.simulate(self.future)
+        self.assertIn(simulator.Clash(self.dish.id, clients=1,
+                                      meals=quantity), clashes)
+        self.assertEqual(
+            len(clashes), Component.objects.filter(
+                component_group=COMPONENT_GROUP_CHOICES_MAIN_DISH).count())
+
+        # the ingredients chosen for the date replace the recipe
+        Component_ingredient.objects.create(
+            component=self.dish, ingredient=Ingredient.objects.create(
+                name='Other ingredient'), date=self.future)
+        self.assertEqual(
+            simulator.simulate(self.future, simulator.main_dish_candidates(
+                self.future, [self.dish.id])),
+            [simulator.Clash(self.dish.id, clients=0, meals=0)])
+
+    def test_view(self):
+        """The main dishes are ranked by their number of clashes."""
+        response = self.client.get(reverse_lazy('delivery:meal_clashes'), {
+            'date': str(self.future)})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(data['date'], str(self.future))
+        ranks = [(c['clients'], c['meals']) for c in data['candidates']]
+        self.assertEqual(ranks, sorted(ranks))
+        self.assertIn(self.dish.id, [c['id'] for c in data['candidates']])
+
+        response = self.client.post(
+            reverse_lazy('delivery:meal_clashes'),
+            json.dumps({'date': str(self.future), 'candidates': [
+                {'component': self.dish.id, 'ingredients': []}]}),
+            content_type='application/json')
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(data['candidates'], [{
+            'id': self.dish.id, 'name': 'Clash dish',
+            'clients': 0, 'meals': 0}])
+
+        response = self.client.get(reverse_lazy('delivery:meal_clashes'), {
+            'date': 'tomorrow'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_queries(self):
+        """The candidates do not query the database."""
+        restrictions.get_index()
+        with self.assertNumQueries(7):
+            simulator.simulate(self.future)
+        many = [(self.dish.id, [self.ingredient.id])] * 1000
+        with self.assertNumQueries(5):
+            simulator.simulate(self.future, many)
 
 
 class ChooseDayMainDishIngredientsTestCase(TestCase):
@@ -201,6 +1334,25 @@ class RouteSequencingTestCase(TestCase):
             '/delivery/getDailyOrders/?route='+str(self.route_id))
         self.assertTrue(b'Blondin' in response.content)
 
+    def test_get_orders_queries(self):
+        """Waypoints are loaded with the same number of queries
+        whatever the number of clients of the route."""
+        url = reverse_lazy('delivery:dailyOrders')
+        clients = Client.objects.filter(route_id=self.route_id)
+        client_ids = list(clients.values_list('id', flat=True))
+        clients.exclude(id=client_ids[0]).update(route=None)
+        cache.clear()
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'route': self.route_id})
+        few = len(json.loads(response.content.decode('utf-8'))['waypoints'])
+        Client.objects.filter(id__in=client_ids).update(
+            route_id=self.route_id)
+        cache.clear()
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'route': self.route_id})
+        many = len(json.loads(response.content.decode('utf-8'))['waypoints'])
+        self.assertGreater(many, few)
+
     def test_save_route(self):
         """Route save sequence."""
         dic = {"route": [{"id": "4"}],
@@ -211,3 +1363,486 @@ class RouteSequencingTestCase(TestCase):
             json.dumps(dic),
             content_type="application/json")
         self.assertTrue(b'OK' in response.content)
+
+
+def random_tour(seed, size):
+    # reproducible cloud of nodes around Santropol
+    rng = random.Random(seed)
+    return [tsp.Node(i,
+                     45.516564 + rng.uniform(-0.05, 0.05),
+                     -73.575145 + rng.uniform(-0.05, 0.05))
+            for i in range(size)]
+
+
+class TSPSolverTestCase(TestCase):
+
+    def test_delta_same_quality_as_reference(self):
+        """In place 2-opt finds tours as good as the reference 2-opt."""
+        for seed in range(5):
+            tour = random_tour(seed, 25)
+            reference = tsp.optimize(tour, tsp.SOLVER_TWO_OPT)
+            delta = tsp.optimize(tour, tsp.SOLVER_TWO_OPT_DELTA)
+            self.assertAlmostEqual(delta.value, reference.value)
+            self.assertAlmostEqual(
+                tsp.tour_squared_distance(delta.tour), delta.value)
+            self.assertEqual(delta.iterations, reference.iterations)
+
+    def test_first_improvement(self):
+        """First improvement returns a shorter permutation of the tour."""
+        tour = random_tour(42, 30)
+        solved = tsp.solve(tour, first_improvement=True)
+        self.assertEqual(solved[0], tour[0])
+        self.assertEqual(sorted(n.id for n in solved), list(range(30)))
+        self.assertLess(tsp.tour_squared_distance(solved),
+                        tsp.tour_squared_distance(tour))
+
+    def test_improvement_stages(self):
+        """Or-opt and chained search never lose to plain 2-opt."""
+        for seed in range(5):
+            tour = random_tour(seed, 40)
+            two_opt = tsp.optimize(tour, tsp.SOLVER_TWO_OPT_DELTA)
+            or_opt = tsp.optimize(tour, tsp.SOLVER_OR_OPT)
+            chained = tsp.optimize(tour, tsp.SOLVER_CHAINED, seed=seed)
+            self.assertLessEqual(or_opt.value, two_opt.value + 1e-12)
+            self.assertLessEqual(chained.value, or_opt.value + 1e-12)
+            for solution in (or_opt, chained):
+                self.assertEqual(solution.tour[0], tour[0])
+                self.assertEqual(sorted(n.id for n in solution.tour),
+                                 list(range(40)))
+                self.assertAlmostEqual(
+                    tsp.tour_squared_distance(solution.tour),
+                    solution.value)
+
+    def test_or_opt_move(self):
+        """Stops visited out of the way are relocated by Or-opt."""
+        # stops on a circle visited as 0 1 2 4 5 3 6 7
+        angles = [0, 1, 2, 4, 5, 3, 6, 7]
+        tour = [tsp.Node(angle,
+                         math.sin(angle * math.pi / 4),
+                         math.cos(angle * math.pi / 4))
+                for angle in angles]
+        order = list(range(len(tour)))
+        distances = tsp.distance_matrix(tour)
+        self.assertTrue(tsp.or_opt(order, distances))
+        self.assertEqual([tour[i].id for i in order],
+                         [0, 1, 2, 3, 4, 5, 6, 7])
+
+    def test_time_limit(self):
+        """The search stops when the time budget is spent."""
+        tour = random_tour(7, 300)
+        started = time.monotonic()
+        solution = tsp.optimize(tour, tsp.SOLVER_CHAINED, time_limit=0.2)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(len(solution.tour), 300)
+        self.assertLess(solution.value, tsp.tour_squared_distance(tour))
+
+    def test_distance_metrics(self):
+        """Distance matrices in degrees and in meters."""
+        santropol = tsp.Node(None, 45.516564, -73.575145)
+        # one degree north and one degree east of Santropol
+        north = tsp.Node(1, 46.516564, -73.575145)
+        east = tsp.Node(2, 45.516564, -72.575145)
+        nodes = [santropol, north, east]
+
+        squared = tsp.distance_matrix(nodes)
+        for i, a in enumerate(nodes):
+            for j, b in enumerate(nodes):
+                self.assertAlmostEqual(squared[i][j],
+                                       tsp.squared_distance(a, b))
+
+        for metric in (tsp.METRIC_EQUIRECTANGULAR, tsp.METRIC_HAVERSINE):
+            meters = tsp.distance_matrix(nodes, metric)
+            self.assertEqual(meters[0][0], 0)
+            self.assertAlmostEqual(meters[0][1], meters[1][0])
+            self.assertAlmostEqual(meters[0][1] / 1000, 111.2, places=1)
+            # a degree of longitude is shorter at Montreal's latitude
+            self.assertAlmostEqual(meters[0][2] / 1000, 78.0, places=0)
+
+        with self.assertRaises(ValueError):
+            tsp.distance_matrix(nodes, 'manhattan')
+
+    def test_solve_in_meters(self):
+        """Tours are improved for the length in meters."""
+        tour = random_tour(3, 40)
+        meters = tsp.distance_matrix(tour, tsp.METRIC_HAVERSINE).tolist()
+        initial = tsp.tour_length(list(range(40)), meters)
+        solution = tsp.optimize(tour, tsp.SOLVER_OR_OPT,
+                                metric=tsp.METRIC_HAVERSINE)
+        self.assertLess(solution.value, initial)
+        self.assertAlmostEqual(
+            solution.value,
+            tsp.tour_length([tour.index(n) for n in solution.tour],
+                            meters))
+
+    def test_warm_start(self):
+        """Known nodes keep their order, new ones go where cheapest."""
+        # stops on a circle
+        tour = [tsp.Node(angle,
+                         math.sin(angle * math.pi / 4),
+                         math.cos(angle * math.pi / 4))
+                for angle in range(8)]
+        seeded = tsp.warm_start(tour, [7, 6, 5, 4, 2, 1, 99])
+        self.assertEqual([n.id for n in seeded], [0, 7, 6, 5, 4, 3, 2, 1])
+        self.assertEqual(tsp.warm_start(tour, range(8)), tour)
+
+    def test_small_tours(self):
+        """Tours too small to be improved are returned unchanged."""
+        for size in range(4):
+            tour = random_tour(size, size)
+            for solver in tsp.SOLVERS[1:]:
+                self.assertEqual(tsp.solve(tour, solver), tour)
+
+
+class RoadNetworkTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        # Two streets along latitudes 45.50 and 45.51, joined only at
+        #   their west end, like the two banks of a canal
+        rows = ['from_latitude,from_longitude,to_latitude,to_longitude,'
+                'seconds,oneway']
+        for latitude in ('45.50', '45.51'):
+            for k in range(5):
+                rows.append('{0},{1:.2f},{0},{2:.2f},60,0'.format(
+                    latitude, -73.60 + k / 100, -73.59 + k / 100))
+        rows.append('45.50,-73.60,45.51,-73.60,60,1')
+        self.path = os.path.join(self.directory.name, 'roads.csv')
+        with open(self.path, 'w') as f:
+            f.write('\n'.join(rows))
+        self.graph = roads.RoadGraph.from_csv(self.path)
+        self.nodes = [tsp.Node(1, 45.50, -73.55), tsp.Node(2, 45.51, -73.55),
+                      tsp.Node(3, 45.50, -73.58)]
+
+    def test_road_durations(self):
+        """Durations follow the streets and are symmetric."""
+        provider = roads.RoadNetworkProvider(self.graph)
+        durations = provider.matrix(self.nodes)
+        self.assertTrue((durations == durations.T).all())
+        # 5 blocks west, cross, 5 blocks east; back with the one-way
+        #   street unavailable is only possible across the gap
+        self.assertGreater(durations[0, 1], 5 * 60)
+        self.assertAlmostEqual(durations[0, 2], 3 * 60)
+        self.assertEqual(durations[0, 0], 0)
+
+    def test_duration_cache(self):
+        """Durations between addresses are only computed once."""
+        cache_path = os.path.join(self.directory.name, 'durations.db')
+        provider = roads.RoadNetworkProvider(
+            self.graph, roads.DurationCache(cache_path))
+        first = provider.matrix(self.nodes)
+        provider = roads.RoadNetworkProvider(
+            roads.RoadGraph.from_csv(self.path),
+            roads.DurationCache(cache_path))
+        with mock.patch.object(roads.RoadGraph, 'durations') as durations:
+            second = provider.matrix(list(reversed(self.nodes)))
+        durations.assert_not_called()
+        self.assertTrue((second == first[::-1, ::-1]).all())
+
+    def test_solve_with_provider(self):
+        """A provider can be used wherever a metric is expected."""
+        tour = [tsp.Node(None, 45.50, -73.60)] + self.nodes
+        solution = tsp.optimize(tour, tsp.SOLVER_OR_OPT,
+                                metric=roads.RoadNetworkProvider(self.graph))
+        self.assertEqual(sorted(n.id for n in solution.tour[1:]), [1, 2, 3])
+        haversine = tsp.optimize(tour, tsp.SOLVER_OR_OPT,
+                                 metric=tsp.HaversineProvider())
+        self.assertAlmostEqual(
+            haversine.value,
+            tsp.optimize(tour, tsp.SOLVER_OR_OPT,
+                         metric=tsp.METRIC_HAVERSINE).value)
+
+    def test_distance_provider_setting(self):
+        """The road network is used when it is configured."""
+        with self.settings(DELIVERY_ROAD_NETWORK=None):
+            self.assertEqual(routing.distance_provider().name,
+                             tsp.METRIC_HAVERSINE)
+        with self.settings(DELIVERY_ROAD_NETWORK=self.path,
+                           DELIVERY_DURATION_CACHE=None):
+            provider = routing.distance_provider()
+            self.assertIsInstance(provider, roads.RoadNetworkProvider)
+            self.assertIs(routing.distance_provider(), provider)
+
+
+class BenchmarkTestCase(TestCase):
+
+    def test_instances_are_reproducible(self):
+        """The same seed always generates the same instance."""
+        for layout in benchmarks.LAYOUTS:
+            first = benchmarks.make_instance(30, layout, seed=4)
+            second = benchmarks.make_instance(30, layout, seed=4)
+            self.assertEqual(len(first), 31)
+            self.assertEqual([(n.latitude, n.longitude) for n in first],
+                             [(n.latitude, n.longitude) for n in second])
+
+    def test_benchmark_report(self):
+        """The JSON report has a result for each instance and solver."""
+        out = StringIO()
+        call_command('benchmark', '--sizes', '20', '--seeds', '2',
+                     '--solvers', 'two_opt_delta,chained', stdout=out)
+        report = json.loads(out.getvalue())
+        # the solves have a budget by default
+        self.assertEqual(report['time_limit'], benchmarks.TIME_LIMIT)
+        self.assertEqual(len(report['results']),
+                         2 * len(benchmarks.LAYOUTS) * 2)
+        for result in report['results']:
+            self.assertLessEqual(result['length'], result['initial_length'])
+        self.assertEqual(report['summary']['chained']['instances'], 4)
+        self.assertLessEqual(report['summary']['chained']['gap'],
+                             report['summary']['two_opt_delta']['gap'])
+
+    def test_kitchen_benchmark(self):
+        """The kitchen count is measured on a day that is rolled back."""
+        report = benchmarks.run_kitchen(num_orders=50, repeat=1)
+        self.assertEqual(report['orders'], 50)
+        self.assertEqual(report['clients'], 50)
+        self.assertGreater(report['clashes'], 0)
+        self.assertGreater(report['memory']['peak'], 0)
+        self.assertGreaterEqual(report['memory']['peak'],
+                                report['memory']['retained'])
+        self.assertFalse(Order.objects.filter(
+            delivery_date=benchmarks.KITCHEN_DAY).exists())
+
+
+class VRPSolverTestCase(TestCase):
+
+    def setUp(self):
+        self.depot = tsp.Node(None, 45.516564, -73.575145)
+        self.stops = random_tour(11, 120)
+        rng = random.Random(11)
+        self.demands = [rng.choice([1, 1, 2, 3]) for stop in self.stops]
+
+    def test_capacity_and_balance(self):
+        """Every stop is served once and no route is over capacity."""
+        plan = vrp.solve(self.depot, self.stops, self.demands, 4,
+                         capacity=80)
+        self.assertEqual(len(plan.tours), 4)
+        served = [node.id for tour in plan.tours for node in tour[1:]]
+        self.assertEqual(sorted(served), list(range(120)))
+        self.assertEqual(plan.unassigned, [])
+        share = sum(self.demands) / 4
+        for tour, load in zip(plan.tours, plan.loads):
+            self.assertIs(tour[0], self.depot)
+            self.assertLessEqual(load, 80)
+            self.assertLess(abs(load - share), share * 0.25)
+
+    def test_not_enough_capacity(self):
+        """Stops that cannot fit are reported as unassigned."""
+        plan = vrp.solve(self.depot, self.stops, self.demands, 2,
+                         capacity=50)
+        served = [node for tour in plan.tours for node in tour[1:]]
+        self.assertEqual(len(served) + len(plan.unassigned), 120)
+        self.assertTrue(plan.unassigned)
+        self.assertTrue(all(load <= 50 for load in plan.loads))
+
+    def test_large_day(self):
+        """A day of 600 deliveries is planned in seconds."""
+        stops = random_tour(5, 600)
+        started = time.monotonic()
+        plan = vrp.solve(self.depot, stops, [1] * 600, 10, capacity=70,
+                         time_limit=5)
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual(sum(plan.loads), 600)
+
+    def test_match_routes(self):
+        """Groups keep the route already serving most of their stops."""
+        groups = [[1, 2, 3], [4, 5], [6]]
+        current = {1: 'b', 2: 'b', 3: 'a', 4: 'a', 5: 'a', 6: None}
+        self.assertEqual(
+            vrp.match_routes(groups, current, ['a', 'b', 'c']),
+            ['b', 'a', 'c'])
+
+
+class RoutePlanningTestCase(TestCase):
+
+    fixtures = ['delivery_route_data']
+
+    def setUp(self):
+        self.today = datetime.date.today()
+        Order.create_orders_on_defaults(
+            self.today, self.today, Client.active.all())
+
+    def test_daily_routes(self):
+        """The day's geolocated orders are split between the routes."""
+        response = self.client.get(
+            reverse_lazy('delivery:dailyRoutes'), {'capacity': 1000})
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(len(data['routes']), Route.objects.count())
+        planned = [waypoint['id'] for route in data['routes']
+                   for waypoint in route['waypoints']]
+        geolocated = Order.objects.get_orders_for_date(self.today).filter(
+            client__member__address__latitude__isnull=False,
+            client__member__address__longitude__isnull=False)
+        self.assertEqual(
+            sorted(planned + [w['id'] for w in data['unassigned']]),
+            sorted(o.client.member.id for o in geolocated))
+        self.assertTrue(b'Blondin' in response.content)
+
+    def test_daily_routes_bad_request(self):
+        """Invalid parameters are rejected."""
+        response = self.client.get(
+            reverse_lazy('delivery:dailyRoutes'), {'capacity': 'many'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_plan_routes_command(self):
+        """The proposal is printed by the planroutes command."""
+        out = StringIO()
+        call_command('planroutes', str(self.today), '--json', stdout=out)
+        data = json.loads(out.getvalue())
+        self.assertEqual(len(data['routes']), Route.objects.count())
+
+
+class OptimizeRoutesTestCase(TestCase):
+
+    fixtures = ['delivery_route_data']
+
+    def setUp(self):
+        cache.clear()
+        self.today = datetime.date.today()
+        Order.create_orders_on_defaults(
+            self.today, self.today, Client.active.all())
+
+    def test_optimize_routes_command(self):
+        """A tour is stored for each route with orders."""
+        out = StringIO()
+        call_command('optimizeroutes', str(self.today), '--workers', '1',
+                     '--time_limit', '1', stdout=out)
+        stops = routing.get_day_stops(self.today)
+        route_ids = set(stop['client__route_id'] for stop in stops)
+        tours = RouteTour.objects.filter(delivery_date=self.today)
+        self.assertEqual(set(t.route_id for t in tours), route_ids)
+        for route_tour in tours:
+            self.assertEqual(
+                sorted(route_tour.client_id_sequence),
+                sorted(stop['client_id'] for stop in stops
+                       if stop['client__route_id'] == route_tour.route_id))
+        self.assertTrue('optimized' in out.getvalue())
+
+    def test_optimize_routes_job(self):
+        """The optimization can be queued for the runjobs command."""
+        with self.settings(DELIVERY_JOBS_EAGER=False):
+            call_command('optimizeroutes', str(self.today), '--workers', '1',
+                         '--time_limit', '1', '--queue', stdout=StringIO())
+        self.assertFalse(RouteTour.objects.exists())
+        self.assertEqual(jobs.run_pending(), 1)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(
+            sorted(job.result['routes']),
+            sorted(RouteTour.objects.filter(
+                delivery_date=self.today).values_list('route_id', flat=True)))
+
+    def test_daily_orders_use_stored_tour(self):
+        """The stored tour is served without searching."""
+        route_tour = routing.optimize_routes(self.today, workers=1)[0]
+        cache.clear()
+        with mock.patch.object(tsp, 'solve') as solve:
+            response = self.client.get(
+                reverse_lazy('delivery:dailyOrders'),
+                {'route': route_tour.route_id})
+        solve.assert_not_called()
+        data = json.loads(response.content.decode('utf-8'))
+        members = dict(Client.objects.filter(
+            id__in=route_tour.client_id_sequence
+        ).values_list('id', 'member_id'))
+        self.assertEqual(
+            [waypoint['id'] for waypoint in data['waypoints']],
+            [members[i] for i in route_tour.client_id_sequence])
+
+    def test_saved_route_replaces_stored_tour(self):
+        """A sequence saved by a driver is served instead of the stored
+        tour."""
+        route_tour = routing.optimize_routes(self.today, workers=1)[0]
+        saved = list(reversed(route_tour.client_id_sequence))
+        members = dict(Client.objects.filter(
+            id__in=saved).values_list('id', 'member_id'))
+        self.client.post(
+            reverse_lazy('delivery:saveRoute'),
+            json.dumps({'route': [{'id': route_tour.route_id}],
+                        'members': [{'id': members[i]} for i in saved]}),
+            content_type='application/json')
+        self.assertFalse(RouteTour.objects.filter(
+            route_id=route_tour.route_id).exists())
+        with mock.patch.object(tsp, 'solve',
+                               side_effect=lambda tour, **kw: tour):
+            response = self.client.get(
+                reverse_lazy('delivery:dailyOrders'),
+                {'route': route_tour.route_id})
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual([waypoint['id'] for waypoint in data['waypoints']],
+                         [members[i] for i in saved])
+
+    def test_stored_tour_signature_has_metric(self):
+        """A tour stored for another metric is not served as is."""
+        route_tour = routing.optimize_routes(
+            self.today, workers=1, metric=tsp.METRIC_EQUIRECTANGULAR)[0]
+        cache.clear()
+        with mock.patch.object(tsp, 'solve',
+                               side_effect=lambda tour, **kw: tour) as solve:
+            self.client.get(reverse_lazy('delivery:dailyOrders'),
+                            {'route': route_tour.route_id})
+        solve.assert_called_once_with(
+            mock.ANY, solver=tsp.SOLVER_OR_OPT, time_limit=mock.ANY,
+            metric=mock.ANY)
+
+
+class RouteTourCacheTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.date = datetime.date(2016, 9, 14)
+        self.nodes = [tsp.Node(None, *routing.SANTROPOL)] + \
+            random_tour(8, 30)
+
+    def test_cache_hit(self):
+        """Unchanged stops are sequenced without searching."""
+        first = routing.sequence_route(1, self.date, self.nodes)
+        shuffled = self.nodes[:1] + list(reversed(self.nodes[1:]))
+        with mock.patch.object(tsp, 'solve') as solve:
+            second = routing.sequence_route(1, self.date, shuffled)
+        solve.assert_not_called()
+        self.assertEqual([n.id for n in second], [n.id for n in first])
+        # another route or weekday is solved on its own
+        with mock.patch.object(tsp, 'solve', return_value=self.nodes):
+            routing.sequence_route(2, self.date, self.nodes)
+            routing.sequence_route(
+                1, self.date + datetime.timedelta(1), self.nodes)
+            self.assertEqual(tsp.solve.call_count, 2)
+
+    def test_cache_repair(self):
+        """Added, removed and moved stops repair the cached tour."""
+        routing.sequence_route(1, self.date, self.nodes)
+        moved = tsp.Node(self.nodes[3].id, 45.53, -73.58)
+        added = tsp.Node(100, 45.50, -73.56)
+        changed = self.nodes[:3] + [moved] + self.nodes[5:] + [added]
+        with mock.patch.object(tsp, 'solve',
+                               side_effect=lambda tour, **kw: tour) as solve:
+            tour = routing.sequence_route(1, self.date, changed)
+        self.assertEqual(solve.call_args[1]['solver'], tsp.SOLVER_OR_OPT)
+        self.assertEqual(sorted(n.id for n in tour[1:]),
+                         sorted(n.id for n in changed[1:]))
+        self.assertIs(tour[0], changed[0])
+
+    def test_warm_start_from_saved_sequence(self):
+        """Without cached tour the search starts from the saved order."""
+        saved = [n.id for n in reversed(self.nodes[1:20])]
+        with mock.patch.object(tsp, 'solve',
+                               side_effect=lambda tour, **kw: tour) as solve:
+            tour = routing.sequence_route(1, self.date, self.nodes,
+                                          sequence=saved)
+        self.assertEqual(solve.call_args[1]['solver'], tsp.SOLVER_OR_OPT)
+        ids = [n.id for n in tour[1:]]
+        self.assertEqual([i for i in ids if i in saved], saved)
+        self.assertEqual(sorted(ids), sorted(n.id for n in self.nodes[1:]))
+
+    def test_save_route_resets_cached_tour(self):
+        """A saved sequence replaces the cached tour of the weekday."""
+        today = datetime.date.today()
+        routing.sequence_route(1, today, self.nodes)
+        routing.forget_route_tour(1, today)
+        saved = [n.id for n in self.nodes[1:]]
+        with mock.patch.object(tsp, 'solve',
+                               side_effect=lambda tour, **kw: tour):
+            tour = routing.sequence_route(1, today, self.nodes,
+                                          sequence=saved)
+        self.assertEqual([n.id for n in tour[1:]], saved)
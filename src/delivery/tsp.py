@@ -1,4 +1,8 @@
 import itertools
+import random
+import time
+
+import numpy
 
 
 class Node:
@@ -16,9 +20,94 @@ class Node:
 
 
 class Solution:
-    def __init__(self, tour, value):
+    def __init__(self, tour, value, iterations=0):
         self.tour = tour
         self.value = value
+        # number of improving moves applied to reach the tour
+        self.iterations = iterations
+
+
+# Available local search engines for solve().
+#   SOLVER_TWO_OPT builds every 2-opt neighbor as a new list and sums
+#     the whole tour for each of them: O(n^3) per improvement.
+#   SOLVER_TWO_OPT_DELTA scores each 2-opt move from the four edges it
+#     changes and applies the chosen move in place: O(n^2) per
+#     improvement, without allocation in the search loop.
+#   SOLVER_OR_OPT chains 2-opt with Or-opt moves (relocation of a
+#     segment of 1 to 3 stops, possibly reversed, which are 3-opt
+#     moves) until neither finds an improvement ("or-2opt").
+#   SOLVER_CHAINED escapes the local optima of SOLVER_OR_OPT in the
+#     manner of Chained Lin-Kernighan: the best tour is perturbed with
+#     a random double-bridge move and improved again, and the result
+#     is kept when shorter.
+SOLVER_TWO_OPT = 'two_opt'
+SOLVER_TWO_OPT_DELTA = 'two_opt_delta'
+SOLVER_OR_OPT = 'or_opt'
+SOLVER_CHAINED = 'chained'
+
+SOLVERS = (
+    SOLVER_TWO_OPT,
+    SOLVER_TWO_OPT_DELTA,
+    SOLVER_OR_OPT,
+    SOLVER_CHAINED,
+)
+
+# Lengths of the segments relocated by Or-opt moves
+OR_OPT_SEGMENT_LENGTHS = (1, 2, 3)
+
+# Available metrics for the distance matrix.
+#   METRIC_SQUARED_EUCLIDEAN is the squared difference of latitudes
+#     and longitudes in degrees, as if the world was a flat square.
+#   METRIC_EQUIRECTANGULAR projects the coordinates on a plane tangent
+#     at the mean latitude of each pair (in Montreal a degree of
+#     longitude is only ~78 km while a degree of latitude is ~111 km)
+#     and returns meters. Very close to METRIC_HAVERSINE at city
+#     scale, and cheaper.
+#   METRIC_HAVERSINE is the great-circle distance in meters.
+METRIC_SQUARED_EUCLIDEAN = 'squared_euclidean'
+METRIC_EQUIRECTANGULAR = 'equirectangular'
+METRIC_HAVERSINE = 'haversine'
+
+METRICS = (
+    METRIC_SQUARED_EUCLIDEAN,
+    METRIC_EQUIRECTANGULAR,
+    METRIC_HAVERSINE,
+)
+
+# Mean radius of the Earth in meters
+EARTH_RADIUS = 6371008.8
+
+
+class DistanceProvider:
+    """Measures the distance between nodes.
+
+    A provider can be given instead of one of METRICS wherever a
+    metric is expected. Subclasses implement matrix(), and may return
+    durations rather than lengths, as long as the matrix is symmetric.
+    """
+    # Identifies the provider, for instance in cache keys
+    name = None
+
+    def matrix(self, nodes):
+        """Returns the matrix (numpy.ndarray) of the distance between
+        all pairs of nodes."""
+        raise NotImplementedError
+
+
+class EuclideanProvider(DistanceProvider):
+    """Straight line distance in meters (METRIC_EQUIRECTANGULAR)."""
+    name = METRIC_EQUIRECTANGULAR
+
+    def matrix(self, nodes):
+        return distance_matrix(nodes, METRIC_EQUIRECTANGULAR)
+
+
+class HaversineProvider(DistanceProvider):
+    """Great-circle distance in meters (METRIC_HAVERSINE)."""
+    name = METRIC_HAVERSINE
+
+    def matrix(self, nodes):
+        return distance_matrix(nodes, METRIC_HAVERSINE)
 
 
 def pairwise(iterable):
@@ -36,7 +125,9 @@ def reverse_subtour(tour, start, end):
     return tour[:start] + list(reversed(tour[start:end + 1])) + tour[end + 1:]
 
 
-def solve(tour):
+def solve(tour, solver=SOLVER_TWO_OPT_DELTA, first_improvement=False,
+          time_limit=None, kicks=None, seed=0,
+          metric=METRIC_SQUARED_EUCLIDEAN):
     """Solves the Traveling Salesman Problem (TSP) with a heuristic.
 
     Args:
@@ -44,11 +135,115 @@ def solve(tour):
             starts and ends at the same node, the last node in the
             list must be the last destination visited before returning
             to the starting point.
+        solver: One of SOLVERS, the local search engine to use.
+        first_improvement: Apply the first improving 2-opt move found
+            instead of the best one of the neighborhood.
+        time_limit: Wall-clock budget in seconds. When it is spent the
+            best tour found so far is returned. Not supported by
+            SOLVER_TWO_OPT.
+        kicks: With SOLVER_CHAINED, maximum number of perturbations of
+            the best tour (default: the number of nodes).
+        seed: With SOLVER_CHAINED, seed of the random perturbations,
+            so that a given tour is always solved the same way.
+        metric: One of METRICS or a DistanceProvider, how the
+            distance between two nodes is measured. SOLVER_TWO_OPT
+            only supports METRIC_SQUARED_EUCLIDEAN.
 
     Returns:
         A tour with a distance less or equal to the distance of the
-        initial tour.
+        initial tour. The first node of the tour is never moved.
+
+    """
+    return optimize(tour, solver, first_improvement,
+                    time_limit, kicks, seed, metric).tour
+
+
+def optimize(tour, solver=SOLVER_TWO_OPT_DELTA, first_improvement=False,
+             time_limit=None, kicks=None, seed=0,
+             metric=METRIC_SQUARED_EUCLIDEAN):
+    """Same as solve() but returns a Solution with the tour value and
+    the number of improving moves that were applied."""
+
+    if solver not in SOLVERS:
+        raise ValueError("Unknown TSP solver: {}".format(solver))
+    if solver == SOLVER_TWO_OPT:
+        if metric != METRIC_SQUARED_EUCLIDEAN:
+            raise ValueError("{} only supports {}".format(
+                SOLVER_TWO_OPT, METRIC_SQUARED_EUCLIDEAN))
+        return solve_two_opt(tour)
+    if not tour:
+        return Solution([], 0)
 
+    deadline = None
+    if time_limit is not None:
+        deadline = time.monotonic() + time_limit
+    # The matrix is computed once with NumPy, then converted to lists
+    # because indexing lists is much faster than indexing arrays one
+    # element at a time in the search loops.
+    distances = distance_matrix(tour, metric).tolist()
+    order = list(range(len(tour)))
+    if solver == SOLVER_TWO_OPT_DELTA:
+        iterations = two_opt(order, distances, first_improvement, deadline)
+    elif solver == SOLVER_OR_OPT:
+        iterations = or_two_opt(order, distances, first_improvement,
+                                deadline)
+    else:
+        iterations = chained_search(order, distances, first_improvement,
+                                    deadline, kicks, random.Random(seed))
+    return Solution([tour[i] for i in order],
+                    tour_length(order, distances),
+                    iterations)
+
+
+def warm_start(tour, sequence, metric=METRIC_SQUARED_EUCLIDEAN):
+    """Builds a tour that follows a previously known sequence.
+
+    Args:
+        tour: List of nodes (Node), the first one being the starting
+            point, which stays first.
+        sequence: Ids of nodes in the order of a previous tour. Ids
+            that are not in the tour are ignored.
+        metric: One of METRICS or a DistanceProvider.
+
+    Returns:
+        A new list with the nodes of the tour that are in sequence, in
+        that order, and the other nodes inserted where they lengthen
+        the tour the least. It is a good starting point for solve().
+    """
+    position = {node_id: k for k, node_id in enumerate(sequence)}
+    known = sorted((i for i in range(1, len(tour))
+                    if tour[i].id in position),
+                   key=lambda i: position[tour[i].id])
+    new = [i for i in range(1, len(tour)) if tour[i].id not in position]
+    order = [0] + known
+    if new:
+        distances = distance_matrix(tour, metric).tolist()
+        cheapest_insertion(order, distances, new)
+    return [tour[i] for i in order]
+
+
+def cheapest_insertion(order, distances, indices):
+    """Inserts indices one by one in the tour order, in place, each
+    between the two consecutive stops where it costs the least."""
+    for x in indices:
+        from_x = distances[x]
+        best_cost = None
+        best_position = len(order)
+        for position in range(len(order)):
+            a = order[position]
+            b = order[position + 1] if position + 1 < len(order) \
+                else order[0]
+            cost = distances[a][x] + from_x[b] - distances[a][b]
+            if best_cost is None or cost < best_cost:
+                best_cost = cost
+                best_position = position + 1
+        order.insert(best_position, x)
+
+
+def solve_two_opt(tour):
+    """Reference implementation of the 2-opt local search.
+
+    Every neighbor is built as a new list and valued from scratch.
     """
 
     # This function implements a local search heuristic with a 2-opt
@@ -73,9 +268,278 @@ def solve(tour):
 
         if best_candidate.value < best_solution.value:
             improved = True
-            best_solution = best_candidate
+            best_solution = Solution(best_candidate.tour,
+                                     best_candidate.value,
+                                     best_solution.iterations + 1)
+
+    return best_solution
+
+
+def two_opt(order, distances, first_improvement=False, deadline=None):
+    """Improves a tour in place with 2-opt moves.
+
+    Args:
+        order: List of indices in distances, modified in place. The
+            first index is never moved.
+        distances: Symmetric matrix (list of lists) of edge values.
+        first_improvement: Apply the first improving move found
+            instead of the best one of the neighborhood.
+        deadline: time.monotonic() value after which the search stops.
+
+    Returns:
+        The number of improving moves applied.
+
+    A move reverses order[start:end + 1]. Only the edges (a, b) and
+    (c, d) around the reversed subtour change, becoming (a, c) and
+    (b, d), so each move is valued in constant time.
+    """
+    n = len(order)
+    if n < 4:
+        return 0
+    tolerance = improvement_tolerance(order, distances)
+
+    iterations = 0
+    improved = True
+    while improved:
+        improved = False
+        best_delta = -tolerance
+        best_move = None
+        for start in range(1, n - 1):
+            if expired(deadline):
+                break
+            a = order[start - 1]
+            b = order[start]
+            from_a = distances[a]
+            from_b = distances[b]
+            removed_ab = from_a[b]
+            for end in range(start + 1, n):
+                c = order[end]
+                d = order[end + 1] if end + 1 < n else order[0]
+                delta = (from_a[c] + from_b[d] -
+                         removed_ab - distances[c][d])
+                if delta < best_delta:
+                    best_delta = delta
+                    best_move = (start, end)
+                    if first_improvement:
+                        break
+            if best_move and first_improvement:
+                break
+
+        if best_move:
+            start, end = best_move
+            order[start:end + 1] = order[end:start - 1:-1]
+            iterations += 1
+            improved = True
+
+    return iterations
+
+
+def or_opt(order, distances, deadline=None):
+    """Improves a tour in place with Or-opt moves.
+
+    A move takes a segment of OR_OPT_SEGMENT_LENGTHS consecutive stops
+    out of the tour and inserts it, in the same or in the reverse
+    direction, between two other consecutive stops. Only the three
+    edges around the segment and the insertion point change, so each
+    move is valued in constant time. The first improving move found
+    is applied.
+
+    Args and Returns: as for two_opt(). The distances must be
+    symmetric.
+    """
+    n = len(order)
+    if n < 4:
+        return 0
+    tolerance = improvement_tolerance(order, distances)
+
+    iterations = 0
+    improved = True
+    while improved:
+        improved = False
+        for length in OR_OPT_SEGMENT_LENGTHS:
+            for start in range(1, n - length + 1):
+                if expired(deadline):
+                    return iterations
+                end = start + length - 1
+                p = order[start - 1]
+                first = order[start]
+                last = order[end]
+                q = order[end + 1] if end + 1 < n else order[0]
+                gain = (distances[p][first] + distances[last][q] -
+                        distances[p][q])
+                if gain <= tolerance:
+                    continue
+                move = find_segment_insertion(
+                    order, distances, start, end, gain - tolerance)
+                if move:
+                    insert_after, reverse = move
+                    move_segment(order, start, end, insert_after, reverse)
+                    iterations += 1
+                    improved = True
+                    break
+            if improved:
+                break
+
+    return iterations
+
+
+def find_segment_insertion(order, distances, start, end, gain):
+    """Finds where the segment order[start:end + 1] can be inserted
+    for a cost lower than the gain of removing it.
+
+    Returns:
+        (position of the stop the segment is inserted after,
+         True if the segment is reversed) or None.
+    """
+    n = len(order)
+    first = order[start]
+    last = order[end]
+    from_first = distances[first]
+    from_last = distances[last]
+    for i in itertools.chain(range(0, start - 1), range(end + 1, n)):
+        c = order[i]
+        e = order[i + 1] if i + 1 < n else order[0]
+        removed_ce = distances[c][e]
+        if from_first[c] + from_last[e] - removed_ce < gain:
+            return (i, False)
+        if from_last[c] + from_first[e] - removed_ce < gain:
+            return (i, True)
+    return None
+
+
+def move_segment(order, start, end, insert_after, reverse=False):
+    """Moves order[start:end + 1] in place after the stop at position
+    insert_after, which must be outside the segment."""
+    segment = order[start:end + 1]
+    if reverse:
+        segment.reverse()
+    del order[start:end + 1]
+    if insert_after > end:
+        insert_after -= len(segment)
+    order[insert_after + 1:insert_after + 1] = segment
+
+
+def or_two_opt(order, distances, first_improvement=False, deadline=None):
+    """Improves a tour in place with 2-opt then Or-opt moves until
+    neither of them finds an improvement.
+
+    Args and Returns: as for two_opt().
+    """
+    iterations = 0
+    while True:
+        iterations += two_opt(order, distances, first_improvement,
+                              deadline)
+        moves = or_opt(order, distances, deadline)
+        iterations += moves
+        if not moves or expired(deadline):
+            return iterations
+
+
+def chained_search(order, distances, first_improvement=False,
+                   deadline=None, kicks=None, rng=random):
+    """Improves a tour in place with a chained local search.
+
+    The tour is improved with or_two_opt(). Then, up to kicks times
+    or until the deadline, a copy of the best tour is perturbed with a
+    double-bridge move, improved again, and kept when shorter.
+
+    Args and Returns: as for two_opt(), and
+        kicks: maximum number of perturbations (default: len(order)).
+        rng: random.Random instance used for the perturbations.
+    """
+    n = len(order)
+    iterations = or_two_opt(order, distances, first_improvement, deadline)
+    # A double bridge needs three cuts after the first stop
+    if n < 8:
+        return iterations
+    if kicks is None:
+        kicks = n
+    tolerance = improvement_tolerance(order, distances)
+
+    best_value = tour_length(order, distances)
+    for kick in range(kicks):
+        if expired(deadline):
+            break
+        candidate = double_bridge(order, rng)
+        moves = or_two_opt(candidate, distances, first_improvement,
+                           deadline)
+        value = tour_length(candidate, distances)
+        if value < best_value - tolerance:
+            order[:] = candidate
+            best_value = value
+            iterations += moves + 1
+
+    return iterations
+
+
+def double_bridge(order, rng=random):
+    """Returns a new list where the tour A B C D is reconnected as
+    A C B D, a move that 2-opt and Or-opt cannot undo easily.
+
+    The first stop of the tour stays first.
+    """
+    p1, p2, p3 = sorted(rng.sample(range(1, len(order)), 3))
+    return order[:p1] + order[p2:p3] + order[p1:p2] + order[p3:]
+
+
+def expired(deadline):
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def improvement_tolerance(order, distances):
+    # Guard against rounding errors cycling on moves that do not
+    # change the tour value.
+    return tour_length(order, distances) * 1e-12
+
+
+def distance_matrix(nodes, metric=METRIC_SQUARED_EUCLIDEAN):
+    """Returns the matrix (numpy.ndarray) of the distance between all
+    pairs of nodes, measured with one of METRICS or a
+    DistanceProvider."""
+    if isinstance(metric, DistanceProvider):
+        return metric.matrix(nodes)
+    coordinates = numpy.array(
+        [(node.latitude, node.longitude) for node in nodes],
+        dtype=float).reshape(-1, 2)
+    latitude = coordinates[:, 0]
+    longitude = coordinates[:, 1]
+
+    if metric == METRIC_SQUARED_EUCLIDEAN:
+        return ((latitude[:, None] - latitude[None, :]) ** 2 +
+                (longitude[:, None] - longitude[None, :]) ** 2)
+
+    latitude = numpy.radians(latitude)
+    longitude = numpy.radians(longitude)
+    delta_latitude = latitude[:, None] - latitude[None, :]
+    delta_longitude = longitude[:, None] - longitude[None, :]
+    if metric == METRIC_EQUIRECTANGULAR:
+        x = delta_longitude * numpy.cos(
+            (latitude[:, None] + latitude[None, :]) / 2)
+        return EARTH_RADIUS * numpy.hypot(x, delta_latitude)
+    elif metric == METRIC_HAVERSINE:
+        a = (numpy.sin(delta_latitude / 2) ** 2 +
+             numpy.cos(latitude[:, None]) * numpy.cos(latitude[None, :]) *
+             numpy.sin(delta_longitude / 2) ** 2)
+        return 2 * EARTH_RADIUS * numpy.arcsin(
+            numpy.sqrt(numpy.minimum(a, 1)))
+    else:
+        raise ValueError("Unknown distance metric: {}".format(metric))
+
+
+def metric_name(metric):
+    """Name of one of METRICS or of a DistanceProvider."""
+    if isinstance(metric, DistanceProvider):
+        return metric.name
+    return metric
+
 
-    return best_solution.tour
+def tour_length(order, distances):
+    """Value of a tour given as indices in a distance matrix,
+    including the return to the starting point."""
+    length = 0
+    for a, b in pairwise(order + order[:1]):
+        length += distances[a][b]
+    return length
 
 
 def squared_distance(a, b):
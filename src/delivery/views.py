@@ -2,14 +2,19 @@ import datetime
 import types
 import json
 import collections
-import textwrap
+import csv
 import os
+import re
 
 from django.conf import settings
+from django.core.cache import cache
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import render
 from django.views import generic
-from django.http import HttpResponseRedirect, HttpResponse, Http404
+from django.http import (
+    HttpResponseRedirect, HttpResponse, HttpResponseNotModified, Http404,
+    StreamingHttpResponse)
+from django.utils.http import parse_etags, quote_etag
 from django.utils.decorators import method_decorator
 from django.utils.translation import ugettext_lazy as _
 from django.contrib.auth.decorators import login_required
@@ -17,18 +22,16 @@ from delivery.models import Delivery
 from member.models import Member, Route
 from django.http import JsonResponse
 from django.core.urlresolvers import reverse_lazy
-from django.contrib.admin.models import LogEntry, ADDITION, CHANGE
+from django.contrib.admin.models import LogEntry, CHANGE
 from django.contrib.contenttypes.models import ContentType
 from django.db.models.functions import Lower
 
 from .apps import DeliveryConfig
+from . import forecast, jobs, meal_labels, routing, signals, simulator
 
 from sqlalchemy import func, or_, and_
 
-import labels  # package pylabels
-from reportlab.graphics import shapes
-
-from .models import Delivery
+from .models import ComponentTotal, Delivery, Job
 from .forms import DishIngredientsForm
 from order.models import (
     Order, component_group_sorting, SIZE_CHOICES_REGULAR, SIZE_CHOICES_LARGE)
@@ -42,7 +45,10 @@ from member.models import Client, Route
 from datetime import date
 from . import tsp
 
-MEAL_LABELS_FILE = os.path.join(settings.BASE_DIR, "meallabels.pdf")
+# Wall-clock budget in seconds for sequencing a route in dailyOrders
+ROUTE_SOLVER_TIME_LIMIT = 2.0
+# Wall-clock budget in seconds for sequencing all routes in dailyRoutes
+ROUTE_PLANNER_TIME_LIMIT = 5.0
 
 
 class Orderlist(generic.ListView):
@@ -61,6 +67,11 @@ class Orderlist(generic.ListView):
         if LogEntry.objects.exists():
             log = LogEntry.objects.latest('action_time')
             context['orders_refresh_date'] = log
+        # refresh job followed by the page, see refreshOrders
+        context['job'] = None
+        if self.request.GET.get('job', '').isdigit():
+            context['job'] = Job.objects.filter(
+                id=int(self.request.GET['job'])).first()
 
         return context
 
@@ -93,8 +104,8 @@ class MealInformation(generic.View):
                 main_dish = main_dishes[0]
 
         # see if existing chosen ingredients for the dish
-        dish_ingredients = Component.get_day_ingredients(
-            main_dish.id, date)
+        dish_ingredients = Component.get_day_ingredients_map(
+            date, [main_dish.id]).get(main_dish.id, [])
         if not dish_ingredients:
             # get recipe ingredients for the dish
             dish_ingredients = Component.get_recipe_ingredients(
@@ -188,15 +199,98 @@ class KitchenCount(generic.View):
         else:
             date = datetime.date.today()
 
-        kitchen_list = Order.get_kitchen_items(date)
-        component_lines, meal_lines = kcr_make_lines(kitchen_list, date)
-        num_labels = kcr_make_labels(kitchen_list)
+        kitchen_count = get_kitchen_count(date)
+        num_labels = meal_labels.count_labels(kitchen_count['kitchen_list'])
+        # The labels are rendered by a job, only when they changed (see
+        #   meal_labels.get_labels_file)
+        if num_labels and not os.path.exists(meal_labels.get_labels_file(
+                date, kitchen_count['kitchen_list'], render=False)):
+            jobs.enqueue(Job.MEAL_LABELS, delivery_date=date.isoformat())
         # release session for SQLAlchemy     TODO use signals instead
         db_sa_session.remove()
         return render(request, 'kitchen_count.html',
-                      {'component_lines': component_lines,
-                       'meal_lines': meal_lines,
-                       'num_labels': num_labels})
+                      {'component_lines': kitchen_count['component_lines'],
+                       'meal_lines': kitchen_count['meal_lines'],
+                       'num_labels': num_labels,
+                       'date': date})
+
+
+def get_kitchen_count(date):
+    """Returns the kitchen count of a delivery date.
+
+    The kitchen list and the report lines are cached for each date,
+    until a change to the orders, the menu or the requirements of the
+    clients of that date (see delivery.signals).
+
+    Returns:
+        A dictionary with the kitchen_list (see
+        Order.get_kitchen_items), the component_lines and meal_lines
+        of the report.
+    """
+    key = signals.kitchen_count_cache_key(date)
+    kitchen_count = cache.get(key)
+    if kitchen_count is None:
+        kitchen_list = Order.get_kitchen_items(date)
+        component_lines, meal_lines = kcr_make_lines(kitchen_list, date)
+        kitchen_count = {
+            'kitchen_list': kitchen_list,
+            'component_lines': component_lines,
+            'meal_lines': meal_lines,
+        }
+        cache.set(key, kitchen_count, signals.KITCHEN_COUNT_CACHE_TIMEOUT)
+    return kitchen_count
+
+
+class KitchenForecast(generic.View):
+
+    def get(self, request):
+        # Display the kitchen production forecast of the coming days,
+        #   from tomorrow by default
+        try:
+            start_date = datetime.datetime.strptime(
+                request.GET.get('start', ''), '%Y-%m-%d').date()
+        except ValueError:
+            start_date = datetime.date.today() + datetime.timedelta(days=1)
+        try:
+            num_days = int(request.GET.get('days', 7))
+        except ValueError:
+            num_days = 7
+        num_days = max(1, min(num_days, forecast.MAX_DAYS))
+
+        days = forecast.forecast(start_date, num_days)
+        if request.GET.get('format') == 'csv':
+            return forecast_csv(days)
+        return render(request, 'kitchen_forecast.html',
+                      {'days': days,
+                       'component_groups': COMPONENT_GROUP_CHOICES,
+                       'start_date': start_date,
+                       'end_date': days[-1].date,
+                       'num_days': num_days,
+                       'max_days': forecast.MAX_DAYS})
+
+
+def forecast_csv(days):
+    # export the kitchen forecast, one line per day
+    response = HttpResponse(content_type="text/csv")
+    response['Content-Disposition'] = \
+        'attachment; filename=kitchen_forecast.csv'
+    writer = csv.writer(response, csv.excel)
+
+    header = ["Date", "Clients"]
+    for component_group, label in COMPONENT_GROUP_CHOICES:
+        header.extend([component_group + " regular",
+                       component_group + " large"])
+    header.append("Clashes")
+    writer.writerow(header)
+
+    for day in days:
+        row = [day.date.isoformat(), day.clients]
+        for line in day.lines:
+            row.extend([line.rqty, line.lqty])
+        row.append('' if day.clashes is None else day.clashes)
+        writer.writerow(row)
+
+    return response
 
 
 class Component_line(types.SimpleNamespace):
@@ -253,27 +347,32 @@ def kcr_total_line(lines, label, regular, large):
 
 def kcr_make_lines(kitchen_list, date):
     # generate all the lines for the kitchen count report
+    day_ingredients = Component.get_day_ingredients_map(date)
+    menu_components = {
+        menu_component.component.component_group: menu_component.component
+        for menu_component in Menu_component.objects.filter(
+            menu__date=date).select_related('component').order_by('id')}
     component_lines = {}
-    for k, item in kitchen_list.items():
-        for component_group, meal_component \
-                in item.meal_components.items():
-            component_lines.setdefault(
-                component_group,
-                Component_line(
-                    component_group=component_group,
-                    name=meal_component.name,
-                    ingredients=", ".join(
-                        [ing.name for ing in
-                         Component.get_day_ingredients(
-                             meal_component.id, date)])))
-            if (component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH and
-                    item.meal_size == SIZE_CHOICES_LARGE):
-                component_lines[component_group].lqty += \
-                    meal_component.qty
-            else:
-                component_lines[component_group].rqty += \
-                    meal_component.qty
-        # END FOR
+    # quantities ordered by the clients of all the routes
+    for component_group, size, total_quantity in \
+            ComponentTotal.objects.filter(
+                delivery_date=date,
+                route__isnull=False,
+                component_group__in=menu_components,
+            ).values_list('component_group', 'size', 'total_quantity'):
+        if component_group not in component_lines:
+            component = menu_components[component_group]
+            component_lines[component_group] = Component_line(
+                component_group=component_group,
+                name=component.name,
+                ingredients=", ".join(
+                    [ing.name for ing in
+                     day_ingredients.get(component.id, [])]))
+        if (component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH and
+                size == SIZE_CHOICES_LARGE):
+            component_lines[component_group].lqty += total_quantity
+        else:
+            component_lines[component_group].rqty += total_quantity
     # END FOR
     items = component_lines.items()
     if items:
@@ -368,98 +467,108 @@ def kcr_make_lines(kitchen_list, date):
     return (component_lines_sorted, meal_lines)
 
 
-def kcr_make_labels(kitchen_list):
-    # see https://github.com/bcbnz/pylabels
-
-    # dimensions are in millimeters; 1 inch = 25.4 mm
-    specs = labels.Specification(
-        sheet_width=8.5 * 25.4, sheet_height=11 * 25.4,
-        columns=2, rows=7,
-        label_width=4 * 25.4, label_height=1.33 * 25.4,
-        top_margin=20, bottom_margin=20,
-        corner_radius=2)
-
-    def draw_label(label, width, height, data):
-        # callback function
-        obj, j, qty = data
-        label.add(shapes.String(2, height * 0.8,
-                                obj.lastname + ", " + obj.firstname[0:2] + ".",
-                                fontName="Helvetica-Bold",
-                                fontSize=12))
-        label.add(shapes.String(width-2, height * 0.8,
-                                "{}".format(datetime.date.today().
-                                            strftime("%a, %b-%d")),
-                                fontName="Helvetica",
-                                fontSize=10,
-                                textAnchor="end"))
-        if obj.meal_size == SIZE_CHOICES_LARGE:
-            label.add(shapes.String(2, height * 0.65,
-                                    "LARGE",
-                                    fontName="Helvetica",
-                                    fontSize=10))
-        if qty > 1:
-            label.add(shapes.String(width * 0.5, height * 0.65,
-                                    "(" + str(j) + " of " + str(qty) + ")",
-                                    fontName="Helvetica",
-                                    fontSize=10))
-        label.add(shapes.String(width-3, height * 0.65,
-                                obj.routename,
-                                fontName="Helvetica-Oblique",
-                                fontSize=8,
-                                textAnchor="end"))
-
-        special = obj.preparation or []
-        special.extend(["No " + item for item in obj.incompatible_ingredients])
-        special.extend(["No " + item for item in obj.other_ingredients])
-        special.extend(["No " + item for item in obj.restricted_items])
-        special = textwrap.wrap(
-            ' / '.join(special), width=68,
-            break_long_words=False, break_on_hyphens=False)
-        position = height * 0.45
-        for line in special:
-            label.add(shapes.String(2, position,
-                                    line,
-                                    fontName="Helvetica",
-                                    fontSize=9))
-            position -= 10
-
-    sheet = labels.Sheet(specs, draw_label, border=True)
-
-    # obj is a KitchenItem instance (see order/models.py)
-    for obj in sorted(
-            list(kitchen_list.values()),
-            key=lambda x: x.lastname + x.firstname):
-        qty = obj.meal_qty
-        for j in range(1, qty + 1):
-            sheet.add_label((obj, j, qty))
-
-    if sheet.label_count > 0:
-        sheet.save(MEAL_LABELS_FILE)
-        print("SousChef Printed {} meal label(s) on {} page(s)"
-              " into file {}".format(
-                  sheet.label_count, sheet.page_count, MEAL_LABELS_FILE))
-    return sheet.label_count
-
 # END Kitchen count report view, helper classes and functions
 
 # Delivery route sheet view, helper classes and functions
 
 
 class MealLabels(generic.View):
+
     def get(self, request, **kwargs):
-        try:
-            f = open(MEAL_LABELS_FILE, "rb")
-        except:
-            raise Http404("File " + MEAL_LABELS_FILE + " does not exist")
-        response = HttpResponse(content_type='application/pdf')
+        # Download the meal labels of the given delivery date
+        #   or of today by default
+        if 'year' in kwargs and 'month' in kwargs and 'day' in kwargs:
+            date = datetime.date(
+                int(kwargs['year']), int(kwargs['month']), int(kwargs['day']))
+        else:
+            date = datetime.date.today()
+
+        kitchen_list = get_kitchen_count(date)['kitchen_list']
+        db_sa_session.remove()
+        # The labels job may not have run yet: then render them now
+        path = meal_labels.get_labels_file(date, kitchen_list)
+        if not os.path.exists(path):
+            raise Http404("No labels for " + str(date))
+
+        # label files are named by the hash of the kitchen data
+        digest = os.path.splitext(os.path.basename(path))[0]
+        etag = quote_etag(digest)
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if digest in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        accel_redirect = getattr(settings, 'MEAL_LABELS_ACCEL_REDIRECT', None)
+        if accel_redirect:
+            # nginx sends the file, and handles range requests
+            response = HttpResponse(content_type='application/pdf')
+            response['X-Accel-Redirect'] = \
+                accel_redirect + os.path.basename(path)
+        else:
+            response = file_range_response(
+                request, path, content_type='application/pdf')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
         response['Content-Disposition'] = \
             'attachment; filename="labels{}.pdf"'. \
-            format(datetime.date.today().strftime("%Y%m%d"))
-        response.write(f.read())
-        f.close()
+            format(date.strftime("%Y%m%d"))
         return response
 
 
+# Size of the chunks of files streamed by file_range_response
+FILE_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_range_response(request, path, content_type):
+    """Streams a file, or the single byte range the request asks for,
+    in chunks of FILE_CHUNK_SIZE bytes.
+
+    Requests for several ranges get the whole file.
+    """
+    size = os.path.getsize(path)
+    start, end = 0, size - 1
+    status = 200
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+    if match and any(match.groups()):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            if last:
+                end = min(int(last), size - 1)
+        else:
+            # suffix range: the last bytes of the file
+            start = max(0, size - int(last))
+        if start > end:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{}'.format(size)
+            return response
+        status = 206
+
+    response = StreamingHttpResponse(
+        read_file(path, start, end - start + 1),
+        status=status, content_type=content_type)
+    response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    if status == 206:
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+    return response
+
+
+def read_file(path, start, length):
+    # generates length bytes of a file from start, chunk by chunk
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(FILE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
 class DeliveryRouteSheet(generic.View):
 
     def get(self, request, **kwargs):
@@ -473,7 +582,8 @@ class DeliveryRouteSheet(generic.View):
         route_list = Order.get_delivery_list(date, route_id)
         route_list = sort_sequence_ids(route_list, route_client_ids)
         # TODO sort route_list using sequence from leaflet
-        summary_lines, detail_lines = drs_make_lines(route_list, date)
+        summary_lines, detail_lines = drs_make_lines(
+            route_list, date, route_id)
         return render(request, 'route_sheet.html',
                       {'route': route,
                        'summary_lines': summary_lines,
@@ -488,34 +598,28 @@ RouteSummaryLine = \
          'lqty'])
 
 
-def drs_make_lines(route_list, date):
+def drs_make_lines(route_list, date, route_id):
     # generate all the lines for the delivery route sheet
 
     summary_lines = {}
-    for k, item in route_list.items():
-        # print("\nitem = ", item)
-        for delivery_item in item.delivery_items:
-            component_group = delivery_item.component_group
-            if component_group:
-                line = summary_lines.setdefault(
-                    component_group,
-                    RouteSummaryLine(
-                        component_group,
-                        rqty=0,
-                        lqty=0))
-                # print("\nline", line)
-                if (component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH and
-                        delivery_item.size == SIZE_CHOICES_LARGE):
-                    summary_lines[component_group] = \
-                        line._replace(lqty=line.lqty +
-                                      delivery_item.total_quantity)
-                elif component_group != '':
-                    summary_lines[component_group] = \
-                        line._replace(rqty=line.rqty +
-                                      delivery_item.total_quantity)
-                # END IF
-            # END IF
-        # END FOR
+    for component_group, size, total_quantity in \
+            ComponentTotal.objects.filter(
+                delivery_date=date,
+                route_id=route_id,
+            ).values_list('component_group', 'size', 'total_quantity'):
+        line = summary_lines.setdefault(
+            component_group,
+            RouteSummaryLine(
+                component_group,
+                rqty=0,
+                lqty=0))
+        if (component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH and
+                size == SIZE_CHOICES_LARGE):
+            summary_lines[component_group] = \
+                line._replace(lqty=line.lqty + total_quantity)
+        else:
+            summary_lines[component_group] = \
+                line._replace(rqty=line.rqty + total_quantity)
     # END FOR
 
     # print("values before sort", summary_lines.values())
@@ -551,43 +655,33 @@ def sort_sequence_ids(dic, seq):
 
 
 def dailyOrders(request):
-    data = []
-    route_id = request.GET.get('route')
-
-    # Load all orders for the day
-    orders = Order.objects.get_orders_for_date()
-
-    for order in orders:
-        if order.client.route is not None:
-            if order.client.route.id == int(route_id):
-                waypoint = {
-                    'id': order.client.member.id,
-                    'latitude': order.client.member.address.latitude,
-                    'longitude': order.client.member.address.longitude,
-                    'distance': order.client.member.address.distance,
-                    'member': "{} {}".format(
-                        order.client.member.firstname,
-                        order.client.member.lastname),
-                    'address': order.client.member.address.street
-                    }
-                # print("waypoint=", waypoint)
-                data.append(waypoint)
-
-    # Since the
-    # https://www.mapbox.com/api-documentation/#retrieve-a-duration-matrix
-    # endpoint is not yet available, we solve an approximation of the
-    # problem by assuming the world is flat and has no obstacles (2D
-    # Euclidean plane). This should still give good results.
+    route_id = int(request.GET.get('route'))
+    route = Route.objects.get(id=route_id)
+
+    # Load the orders of the route for the day, with all the waypoint
+    #   fields, in a single query
+    stops = routing.get_day_stops(date.today(), route_id)
+
+    # Stops are measured along the local road network when one is
+    # configured (see routing.distance_provider), with great-circle
+    # distances otherwise.
 
     node_to_waypoint = {}
-    nodes = [tsp.Node(None, 45.516564,  -73.575145)]  # Santropol
-    for waypoint in data:
-        node = tsp.Node(waypoint['id'], float(waypoint['latitude']),
-                        float(waypoint['longitude']))
-        node_to_waypoint[node] = waypoint
+    nodes = [tsp.Node(None, *routing.SANTROPOL)]
+    for stop in stops:
+        node = tsp.Node(stop['client_id'],
+                        float(stop['client__member__address__latitude']),
+                        float(stop['client__member__address__longitude']))
+        node_to_waypoint[node] = routing.waypoint(stop)
         nodes.append(node)
 
-    nodes = tsp.solve(nodes)
+    # Tours are cached and start from the sequence saved for the
+    #   route, see routing.sequence_route
+    nodes = routing.sequence_route(
+        route.id, date.today(), nodes,
+        time_limit=ROUTE_SOLVER_TIME_LIMIT,
+        metric=routing.distance_provider(),
+        sequence=route.get_client_sequence(date.today()))
 
     data = []
     for node in nodes:
@@ -600,6 +694,93 @@ def dailyOrders(request):
     return JsonResponse(waypoints, safe=False)
 
 
+def dailyRoutes(request):
+    # Propose how to split the day's orders between the routes
+    #   ?date=YYYY-MM-DD (default today)
+    #   &capacity=N : maximum number of items delivered by a route
+    #   &routes=1,2,3 : ids of the available routes (default all)
+    try:
+        delivery_date = datetime.datetime.strptime(
+            request.GET['date'], '%Y-%m-%d').date() \
+            if request.GET.get('date') else date.today()
+        capacity = int(request.GET['capacity']) \
+            if request.GET.get('capacity') else None
+        routes = Route.objects.order_by('id')
+        if request.GET.get('routes'):
+            routes = routes.filter(
+                id__in=[int(i) for i in request.GET['routes'].split(',')])
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    routes = list(routes)
+    if not routes:
+        return JsonResponse({'error': 'No route available'}, status=400)
+
+    proposal, unassigned = routing.plan_routes(
+        delivery_date, routes, capacity, ROUTE_PLANNER_TIME_LIMIT)
+
+    data = {
+        'date': str(delivery_date),
+        'routes': [
+            {'id': route.id,
+             'name': route.name,
+             'load': load,
+             'distance': round(length),
+             'waypoints': [routing.waypoint(stop) for stop in stops]}
+            for route, stops, load, length in proposal],
+        'unassigned': [routing.waypoint(stop) for stop in unassigned],
+    }
+    return JsonResponse(data)
+
+
+@csrf_exempt
+def mealClashes(request):
+    # Count the clients that clash with each candidate main dish
+    #   GET ?date=YYYY-MM-DD (default today)
+    #       &components=1,2,3 : ids of the main dishes (default all),
+    #       with their ingredients of the date or of their recipe
+    #   POST {"date": "YYYY-MM-DD",
+    #         "candidates": [{"component": 1, "ingredients": [2, 3]}]}
+    #   Candidates are ranked by their number of clashing clients.
+    try:
+        if request.method == 'POST':
+            data = json.loads(request.body.decode('utf-8'))
+        else:
+            data = request.GET
+        delivery_date = datetime.datetime.strptime(
+            data['date'], '%Y-%m-%d').date() \
+            if data.get('date') else date.today()
+        if request.method == 'POST':
+            candidates = [
+                (int(candidate['component']),
+                 [int(i) for i in candidate.get('ingredients', [])])
+                for candidate in data.get('candidates', [])]
+        else:
+            component_ids = [int(i) for i in data['components'].split(',')] \
+                if data.get('components') else None
+            candidates = simulator.main_dish_candidates(
+                delivery_date, component_ids)
+    except (ValueError, TypeError, KeyError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    clashes = simulator.simulate(delivery_date, candidates)
+    names = dict(Component.objects.filter(
+        id__in=[clash.component_id for clash in clashes]
+    ).values_list('id', 'name'))
+    data = {
+        'date': str(delivery_date),
+        'candidates': [
+            {'id': clash.component_id,
+             'name': names.get(clash.component_id, ''),
+             'clients': clash.clients,
+             'meals': clash.meals}
+            for clash in sorted(
+                clashes, key=lambda clash: (
+                    clash.clients, clash.meals,
+                    names.get(clash.component_id, '').lower()))],
+    }
+    return JsonResponse(data)
+
+
 @csrf_exempt
 def saveRoute(request):
     # print("saveRoute1", "request", request, "request.body=", request.body)
@@ -615,21 +796,37 @@ def saveRoute(request):
     route = Route.objects.get(id=route_id)
     route.set_client_sequence(datetime.date.today(), route_client_ids)
     route.save()
+    routing.forget_route_tour(route.id, datetime.date.today())
     # To do print roadmap according the list of members received
 
     return JsonResponse('OK', safe=False)
 
 
 def refreshOrders(request):
-    creation_date = date.today()
-    delivery_date = date.today()
-    last_refresh_date = datetime.datetime.now()
-    clients = Client.active.all()
-    Order.create_orders_on_defaults(creation_date, delivery_date, clients)
-    LogEntry.objects.log_action(
-        user_id=1, content_type_id=1,
-        object_id="", object_repr="Generation of order for " + str(
-            datetime.datetime.now().strftime('%Y-%m-%d %H:%M')),
-        action_flag=ADDITION,
-    )
-    return HttpResponseRedirect(reverse_lazy("delivery:order"))
+    # Queue the creation of today's orders of the clients whose meals
+    #   changed since the last refresh, see delivery.jobs
+    #   ?replace=1 : also replace their orders not delivered yet
+    job = jobs.enqueue(Job.REFRESH_ORDERS,
+                       delivery_date=date.today().isoformat(),
+                       replace=bool(request.GET.get('replace')))
+    return HttpResponseRedirect(
+        "{}?job={}".format(reverse_lazy("delivery:order"), job.id))
+
+
+def jobStatus(request, id):
+    # Progress of a job, polled by the pages that queued it
+    try:
+        job = Job.objects.get(id=int(id))
+    except Job.DoesNotExist:
+        raise Http404("No job " + id)
+    return JsonResponse({
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'finished': job.is_finished,
+        'done': job.done,
+        'total': job.total,
+        'message': job.message,
+        'result': job.result,
+        'error': job.error,
+    })
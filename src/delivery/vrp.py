@@ -0,0 +1,176 @@
+import math
+import time
+
+from . import tsp
+
+
+class Plan:
+    def __init__(self, tours, loads, values, unassigned):
+        # one tour (list of Node, starting with the depot) per route
+        self.tours = tours
+        # sum of the demands of the stops of each route
+        self.loads = loads
+        # length of each tour, measured with the metric of the plan
+        self.values = values
+        # stops that could not fit in any route
+        self.unassigned = unassigned
+
+
+def solve(depot, stops, demands, num_routes, capacity=None,
+          time_limit=None, metric=tsp.METRIC_HAVERSINE,
+          solver=tsp.SOLVER_OR_OPT, sweeps=16):
+    """Solves the Capacitated Vehicle Routing Problem (CVRP) with a
+    heuristic.
+
+    The stops are partitioned between the routes with the sweep
+    algorithm: they are sorted by their bearing from the depot and cut
+    into angular sectors of balanced demand, none above the capacity.
+    Several starting bearings are tried and the partition with the
+    shortest tours (visiting each sector in bearing order) is kept.
+    The stops of each route are then sequenced with tsp.optimize().
+
+    Args:
+        depot: Node where all the routes start and end.
+        stops: List of nodes (Node) to visit.
+        demands: Demand of each stop, in the same order as stops.
+        num_routes: Number of available routes.
+        capacity: Maximum demand served by a route, None for no limit.
+        time_limit: Wall-clock budget in seconds for sequencing all
+            the routes.
+        metric, solver: as for tsp.solve().
+        sweeps: Number of starting bearings that are tried.
+
+    Returns:
+        A Plan with exactly num_routes tours, some possibly empty.
+
+    """
+    if num_routes < 1:
+        raise ValueError("At least one route is needed")
+    deadline = None
+    if time_limit is not None:
+        deadline = time.monotonic() + time_limit
+
+    servable = [i for i, demand in enumerate(demands)
+                if capacity is None or demand <= capacity]
+    unassigned = [stops[i] for i, demand in enumerate(demands)
+                  if capacity is not None and demand > capacity]
+
+    nodes = [depot] + stops
+    distances = tsp.distance_matrix(nodes, metric).tolist()
+    by_bearing = sorted(servable, key=lambda i: bearing(depot, stops[i]))
+
+    best = None
+    num_sweeps = min(sweeps, len(by_bearing)) or 1
+    for sweep in range(num_sweeps):
+        first = sweep * len(by_bearing) // num_sweeps
+        rotated = by_bearing[first:] + by_bearing[:first]
+        groups, overflow = partition(rotated, demands, num_routes, capacity)
+        cost = sum(tsp.tour_length([0] + [i + 1 for i in group], distances)
+                   for group in groups)
+        key = (len(overflow), cost)
+        if best is None or key < best[0]:
+            best = (key, groups, overflow)
+    key, groups, overflow = best
+    unassigned.extend(stops[i] for i in overflow)
+
+    tours = []
+    values = []
+    for k, group in enumerate(groups):
+        route_limit = None
+        if deadline is not None:
+            route_limit = max(0, deadline - time.monotonic()) / \
+                (len(groups) - k)
+        solution = tsp.optimize([depot] + [stops[i] for i in group],
+                                solver, time_limit=route_limit,
+                                metric=metric)
+        tours.append(solution.tour)
+        values.append(solution.value)
+    loads = [sum(demands[i] for i in group) for group in groups]
+
+    return Plan(tours, loads, values, unassigned)
+
+
+def partition(ordered, demands, num_routes, capacity=None):
+    """Cuts a sequence of stops into num_routes consecutive groups.
+
+    Each group closes once the cumulated demand reaches its share of
+    the total demand, or before the next stop would exceed the
+    capacity. Stops left over at the end are added to the least loaded
+    groups that can still take them.
+
+    Returns:
+        (list of num_routes lists of stop indices,
+         list of the stop indices that did not fit)
+    """
+    total = sum(demands[i] for i in ordered)
+    groups = [[] for k in range(num_routes)]
+    overflow = []
+    k = 0
+    load = 0
+    cumulated = 0
+    for i in ordered:
+        demand = demands[i]
+        while k < num_routes and groups[k] and (
+                (capacity is not None and load + demand > capacity) or
+                cumulated >= total * (k + 1) / num_routes):
+            k += 1
+            load = 0
+        if k == num_routes:
+            overflow.append(i)
+            continue
+        groups[k].append(i)
+        load += demand
+        cumulated += demand
+
+    if overflow:
+        loads = [sum(demands[i] for i in group) for group in groups]
+        left_over = []
+        for i in overflow:
+            k = min(range(num_routes), key=lambda k: loads[k])
+            if capacity is not None and loads[k] + demands[i] > capacity:
+                left_over.append(i)
+            else:
+                groups[k].append(i)
+                loads[k] += demands[i]
+        overflow = left_over
+    return groups, overflow
+
+
+def bearing(origin, node):
+    """Angle in radians of the direction from origin to node."""
+    return math.atan2(
+        node.latitude - origin.latitude,
+        (node.longitude - origin.longitude) *
+        math.cos(math.radians(origin.latitude)))
+
+
+def match_routes(groups, current_routes, route_ids):
+    """Chooses which existing route serves each group of stops.
+
+    Groups are matched greedily to the route already serving most of
+    their stops, so that proposals change as few assignments as
+    possible.
+
+    Args:
+        groups: List of lists of stop keys.
+        current_routes: Dictionary of stop key to its current route id.
+        route_ids: Ids of the available routes, as many as groups.
+
+    Returns:
+        List of the route id of each group.
+    """
+    overlaps = []
+    for g, group in enumerate(groups):
+        for r, route_id in enumerate(route_ids):
+            count = sum(1 for stop in group
+                        if current_routes.get(stop) == route_id)
+            overlaps.append((-count, g, r))
+    overlaps.sort()
+
+    matched = [None] * len(groups)
+    used = set()
+    for count, g, r in overlaps:
+        if matched[g] is None and r not in used:
+            matched[g] = route_ids[r]
+            used.add(r)
+    return matched
@@ -94,9 +94,29 @@ class Component(models.Model):
     def get_day_ingredients(component_id, delivery_date):
         """Returns a list of the actual ingredients
         of a component for the delivery date."""
+        return Component.get_day_ingredients_map(
+            delivery_date, [component_id]).get(component_id, [])
+
+    @staticmethod
+    def get_day_ingredients_map(delivery_date, component_ids=None):
+        """Returns a dictionary of component id to the list of the
+        actual ingredients of the component for the delivery date,
+        in the order they were chosen, loaded with a single query.
+
+        Parameters:
+          delivery_date : date of the ingredients
+          component_ids : only include these components (default: all)
+        """
         q = Component_ingredient.objects.\
-            filter(component__id=component_id, date=delivery_date)
-        return [ci.ingredient for ci in q]
+            select_related('ingredient').\
+            filter(date=delivery_date).\
+            order_by('id')
+        if component_ids is not None:
+            q = q.filter(component__id__in=component_ids)
+        ingredients = {}
+        for ci in q:
+            ingredients.setdefault(ci.component_id, []).append(ci.ingredient)
+        return ingredients
 
     @staticmethod
     def get_recipe_ingredients(component_id):
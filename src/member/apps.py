@@ -17,3 +17,7 @@ def db_sa_table(model_class):
 
 class MemberConfig(AppConfig):
     name = 'member'
+
+    def ready(self):
+        from . import signals
+        signals.connect()
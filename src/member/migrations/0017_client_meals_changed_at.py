@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2026-10-18 06:34
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('member', '0016_auto_20160912_1509'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='meals_changed_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='meals changed at'),
+        ),
+    ]
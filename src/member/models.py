@@ -9,7 +9,8 @@ from django.contrib.auth.models import User
 from django_filters import FilterSet, MethodFilter, CharFilter, ChoiceFilter, \
     BooleanFilter
 from annoying.fields import JSONField
-from meal.models import COMPONENT_GROUP_CHOICES_MAIN_DISH
+from meal.models import (
+    COMPONENT_GROUP_CHOICES, COMPONENT_GROUP_CHOICES_MAIN_DISH)
 from note.models import Note
 
 
@@ -70,6 +71,75 @@ DAYS_OF_WEEK = (
 )
 
 
+class MealSchedule:
+    """Meal defaults of a client compiled for each day of the week.
+
+    Client.meal_default_week is a dictionary with a key per component
+    group and day, see Client.get_meal_defaults(). It is read once into
+    tuples indexed by the day of the week (0 is monday) and the
+    component group, in the order of COMPONENT_GROUP_CHOICES.
+
+    Attributes:
+      quantities : 7 tuples of the quantity of each component group
+      sizes : 7 sizes of the main dish
+      delivery_days : names of the days of the client meals schedule,
+        None when all the days can be delivered
+    """
+    __slots__ = ('quantities', 'sizes', 'delivery_days')
+
+    # component group -> index in the quantities of a day
+    GROUPS = {component_group: k for k, (component_group, label) in
+              enumerate(COMPONENT_GROUP_CHOICES)}
+
+    def __init__(self, meal_default_week=None, delivery_days=None):
+        defaults = meal_default_week or {}
+        self.quantities = tuple(
+            tuple(defaults.get(component_group + '_' + day + '_quantity') or 0
+                  for component_group, label in COMPONENT_GROUP_CHOICES)
+            for day, label in DAYS_OF_WEEK)
+        self.sizes = tuple(defaults.get('size_' + day) or ''
+                           for day, label in DAYS_OF_WEEK)
+        self.delivery_days = None if delivery_days is None \
+            else frozenset(delivery_days)
+
+    def with_delivery_days(self, delivery_days):
+        """Returns the same meal defaults with other delivery days."""
+        schedule = MealSchedule.__new__(MealSchedule)
+        schedule.quantities = self.quantities
+        schedule.sizes = self.sizes
+        schedule.delivery_days = None if delivery_days is None \
+            else frozenset(delivery_days)
+        return schedule
+
+    def quantity(self, component_group, day):
+        index = self.GROUPS.get(component_group)
+        return 0 if index is None else self.quantities[day][index]
+
+    def is_delivery_day(self, day):
+        return self.delivery_days is None or \
+            DAYS_OF_WEEK[day][0] in self.delivery_days
+
+    def day_meals(self, day):
+        """Returns None when the client is not delivered on a day of the
+        week, or else (size, list of (component group, quantity)).
+
+        A client is delivered on the days with a main dish, like when
+        the orders are created, restricted to its delivery days.
+        """
+        if not self.quantity(COMPONENT_GROUP_CHOICES_MAIN_DISH, day) or \
+                not self.is_delivery_day(day):
+            return None
+        return (self.sizes[day],
+                [(component_group, quantity) for
+                 (component_group, label), quantity in
+                 zip(COMPONENT_GROUP_CHOICES, self.quantities[day])
+                 if quantity > 0])
+
+    def week(self):
+        """Returns the day_meals() of each day of the week."""
+        return [self.day_meals(day) for day in range(len(DAYS_OF_WEEK))]
+
+
 class Member(models.Model):
 
     class Meta:
@@ -451,6 +521,16 @@ class Client(models.Model):
         blank=True, null=True
     )
 
+    # last change of the meal defaults, status, meals schedule or
+    #   scheduled statuses, see member.signals
+    meals_changed_at = models.DateTimeField(
+        verbose_name=_('meals changed at'),
+        blank=True,
+        null=True,
+        db_index=True,
+        editable=False,
+    )
+
     delivery_note = models.TextField(
         verbose_name=_('Delivery Note'),
         blank=True,
@@ -540,23 +620,38 @@ class Client(models.Model):
         Returns a list of days, corresponding to the client's delivery
         days.
         """
-        option = Option.objects.get(name='meals_schedule')
-        try:
-            meals_schedule_option = Client_option.objects.get(
-                client=self, option=option
-            )
-            return json.loads(meals_schedule_option.value)
-        except Client_option.DoesNotExist:
-            return None
+        value = Client_option.objects.filter(
+            client=self, option__name='meals_schedule'
+        ).values_list('value', flat=True).first()
+        return json.loads(value) if value is not None else None
+
+    @property
+    def meal_schedule(self):
+        """
+        Returns the MealSchedule of the client's meal defaults, without
+        its delivery days. It is compiled again only when the content of
+        meal_default_week changed, even in place.
+        """
+        # the values of the meal defaults are quantities and sizes
+        key = frozenset((self.meal_default_week or {}).items())
+        cached = getattr(self, '_meal_schedule', None)
+        if cached is None or cached[0] != key:
+            cached = (key, MealSchedule(self.meal_default_week))
+            self._meal_schedule = cached
+        return cached[1]
 
     @property
     def meals_schedule(self):
         """
         Returns a hierarchical dict representing the meals schedule.
         """
-
+        schedule = self.meal_schedule.with_delivery_days(
+            self.simple_meals_schedule)
         prefs = {}
-        for day, str in DAYS_OF_WEEK:
+        for day_index, (day, str) in enumerate(DAYS_OF_WEEK):
+            if not schedule.is_delivery_day(day_index):
+                prefs[day] = None
+                continue
             current = {}
             for component in [
                     'main_dish',
@@ -565,21 +660,9 @@ class Client(models.Model):
                     'fruit_salad',
                     'green_salad',
                     'pudding']:
-
-                item = self.meal_default_week.get(
-                    component + '_' + day + '_quantity'
-                ) or 0
-                current[component] = item
-
-            size = self.meal_default_week.get(
-                'size_' + day
-            ) or ''
-            current['size'] = size
-
-            if day not in self.simple_meals_schedule:
-                prefs[day] = None
-            else:
-                prefs[day] = current
+                current[component] = schedule.quantity(component, day_index)
+            current['size'] = schedule.sizes[day_index]
+            prefs[day] = current
 
         return prefs
 
@@ -644,21 +727,13 @@ class Client(models.Model):
               ...
               "size_saturday": "",
             }
+
+        The dictionary is read from the compiled client.meal_schedule.
         """
 
-        meals_default = client.meal_default_week
-        if meals_default:
-            quantity = meals_default.get(
-                component_group + '_' + DAYS_OF_WEEK[day][0] + '_quantity'
-            ) or 0
-            size = meals_default.get('size_' + DAYS_OF_WEEK[day][0]) or ''
-        else:
-            quantity = 0
-            size = ''
-        # DEBUG
-        # print("client, compgroup, day, qty, size",
-        #       client, component_group, DAYS_OF_WEEK[day][0], quantity, size)
-        return quantity, size
+        schedule = client.meal_schedule
+        return (schedule.quantity(component_group, day),
+                schedule.sizes[day])
 
     def set_meal_defaults(self, component_group, day, quantity=0, size=''):
         """Set the meal defaults quantity and size for a day.
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.utils import timezone
+
+from .models import Client, ClientScheduledStatus, Client_option, Option
+
+
+def meals_changed(client_id):
+    # the orders of the client must be reconsidered, see
+    #   order.generation.refresh_orders
+    Client.objects.filter(id=client_id).update(meals_changed_at=timezone.now())
+
+
+def client_saving(sender, instance, **kwargs):
+    # a client orders on its meal defaults when it is active
+    if instance.id is not None and Client.objects.filter(
+            id=instance.id).values_list(
+                'status', 'meal_default_week').first() == (
+                    instance.status, instance.meal_default_week):
+        return
+    instance.meals_changed_at = timezone.now()
+
+
+def client_option_changed(sender, instance, **kwargs):
+    if Option.objects.filter(
+            id=instance.option_id, name='meals_schedule').exists():
+        meals_changed(instance.client_id)
+
+
+def scheduled_status_changed(sender, instance, **kwargs):
+    meals_changed(instance.client_id)
+
+
+HANDLERS = (
+    (Client_option, client_option_changed),
+    (ClientScheduledStatus, scheduled_status_changed),
+)
+
+
+def connect():
+    # called once the models are loaded, see MemberConfig.ready
+    for sender, handler in HANDLERS:
+        post_save.connect(handler, sender=sender,
+                          dispatch_uid='member.' + handler.__name__)
+        post_delete.connect(handler, sender=sender,
+                            dispatch_uid='member.' + handler.__name__)
+    pre_save.connect(client_saving, sender=Client,
+                     dispatch_uid='member.client_saving')
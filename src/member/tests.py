@@ -4,7 +4,7 @@ from django.test import TestCase, Client
 from member.models import Member, Client, User, Address, Referencing
 from member.models import Contact, Option, Client_option, Restriction, Route
 from member.models import Client_avoid_ingredient, Client_avoid_component
-from member.models import ClientScheduledStatus
+from member.models import ClientScheduledStatus, MealSchedule
 from member.models import CELL, HOME, EMAIL
 from meal.models import Restricted_item, Ingredient, Component
 from datetime import date
@@ -297,6 +297,140 @@ class ClientOptionTestCase(TestCase):
         )
 
 
+class MealScheduleTestCase(TestCase):
+
+    fixtures = ['routes']
+
+    def setUp(self):
+        self.client_test = ClientFactory()
+        self.client_test.meal_default_week = {
+            'main_dish_monday_quantity': 2,
+            'size_monday': 'L',
+            'dessert_monday_quantity': 1,
+            'pudding_monday_quantity': None,
+            'main_dish_friday_quantity': 1,
+            'size_friday': 'R',
+        }
+
+    def test_compiled_defaults(self):
+        """The compiled schedule has the quantities and sizes of the
+        meal defaults."""
+        schedule = self.client_test.meal_schedule
+        self.assertEqual(schedule.quantities[0], (2, 1, 0, 0, 0, 0, 0))
+        self.assertEqual(schedule.sizes, ('L', '', '', '', 'R', '', ''))
+        self.assertEqual(Client.get_meal_defaults(
+            self.client_test, 'main_dish', 0), (2, 'L'))
+        self.assertEqual(Client.get_meal_defaults(
+            self.client_test, 'pudding', 0), (0, 'L'))
+        self.assertEqual(schedule.week(), [
+            ('L', [('main_dish', 2), ('dessert', 1)]),
+            None, None, None, ('R', [('main_dish', 1)]), None, None])
+        self.assertEqual(
+            schedule.with_delivery_days(['friday']).week()[0], None)
+        self.assertEqual(MealSchedule(None).week(), [None] * 7)
+
+    def test_cached(self):
+        """The schedule is compiled again only when the meal defaults
+        change."""
+        schedule = self.client_test.meal_schedule
+        self.assertIs(self.client_test.meal_schedule, schedule)
+        self.client_test.set_meal_defaults('main_dish', 1, 3, 'R')
+        self.assertEqual(Client.get_meal_defaults(
+            self.client_test, 'main_dish', 1), (3, 'R'))
+        self.client_test.meal_default_week = {}
+        self.assertEqual(Client.get_meal_defaults(
+            self.client_test, 'main_dish', 1), (0, ''))
+
+    def test_changed_in_place(self):
+        """Changing the meal defaults in place, like the forms do, is
+        reflected by the schedule and the orders created."""
+        self.assertEqual(self.client_test.meal_schedule.quantity(
+            'main_dish', 0), 2)
+        self.client_test.meal_default_week['main_dish_monday_quantity'] = 4
+        self.client_test.meal_default_week['size_monday'] = 'R'
+        self.assertEqual(Client.get_meal_defaults(
+            self.client_test, 'main_dish', 0), (4, 'R'))
+        items = Order.get_default_items(self.client_test, 0)
+        self.assertEqual(
+            [(item.component_group, item.total_quantity, item.size)
+             for item in items if item.component_group == 'main_dish'],
+            [('main_dish', 4, 'R')])
+
+    def test_meals_schedule(self):
+        """The schedule of the delivery days is loaded with one query."""
+        with self.assertNumQueries(1):
+            prefs = self.client_test.meals_schedule
+        self.assertEqual(prefs['monday']['main_dish'], 2)
+        self.assertEqual(prefs['friday']['size'], 'R')
+        Client_option.objects.create(
+            client=self.client_test,
+            option=Option.objects.create(
+                name='meals_schedule', option_group='dish'),
+            value=json.dumps(['friday']))
+        with self.assertNumQueries(1):
+            prefs = self.client_test.meals_schedule
+        self.assertIsNone(prefs['monday'])
+        self.assertEqual(prefs['friday']['main_dish'], 1)
+
+
+class MealsChangedTestCase(TestCase):
+
+    fixtures = ['routes']
+
+    def setUp(self):
+        self.client_test = ClientFactory()
+
+    def changed_at(self):
+        return Client.objects.get(id=self.client_test.id).meals_changed_at
+
+    def set_changed_at(self, meals_changed_at):
+        Client.objects.filter(id=self.client_test.id).update(
+            meals_changed_at=meals_changed_at)
+        return meals_changed_at
+
+    def past(self):
+        # moves the last change back in time, so that the next change
+        #   gets a later timestamp whatever the clock resolution
+        return self.set_changed_at(
+            self.changed_at() - datetime.timedelta(days=1))
+
+    def test_tracked_changes(self):
+        """The changes to the meals of a client are timestamped."""
+        self.assertIsNotNone(self.changed_at())
+        self.set_changed_at(None)
+        client = Client.objects.get(id=self.client_test.id)
+        client.delivery_note = 'Ring twice'
+        client.save()
+        self.assertIsNone(self.changed_at())
+
+        client.set_meal_defaults('main_dish', 0, 4, 'L')
+        client.save()
+        self.assertIsNotNone(self.changed_at())
+        changed_at = self.past()
+
+        client.status = Client.PAUSED
+        client.save()
+        self.assertGreater(self.changed_at(), changed_at)
+        changed_at = self.past()
+
+        Option.objects.create(name='meals_schedule', option_group='dish')
+        client.set_meals_schedule(['monday'])
+        self.assertGreater(self.changed_at(), changed_at)
+        changed_at = self.past()
+
+        ClientScheduledStatus.objects.create(
+            client=client, status_from=Client.PAUSED,
+            status_to=Client.ACTIVE, change_date=date.today())
+        self.assertGreater(self.changed_at(), changed_at)
+        changed_at = self.past()
+
+        # other options are not part of the meals
+        Client_option.objects.create(
+            client=client, option=Option.objects.create(
+                name='PUREE ALL', option_group='preparation'))
+        self.assertEqual(self.changed_at(), changed_at)
+
+
 class RestrictionTestCase(TestCase):
 
     @classmethod
@@ -276,15 +276,13 @@ class ClientUpdateDietaryRestriction(generic.edit.FormView):
 
         }
 
-        day_count = 0
-        for day, v in DAYS_OF_WEEK:
+        schedule = client.meal_schedule
+        for day_count, (day, v) in enumerate(DAYS_OF_WEEK):
             for component, v in COMPONENT_GROUP_CHOICES:
-                meals_default = Client.get_meal_defaults(
-                    client, component, day_count)
-                initial[component + '_' + day + '_quantity'] = meals_default[0]
+                initial[component + '_' + day + '_quantity'] = \
+                    schedule.quantity(component, day_count)
                 if component == 'main_dish':
-                    initial['size_' + day] = meals_default[1]
-            day_count += 1
+                    initial['size_' + day] = schedule.sizes[day_count]
 
         return initial
 
@@ -0,0 +1,171 @@
+import collections
+import datetime
+import multiprocessing
+import time
+
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from member.models import Client
+from .models import Order, OrderRefresh, ORDER_STATUS_ORDERED
+
+# Number of clients whose orders are created in each transaction
+CHUNK_SIZE = 500
+
+# Time before the last refresh of a date during which the changes of
+#   the clients are considered again by the next refresh: a change
+#   stamped before a refresh started, but committed after, was not seen
+#   by it
+REFRESH_OVERLAP = datetime.timedelta(minutes=5)
+
+# Orders created for a delivery date
+DateResult = collections.namedtuple(
+    'DateResult',
+    ['delivery_date',
+     'orders',  # number of orders created
+     'seconds'])  # time spent creating them, summed over the workers
+
+
+def date_range(start_date, end_date):
+    """Returns the list of the dates from start_date to end_date
+    included."""
+    return [start_date + datetime.timedelta(days=k)
+            for k in range((end_date - start_date).days + 1)]
+
+
+def generate_orders(creation_date, delivery_dates, client_ids=None,
+                    workers=None, chunk_size=CHUNK_SIZE):
+    """Creates the orders of the active clients on their meal defaults
+    for several delivery dates.
+
+    The work is split into tasks of up to chunk_size clients for one
+    date, run by a pool of worker processes. Each task creates its
+    orders in its own transaction, see Order.create_orders_on_defaults().
+    Clients that already have an order for a date are skipped, so that
+    generating the orders again only creates the missing ones. The
+    dates that were never refreshed are marked as refreshed when the
+    generation starts, so that refresh_orders() then considers the
+    clients whose meals changed since.
+
+    Args:
+        creation_date: Date on which the orders are created.
+        delivery_dates: Dates on which the orders are delivered.
+        client_ids: Only create the orders of these clients (default:
+            all the active clients).
+        workers: Number of processes (default: one per CPU). With 1,
+            the tasks are run in the current process.
+        chunk_size: Maximum number of clients of a task.
+
+    Returns:
+        List of DateResult, one per delivery date.
+    """
+    if client_ids is None:
+        client_ids = list(Client.active.order_by('id').values_list(
+            'id', flat=True))
+    chunks = [client_ids[k:k + chunk_size]
+              for k in range(0, len(client_ids), chunk_size)]
+    tasks = [(creation_date, delivery_date, chunk)
+             for delivery_date in delivery_dates for chunk in chunks]
+    generated_at = timezone.now()
+    for delivery_date in delivery_dates:
+        OrderRefresh.objects.get_or_create(
+            delivery_date=delivery_date,
+            defaults={'refreshed_at': generated_at})
+
+    if workers == 1 or len(tasks) < 2:
+        results = [create_orders_task(task) for task in tasks]
+    else:
+        # Worker processes open their own database connections: do
+        #   not let them inherit those of this process.
+        connections.close_all()
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(create_orders_task, tasks)
+
+    orders = collections.Counter()
+    seconds = collections.Counter()
+    for delivery_date, created, elapsed in results:
+        orders[delivery_date] += created
+        seconds[delivery_date] += elapsed
+    return [DateResult(delivery_date, orders[delivery_date],
+                       round(seconds[delivery_date], 6))
+            for delivery_date in delivery_dates]
+
+
+def create_orders_task(task):
+    # Creates the orders of a chunk of clients for a date, in a worker
+    #   process of generate_orders(). Only uses picklable arguments and
+    #   results.
+    creation_date, delivery_date, client_ids = task
+    start = time.perf_counter()
+    created = Order.create_orders_on_defaults(
+        creation_date, delivery_date,
+        Client.objects.filter(id__in=client_ids))
+    return delivery_date, created, time.perf_counter() - start
+
+
+def refresh_orders(creation_date, delivery_date, replace=False):
+    """Creates the orders of a delivery date for the clients whose meals
+    changed since the last refresh of the date.
+
+    The first refresh of a date considers all the active clients. The
+    next ones, and those following generate_orders(), only consider
+    the clients whose meal defaults, status, meals schedule or
+    scheduled statuses changed since, according to
+    Client.meals_changed_at, so that a refresh is quick when few
+    clients changed. The clients that changed up to REFRESH_OVERLAP
+    before the last refresh are considered again, in case their change
+    was not committed yet when it ran.
+
+    Args:
+        creation_date: Date on which the orders are created.
+        delivery_date: Date on which the orders are delivered.
+        replace: Delete the orders of the changed clients that are not
+            delivered yet and create them again on their meal defaults.
+            On the first refresh of a date, the orders of the clients
+            whose meals changed on or after the day they were created
+            are replaced.
+
+    Returns:
+        (number of orders deleted, number of orders created)
+    """
+    with transaction.atomic():
+        # changes made while the orders are created are seen by the
+        #   next refresh
+        refreshed_at = timezone.now()
+        last = OrderRefresh.objects.select_for_update().filter(
+            delivery_date=delivery_date).first()
+        clients = Client.objects.all()
+        if last is not None:
+            clients = clients.filter(
+                meals_changed_at__gte=last.refreshed_at - REFRESH_OVERLAP)
+        deleted = 0
+        if replace:
+            orders = Order.objects.filter(
+                delivery_date=delivery_date, client__in=clients,
+                status=ORDER_STATUS_ORDERED)
+            if last is None:
+                # the orders were not created by a refresh: replace
+                #   those whose client changed on or after their creation
+                changed = Q(pk__in=[])
+                for order_date in orders.values_list(
+                        'creation_date', flat=True).distinct():
+                    changed |= Q(
+                        creation_date=order_date,
+                        client__meals_changed_at__gte=start_of_day(
+                            order_date))
+                orders = orders.filter(changed)
+            deleted = orders.delete()[1].get(Order._meta.label, 0)
+        created = Order.create_orders_on_defaults(
+            creation_date, delivery_date,
+            clients.filter(status=Client.ACTIVE))
+        OrderRefresh.objects.update_or_create(
+            delivery_date=delivery_date,
+            defaults={'refreshed_at': refreshed_at})
+    return deleted, created
+
+
+def start_of_day(day):
+    # first instant of a date, in UTC like the TIME_ZONE setting
+    return timezone.make_aware(
+        datetime.datetime.combine(day, datetime.time.min), timezone.utc)
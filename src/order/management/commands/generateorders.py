@@ -1,6 +1,7 @@
-from django.core.management.base import BaseCommand
-from order.models import Order
-from member.models import Client
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from order.generation import CHUNK_SIZE, date_range, generate_orders
 from datetime import datetime
 from django.contrib.admin.models import LogEntry, ADDITION, CHANGE
 
@@ -17,6 +18,23 @@ class Command(BaseCommand):
             'delivery_date',
             help='The date must be in the format YYYY-MM-DD',
         )
+        parser.add_argument(
+            '--end_date',
+            help='Generate the orders of all the dates from delivery_date '
+                 'to this date included, in the format YYYY-MM-DD',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of worker processes (default: one per CPU)',
+        )
+        parser.add_argument(
+            '--chunk_size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Number of clients whose orders are created in each '
+                 'transaction',
+        )
 
     def handle(self, *args, **options):
         if options['creation_date']:
@@ -28,15 +46,35 @@ class Command(BaseCommand):
         delivery_date = datetime.strptime(
             options['delivery_date'], '%Y-%m-%d'
         ).date()
-        clients = Client.active.all()
-        numorders = Order.create_orders_on_defaults(
-            creation_date, delivery_date, clients)
+        if options['end_date']:
+            end_date = datetime.strptime(
+                options['end_date'], '%Y-%m-%d'
+            ).date()
+        else:
+            end_date = delivery_date
+        if end_date < delivery_date:
+            raise CommandError('The end date is before the delivery date')
+        if options['chunk_size'] < 1:
+            raise CommandError('The chunk size must be positive')
+
+        start = time.perf_counter()
+        results = generate_orders(
+            creation_date, date_range(delivery_date, end_date),
+            workers=options['workers'], chunk_size=options['chunk_size'])
+        seconds = time.perf_counter() - start
         LogEntry.objects.log_action(
             user_id=1, content_type_id=1,
             object_id="", object_repr="Generation of order for "+str(
                 datetime.now().strftime('%Y-%m-%d %H:%M')),
             action_flag=ADDITION,
         )
-        print("On", creation_date,
-              "created", numorders,
-              "orders to be delivered on", delivery_date, ".")
+        for result in results:
+            self.stdout.write(
+                "On {} created {} orders to be delivered on {}.".format(
+                    creation_date, result.orders, result.delivery_date))
+        numorders = sum(result.orders for result in results)
+        self.stdout.write(
+            "{} orders created for {} date(s) in {:.2f} s "
+            "({:.0f} orders/s).".format(
+                numorders, len(results), seconds,
+                numorders / seconds if seconds else 0))
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10 on 2026-10-18 06:34
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0008_auto_20160912_1509'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRefresh',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivery_date', models.DateField(unique=True, verbose_name='delivery date')),
+                ('refreshed_at', models.DateTimeField(verbose_name='refreshed at')),
+            ],
+            options={
+                'verbose_name_plural': 'order refreshes',
+            },
+        ),
+    ]
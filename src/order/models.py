@@ -1,6 +1,6 @@
 import collections
 
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Q
 from django.utils.translation import ugettext_lazy as _
 from django_filters import FilterSet, MethodFilter, ChoiceFilter
@@ -20,6 +20,7 @@ from meal.models import (Menu, Menu_component, Component,
                          Component_ingredient, Incompatibility,
                          COMPONENT_GROUP_CHOICES,
                          COMPONENT_GROUP_CHOICES_MAIN_DISH)
+from order.signals import orders_created
 
 
 ORDER_STATUS = (
@@ -62,6 +63,9 @@ SIDE_PRICE_LOW_INCOME = 0.75
 MAIN_PRICE_SOLIDARY = 6.00
 SIDE_PRICE_SOLIDARY = 0.50
 
+# Number of rows inserted by each query of the bulk order creation
+BULK_BATCH_SIZE = 500
+
 
 class OrderManager(models.Manager):
 
@@ -151,70 +155,107 @@ class Order(models.Model):
           delivery_date : date on which orders are to be delivered
           clients : a list of one or many client objects
 
+        The orders of the clients that do not have one for the date
+        yet are created in bulk, in a single transaction. The
+        orders_created signal is then sent instead of the post_save
+        signals of each order and item.
+
         Returns:
           Number of orders created.
         """
 
-        num_orders_created = 0
         day = delivery_date.weekday()  # Monday is 0, Sunday is 6
+        # clients that already have an order for the date
+        #   (if want to replace, must be deleted first)
+        existing = set(Order.objects.filter(
+            delivery_date=delivery_date).values_list('client_id', flat=True))
+        # client id -> items of its new order
+        new_items = collections.OrderedDict()
         for client in clients:
-            # find quantity of free side dishes based on number of main dishes
-            free_side_dish_qty = Client.get_meal_defaults(
-                client,
-                COMPONENT_GROUP_CHOICES_MAIN_DISH, day)[0]
-            # print ("Side dish", free_side_dish_qty)
-            if free_side_dish_qty == 0:
-                continue  # No meal for client on this day
-            try:
-                Order.objects.get(client=client, delivery_date=delivery_date)
-                # order already created, skip order items creation
-                # (if want to replace, must be deleted first)
+            if client.id in existing or client.id in new_items:
                 continue
-            except Order.DoesNotExist:
-                order = Order(client=client,
-                              creation_date=creation_date,
-                              delivery_date=delivery_date,
-                              status=ORDER_STATUS_ORDERED)
-                order.save()
-                num_orders_created += 1
-            # TODO Use Parameters Model in member to store unit prices
-            if client.rate_type == RATE_TYPE_LOW_INCOME:
-                main_price = MAIN_PRICE_LOW_INCOME
-                side_price = SIDE_PRICE_LOW_INCOME
-            elif client.rate_type == RATE_TYPE_SOLIDARY:
-                main_price = MAIN_PRICE_SOLIDARY
-                side_price = SIDE_PRICE_SOLIDARY
-            else:
-                main_price = MAIN_PRICE_DEFAULT
-                side_price = SIDE_PRICE_DEFAULT
-            for component_group, trans in COMPONENT_GROUP_CHOICES:
-                default_qty, default_size = \
-                    Client.get_meal_defaults(
-                        client, component_group, day)
-                if default_qty > 0:
-                    total_quantity = default_qty
-                    free_quantity = 0
-                    if (component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH):
-                        unit_price = main_price
-                    else:
-                        unit_price = side_price
-                        while free_side_dish_qty > 0 and default_qty > 0:
-                            free_side_dish_qty -= 1
-                            default_qty -= 1
-                            free_quantity += 1
-                    oi = Order_item(
-                        order=order,
-                        component_group=component_group,
-                        price=(total_quantity - free_quantity) * unit_price,
-                        billable_flag=True,
-                        size=default_size,
-                        order_item_type=ORDER_ITEM_TYPE_CHOICES_COMPONENT,
-                        total_quantity=total_quantity,
-                        free_quantity=free_quantity)
-                    oi.save()
-
-        # print("Number of orders created = ", num_orders_created) #DEBUG
-        return num_orders_created
+            items = Order.get_default_items(client, day)
+            if items:
+                new_items[client.id] = items
+        if not new_items:
+            return 0
+
+        with transaction.atomic():
+            Order.objects.bulk_create(
+                [Order(client_id=client_id,
+                       creation_date=creation_date,
+                       delivery_date=delivery_date,
+                       status=ORDER_STATUS_ORDERED)
+                 for client_id in new_items],
+                batch_size=BULK_BATCH_SIZE)
+            # bulk_create does not set the ids of the orders on all the
+            #   databases
+            order_ids = {
+                client_id: order_id for client_id, order_id in
+                Order.objects.filter(
+                    delivery_date=delivery_date
+                ).values_list('client_id', 'id')
+                if client_id in new_items}
+            for client_id, items in new_items.items():
+                for item in items:
+                    item.order_id = order_ids[client_id]
+            Order_item.objects.bulk_create(
+                [item for items in new_items.values() for item in items],
+                batch_size=BULK_BATCH_SIZE)
+        orders_created.send(sender=Order, delivery_date=delivery_date,
+                            client_ids=list(new_items))
+        return len(new_items)
+
+    @staticmethod
+    def get_default_items(client, day):
+        """Returns the unsaved order items of a client on its meal
+        defaults for a day of the week, an empty list when it has no
+        meal on that day.
+
+        Parameters:
+          client : client object
+          day : day of week where 0 is monday, 6 is sunday
+        """
+        schedule = client.meal_schedule
+        # find quantity of free side dishes based on number of main dishes
+        free_side_dish_qty = schedule.quantity(
+            COMPONENT_GROUP_CHOICES_MAIN_DISH, day)
+        if free_side_dish_qty == 0:
+            return []  # No meal for client on this day
+        # TODO Use Parameters Model in member to store unit prices
+        if client.rate_type == RATE_TYPE_LOW_INCOME:
+            main_price = MAIN_PRICE_LOW_INCOME
+            side_price = SIDE_PRICE_LOW_INCOME
+        elif client.rate_type == RATE_TYPE_SOLIDARY:
+            main_price = MAIN_PRICE_SOLIDARY
+            side_price = SIDE_PRICE_SOLIDARY
+        else:
+            main_price = MAIN_PRICE_DEFAULT
+            side_price = SIDE_PRICE_DEFAULT
+        items = []
+        default_size = schedule.sizes[day]
+        for (component_group, trans), default_qty in zip(
+                COMPONENT_GROUP_CHOICES, schedule.quantities[day]):
+            if default_qty > 0:
+                total_quantity = default_qty
+                free_quantity = 0
+                if (component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH):
+                    unit_price = main_price
+                else:
+                    unit_price = side_price
+                    while free_side_dish_qty > 0 and default_qty > 0:
+                        free_side_dish_qty -= 1
+                        default_qty -= 1
+                        free_quantity += 1
+                items.append(Order_item(
+                    component_group=component_group,
+                    price=(total_quantity - free_quantity) * unit_price,
+                    billable_flag=True,
+                    size=default_size,
+                    order_item_type=ORDER_ITEM_TYPE_CHOICES_COMPONENT,
+                    total_quantity=total_quantity,
+                    free_quantity=free_quantity))
+        return items
 
     @staticmethod
     def get_kitchen_items(delivery_date):
@@ -241,251 +282,198 @@ class Order(models.Model):
         tord = db_sa_table(Order)
         torditm = db_sa_table(Order_item)
 
-        # Day's avoid ingredients clashes
-        q_day_avo_ing = select(
+        # Each dimension of the kitchen count is selected by its own
+        #   narrow query keyed on the client id. The menu of the day is
+        #   loaded once and the clashes are found by intersecting sets,
+        #   instead of joining the menu to every avoided ingredient.
+        day_clients = select([tord.c.client_id]).\
+            where(tord.c.delivery_date == delivery_date)
+
+        # Day's clients
+        q_day_cli = select(
             [tcli.c.id.label('cid'),
              tmem.c.firstname, tmem.c.lastname,
-             tord.c.id, tord.c.delivery_date,
-             tmen.c.id, tmencom.c.id.label('menucompid'),
-             ting.c.name.label('ingredient'), tcom.c.name,
-             torditm.c.id, torditm.c.order_id.label('oiorderid')]).\
+             trou.c.name.label('routename')]).\
             select_from(
                 tmem.
                 join(tcli, tcli.c.member_id == tmem.c.id).
-                join(tord, tord.c.client_id == tcli.c.id).
-                join(tmen, tmen.c.date == delivery_date).
-                join(tcliavoing, tcliavoing.c.client_id == tcli.c.id).
-                join(ting, ting.c.id == tcliavoing.c.ingredient_id).
-                outerjoin(tcoming, and_(tcoming.c.ingredient_id == ting.c.id,
-                                        tcoming.c.date == delivery_date)).
-                outerjoin(tcom, tcom.c.id == tcoming.c.component_id).
-                outerjoin(
-                    torditm,
-                    and_(torditm.c.component_group == tcom.c.component_group,
-                         torditm.c.order_id == tord.c.id)).
-                outerjoin(tmencom, and_(tmencom.c.component_id == tcom.c.id,
-                                        tmencom.c.menu_id == tmen.c.id))).\
+                outerjoin(trou, trou.c.id == tcli.c.route_id)).\
+            where(tcli.c.id.in_(day_clients))
+        print_rows(q_day_cli,
+                   "\n***** Day's clients ****\nCLIENT_ID,"
+                   "FIRSTNAME, LASTNAME, ROUTENAME")
+
+        # Day's menu components and their ingredients
+        q_day_men = select(
+            [tmen.c.id.label('menuid'),
+             tcom.c.id.label('component_id'),
+             tcom.c.name.label('component_name'),
+             tcom.c.component_group,
+             tcoming.c.ingredient_id]).\
+            select_from(
+                tmen.
+                outerjoin(tmencom, tmencom.c.menu_id == tmen.c.id).
+                outerjoin(tcom, tcom.c.id == tmencom.c.component_id).
+                outerjoin(tcoming, and_(tcoming.c.component_id == tcom.c.id,
+                                        tcoming.c.date == delivery_date))).\
+            where(tmen.c.date == delivery_date)
+        print_rows(q_day_men,
+                   "\n***** Day's menu ****\nMENU_ID, "
+                   "COMPONENT_ID, COMPONENT_NAME, COMPONENT_GROUP, "
+                   "INGREDIENT_ID")
+
+        # Day's order items
+        q_day_itm = select(
+            [tord.c.client_id.label('cid'),
+             torditm.c.component_group,
+             torditm.c.total_quantity, torditm.c.size]).\
+            select_from(
+                tord.
+                join(torditm, torditm.c.order_id == tord.c.id)).\
             where(tord.c.delivery_date == delivery_date).\
-            order_by(tcli.c.id)
-        print_rows(
-            q_day_avo_ing,
-            "\n***** Day's avoid ingredients clashes ****\nCLIENT_ID,"
-            "FIRSTNAME, LASTNAME, "
-            "ORDER_ID, ORDER_DELIV_DATE, "
-            "MENU_ID, MENU_COMPONENT_ID, "
-            "INGREDIENT_NAME, COMP_NAME, "
-            "ORDER_ITEM_ID, ORDER_ITEM_ORDER_ID")
-
-        # Day's avoid component clashes
+            order_by(torditm.c.id)
+        print_rows(q_day_itm,
+                   "\n***** Day's order items ****\nCLIENT_ID, "
+                   "COMPONENT_GROUP, OI_TOTAL_QUANTITY, OI_SIZE")
+
+        # Day's avoid ingredients
+        q_day_avo_ing = select(
+            [tcliavoing.c.client_id.label('cid'),
+             ting.c.id.label('ingredient_id'),
+             ting.c.name.label('ingredient')]).\
+            select_from(
+                tcliavoing.
+                join(ting, ting.c.id == tcliavoing.c.ingredient_id)).\
+            where(tcliavoing.c.client_id.in_(day_clients))
+        print_rows(q_day_avo_ing,
+                   "\n***** Day's avoid ingredients ****\nCLIENT_ID, "
+                   "INGREDIENT_ID, INGREDIENT_NAME")
+
+        # Day's avoid components
         q_day_avo_com = select(
-            [tcli.c.id.label('cid'),
-             tmem.c.firstname, tmem.c.lastname,
-             tord.c.id, tord.c.delivery_date,
-             tmen.c.id, tmencom.c.id.label('menucompid'),
+            [tcliavocom.c.client_id.label('cid'),
+             tcom.c.id.label('component_id'),
              tcom.c.name.label('component'),
-             torditm.c.id, torditm.c.order_id.label('oiorderid')]).\
+             tcom.c.component_group]).\
             select_from(
-                tmem.
-                join(tcli, tcli.c.member_id == tmem.c.id).
-                join(tord, and_(tord.c.client_id == tcli.c.id,
-                                tord.c.delivery_date == delivery_date)).
-                join(tmen, tmen.c.date == delivery_date).
-                join(tcliavocom, tcliavocom.c.client_id == tcli.c.id).
-                join(tcom, tcom.c.id == tcliavocom.c.component_id).
-                outerjoin(
-                    torditm,
-                    and_(torditm.c.component_group == tcom.c.component_group,
-                         torditm.c.order_id == tord.c.id)).
-                outerjoin(tmencom, and_(tmencom.c.component_id == tcom.c.id,
-                                        tmencom.c.menu_id == tmen.c.id))).\
-            where(tord.c.delivery_date == delivery_date).\
-            order_by(tcli.c.id)
+                tcliavocom.
+                join(tcom, tcom.c.id == tcliavocom.c.component_id)).\
+            where(tcliavocom.c.client_id.in_(day_clients))
         print_rows(q_day_avo_com,
-                   "\n***** Day's avoid component clashes ****\nCLIENT_ID,"
-                   "FIRSTNAME, LASTNAME, "
-                   "ORDER_ID, ORDER_DELIV_DATE, "
-                   "MENU_ID, MENU_COMPONENT_ID, "
-                   "COMP_NAME, "
-                   "ORDER_ITEM_ID, ORDER_ITEM_ORDER_ID")
+                   "\n***** Day's avoid components ****\nCLIENT_ID, "
+                   "COMPONENT_ID, COMP_NAME, COMPONENT_GROUP")
 
         # Day's restrictions
         q_day_res = select(
-            [tcli.c.id.label('cid'),
-             tmem.c.firstname, tmem.c.lastname,
-             tord.c.id, tord.c.delivery_date,
-             tmen.c.id, tmencom.c.id.label('menucompid'),
+            [tres.c.client_id.label('cid'),
              tresitm.c.name.label('restricted_item'),
-             ting.c.name.label('ingredient'), tcom.c.name,
-             torditm.c.id, torditm.c.order_id.label('oiorderid')]).\
+             ting.c.id.label('ingredient_id'),
+             ting.c.name.label('ingredient')]).\
             select_from(
-                tmem.
-                join(tcli, tcli.c.member_id == tmem.c.id).
-                join(tord, tord.c.client_id == tcli.c.id).
-                join(tmen, tmen.c.date == delivery_date).
-                join(tres, tres.c.client_id == tcli.c.id).
+                tres.
                 join(tresitm, tresitm.c.id == tres.c.restricted_item_id).
                 outerjoin(
                     tinc,
                     tinc.c.restricted_item_id == tres.c.restricted_item_id).
-                outerjoin(ting, tinc.c.ingredient_id == ting.c.id).
-                outerjoin(tcoming, and_(tcoming.c.ingredient_id == ting.c.id,
-                                        tcoming.c.date == delivery_date)).
-                outerjoin(tcom, tcoming.c.component_id == tcom.c.id).
-                outerjoin(
-                    torditm,
-                    and_(torditm.c.component_group == tcom.c.component_group,
-                         torditm.c.order_id == tord.c.id)).
-                outerjoin(tmencom, and_(tmencom.c.component_id == tcom.c.id,
-                                        tmencom.c.menu_id == tmen.c.id))).\
-            where(tord.c.delivery_date == delivery_date).\
-            order_by(tcli.c.id)
+                outerjoin(ting, tinc.c.ingredient_id == ting.c.id)).\
+            where(tres.c.client_id.in_(day_clients))
         print_rows(q_day_res,
-                   "\n***** Day's restrictions ****\nCLIENT_ID,"
-                   "FIRSTNAME, LASTNAME, "
-                   "ORDER_ID, ORDER_DELIV_DATE, "
-                   "MENU_ID, MENU_COMPONENT_ID, "
-                   "RESTRICTED_ITEM, INGREDIENT_NAME, COMP_NAME, "
-                   "ORDER_ITEM_ID, ORDER_ITEM_ORDER_ID")
+                   "\n***** Day's restrictions ****\nCLIENT_ID, "
+                   "RESTRICTED_ITEM, INGREDIENT_ID, INGREDIENT_NAME")
 
         # Day's preparations
         q_day_pre = select(
-            [tcli.c.id.label('cid'),
-             tmem.c.firstname, tmem.c.lastname,
-             topt.c.name.label('food_prep'),
-             tord.c.id, tord.c.delivery_date]).\
+            [tcliopt.c.client_id.label('cid'),
+             topt.c.name.label('food_prep')]).\
             select_from(
-                tmem.
-                join(tcli, tcli.c.member_id == tmem.c.id).
-                join(tcliopt, tcliopt.c.client_id == tcli.c.id).
-                join(topt, topt.c.id == tcliopt.c.option_id).
-                join(tord, tord.c.client_id == tcli.c.id)).\
-            where(and_(tord.c.delivery_date == delivery_date,
-                       topt.c.option_group == 'preparation')).\
-            order_by(tmem.c.lastname, tmem.c.firstname)
+                tcliopt.
+                join(topt, topt.c.id == tcliopt.c.option_id)).\
+            where(and_(tcliopt.c.client_id.in_(day_clients),
+                       topt.c.option_group == 'preparation'))
         print_rows(q_day_pre,
-                   "\n***** Day's preparations ****\nCLIENT_ID,"
-                   "FIRSTNAME, LASTNAME, "
-                   "FOOD_PREP, "
-                   "ORDER_ID, ORDER_DELIV_DATE")
-
-        # Day's Delivery List
-        q_day_del_lis = select(
-            [tcli.c.id.label('cid'), tmem.c.firstname, tmem.c.lastname,
-             trou.c.name.label('routename'),
-             torditm.c.total_quantity, torditm.c.size,
-             tmen.c.id, tmencom.c.id,
-             tcom.c.id.label('component_id'),
-             tcom.c.component_group,
-             tcom.c.name.label('component_name')]).\
-            select_from(
-                tmem.
-                join(tcli, tcli.c.member_id == tmem.c.id).
-                join(trou, trou.c.id == tcli.c.route_id).
-                join(tmen, tmen.c.date == delivery_date).
-                join(tord, tord.c.client_id == tcli.c.id).
-                join(torditm, torditm.c.order_id == tord.c.id).
-                join(tmencom, tmencom.c.menu_id == tmen.c.id).
-                join(
-                    tcom,
-                    and_(tcom.c.id == tmencom.c.component_id,
-                         tcom.c.component_group ==
-                         torditm.c.component_group))).\
-            where(tord.c.delivery_date == delivery_date).\
-            order_by(tmem.c.lastname, tmem.c.firstname)
-        print_rows(q_day_del_lis,
-                   "\n***** Delivery List ******\n CLIENT_ID,"
-                   " FIRSTNAME, LASTNAME, ROUTENAME, "
-                   "OI_TOTAL_QUANTITY, OI_SIZE, "
-                   "MENU_ID, MENU_COMPONENT_ID, "
-                   "COMPONENT_ID, COMPONENT_GROUP, COMPONENT_NAME")
+                   "\n***** Day's preparations ****\nCLIENT_ID, "
+                   "FOOD_PREP")
+
+        clients = {row.cid: row for row in db_sa_session.execute(q_day_cli)}
+
+        menu_exists = False
+        # component group -> {component id: component name} on the menu
+        menu_components = collections.defaultdict(dict)
+        # ingredient id -> groups of the menu components containing it
+        ingredient_groups = collections.defaultdict(set)
+        for row in db_sa_session.execute(q_day_men):
+            menu_exists = True
+            if row.component_id is None:
+                continue
+            menu_components[row.component_group][row.component_id] = \
+                row.component_name
+            if row.ingredient_id is not None:
+                ingredient_groups[row.ingredient_id].add(row.component_group)
+
+        order_items = db_sa_session.execute(q_day_itm).fetchall()
+        # client id -> component groups ordered for the day
+        ordered_groups = collections.defaultdict(set)
+        for row in order_items:
+            ordered_groups[row.cid].add(row.component_group)
 
         kitchen_list = {}
-        rows = db_sa_session.execute(q_day_avo_ing)
-        for row in rows:
-            check_for_new_client(kitchen_list, row)
-            if row.oiorderid and row.menucompid:
-                # found avoid ingredient clash
-                # should be a sorted set (or ordered dict ?)
-                kitchen_list[row.cid].incompatible_ingredients.append(
-                    row.ingredient)
-            # we Know that it is not incommpatible
-            elif (row.ingredient not in
-                  kitchen_list[row.cid].incompatible_ingredients):
-                # found new other avoid ingredient that does not clash today
-                # should be a set
-                kitchen_list[row.cid].other_ingredients.append(
-                    row.ingredient)
-        # END FOR
-
-        rows = db_sa_session.execute(q_day_avo_com)
-        for row in rows:
-            check_for_new_client(kitchen_list, row)
-            if row.oiorderid and row.menucompid:
-                # found avoid component clash
-                # should be a set
-                kitchen_list[row.cid].incompatible_components.append(
-                    row.component)
-            # we Know that it is not incommpatible
-            elif (row.component not in
-                  kitchen_list[row.cid].incompatible_components):
-                # found new other avoid component that does not clash today
-                # should be a set
-                kitchen_list[row.cid].other_components.append(
-                    row.component)
-        # END FOR
-
-        rows = db_sa_session.execute(q_day_res)
-        for row in rows:
-            check_for_new_client(kitchen_list, row)
-            if row.oiorderid and row.menucompid:
-                # found restriction clash
-                # should be a sorted set
-                kitchen_list[row.cid].incompatible_ingredients.append(
-                    row.ingredient)
-            elif (row.ingredient and row.ingredient not in
-                  kitchen_list[row.cid].incompatible_ingredients):
-                # found new other restriction that does not clash today
-                # should be a set
-                kitchen_list[row.cid].other_ingredients.append(
-                    row.ingredient)
-            if (row.restricted_item not in
-                    kitchen_list[row.cid].restricted_items):
-                # remember restricted_item
-                kitchen_list[row.cid].restricted_items.append(
-                    row.restricted_item)
-        # END FOR
-
-        rows = db_sa_session.execute(q_day_pre)
-        for row in rows:
-            check_for_new_client(kitchen_list, row)
-            # should be a sorted set
+        # Avoided and restricted items only matter when there is a menu
+        if menu_exists:
+            for row in db_sa_session.execute(q_day_avo_ing):
+                item = check_for_new_client(kitchen_list, clients[row.cid])
+                if ingredient_groups[row.ingredient_id] & \
+                        ordered_groups[row.cid]:
+                    # found avoid ingredient clash
+                    item.incompatible_ingredients.add(row.ingredient)
+                else:
+                    item.other_ingredients.add(row.ingredient)
+
+            for row in db_sa_session.execute(q_day_avo_com):
+                item = check_for_new_client(kitchen_list, clients[row.cid])
+                if (row.component_group in ordered_groups[row.cid] and
+                        row.component_id in
+                        menu_components[row.component_group]):
+                    # found avoid component clash
+                    item.incompatible_components.add(row.component)
+                else:
+                    item.other_components.add(row.component)
+
+            for row in db_sa_session.execute(q_day_res):
+                item = check_for_new_client(kitchen_list, clients[row.cid])
+                item.restricted_items.add(row.restricted_item)
+                if row.ingredient_id is None:
+                    continue
+                if ingredient_groups[row.ingredient_id] & \
+                        ordered_groups[row.cid]:
+                    # found restriction clash
+                    item.incompatible_ingredients.add(row.ingredient)
+                else:
+                    item.other_ingredients.add(row.ingredient)
+
+        for row in db_sa_session.execute(q_day_pre):
+            item = check_for_new_client(kitchen_list, clients[row.cid])
             # found client with food preparation
-            kitchen_list[row.cid].preparation.append(row.food_prep)
-        # END FOR
+            item.preparation.add(row.food_prep)
 
         # Components summary and data for all labels for the day
-        rows = db_sa_session.execute(q_day_del_lis)
-        for row in rows:
-            check_for_new_client(kitchen_list, row)
-            if row.component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH:
-                kitchen_list[row.cid].meal_qty = \
-                    kitchen_list[row.cid].meal_qty + row.total_quantity
-                kitchen_list[row.cid].meal_size = row.size
-            kitchen_list[row.cid].meal_components[row.component_group] = \
-                MealComponent(id=row.component_id,
-                              name=row.component_name,
-                              qty=row.total_quantity)
-            kitchen_list[row.cid].routename = row.routename
-        # END FOR
-
-        # sort requirements list in each value
-        for value in kitchen_list.values():
-            value.incompatible_ingredients.sort()
-            value.incompatible_components.sort()
-            value.other_ingredients.sort()
-            value.other_components.sort()
-            value.restricted_items.sort()
-            value.preparation.sort()
+        for row in order_items:
+            client = clients[row.cid]
+            if client.routename is None:
+                continue
+            components = menu_components[row.component_group]
+            for component_id, component_name in components.items():
+                item = check_for_new_client(kitchen_list, client)
+                if row.component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH:
+                    item.meal_qty = item.meal_qty + row.total_quantity
+                    item.meal_size = row.size
+                item.meal_components[row.component_group] = MealComponent(
+                    id=component_id,
+                    name=component_name,
+                    qty=row.total_quantity)
+                item.routename = client.routename
+
+        for item in kitchen_list.values():
+            item.sort_requirements()
 
         return kitchen_list
 
@@ -543,24 +531,53 @@ MealComponent = \
 
 class KitchenItem(object):
     # meal specifics for an order
+    #   The requirements are collected in sets while the kitchen count
+    #   is built, then turned into sorted lists by sort_requirements().
+
+    __slots__ = (
+        'lastname',
+        'firstname',
+        'routename',
+        'meal_qty',
+        'meal_size',
+        'incompatible_ingredients',
+        'incompatible_components',
+        'other_ingredients',
+        'other_components',
+        'restricted_items',
+        'preparation',
+        'meal_components',
+    )
 
-    def __init__(self):
+    def __init__(self, lastname=None, firstname=None):
 
-        self.lastname = None
-        self.firstname = None
+        self.lastname = lastname
+        self.firstname = firstname
         self.routename = None
         self.meal_qty = 0
         self.meal_size = ''
-        self.incompatible_ingredients = []
-        self.incompatible_components = []
-        self.other_ingredients = []
-        self.other_components = []
-        self.restricted_items = []
-        self.preparation = []
+        self.incompatible_ingredients = set()
+        self.incompatible_components = set()
+        self.other_ingredients = set()
+        self.other_components = set()
+        self.restricted_items = set()
+        self.preparation = set()
         self.meal_components = {}
         #  key is a component_group,
         #  value is a MealComponent named tuple
 
+    def sort_requirements(self):
+        # sorted requirements lists, other items being those that do
+        #   not clash today
+        self.other_ingredients = sorted(
+            self.other_ingredients.difference(self.incompatible_ingredients))
+        self.other_components = sorted(
+            self.other_components.difference(self.incompatible_components))
+        self.incompatible_ingredients = sorted(self.incompatible_ingredients)
+        self.incompatible_components = sorted(self.incompatible_components)
+        self.restricted_items = sorted(self.restricted_items)
+        self.preparation = sorted(self.preparation)
+
     def __str__(self):
         return("[" +
                'lastname=' + self.lastname + ', ' +
@@ -590,12 +607,13 @@ def print_rows(q, heading=""):  # USED FOR DEBUGGING; DO NOT REMOVE
 
 
 def check_for_new_client(kitchen_list, row):
-    # add client in list when first found
-    if not kitchen_list.get(row.cid):
+    # add client in list when first found, and return its KitchenItem
+    item = kitchen_list.get(row.cid)
+    if item is None:
         # found new client
-        kitchen_list[row.cid] = KitchenItem()
-        kitchen_list[row.cid].lastname = row.lastname
-        kitchen_list[row.cid].firstname = row.firstname
+        item = kitchen_list[row.cid] = KitchenItem(row.lastname,
+                                                   row.firstname)
+    return item
 
 # End kitchen items helpers
 
@@ -763,3 +781,24 @@ class Order_item(models.Model):
             format(str(self.order.delivery_date),
                    self.order_item_type,
                    self.component_group)
+
+
+class OrderRefresh(models.Model):
+    # When the orders of a delivery date were last generated, see
+    #   order.generation.refresh_orders
+
+    class Meta:
+        verbose_name_plural = _('order refreshes')
+
+    delivery_date = models.DateField(
+        verbose_name=_('delivery date'),
+        unique=True,
+    )
+
+    refreshed_at = models.DateTimeField(
+        verbose_name=_('refreshed at'),
+    )
+
+    def __str__(self):
+        return "delivery_date={}, refreshed_at={}".format(
+            self.delivery_date, self.refreshed_at)
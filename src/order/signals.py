@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent when orders are created in bulk, which does not send the
+#   post_save signals of each order and item.
+orders_created = Signal(providing_args=['delivery_date', 'client_ids'])
@@ -1,17 +1,31 @@
 import random
 import urllib.parse
-from datetime import date
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import TestCase
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse, reverse_lazy
+from django.utils import timezone
 from django.utils.translation import ugettext as _
 
-from member.models import Client, Address, Member
+from member.models import (
+    Client, Address, Member, RATE_TYPE_LOW_INCOME, RATE_TYPE_SOLIDARY)
 from member.factories import RouteFactory, ClientFactory
 from meal.factories import ComponentFactory
-from order.models import Order, Order_item
+from meal.models import (
+    COMPONENT_GROUP_CHOICES, COMPONENT_GROUP_CHOICES_MAIN_DISH)
+from order.models import (
+    Order, Order_item, OrderRefresh, KitchenItem,
+    MAIN_PRICE_DEFAULT, SIDE_PRICE_DEFAULT, MAIN_PRICE_LOW_INCOME,
+    SIDE_PRICE_LOW_INCOME, MAIN_PRICE_SOLIDARY, SIDE_PRICE_SOLIDARY)
 from order.factories import OrderFactory
+from order.generation import date_range, generate_orders, refresh_orders
+from order.signals import orders_created
 
 
 class OrderTestCase(TestCase):
@@ -38,6 +52,30 @@ class OrderTestCase(TestCase):
         self.assertTrue(str(delivery_date) in str(orders[0]))
 
 
+class KitchenItemTestCase(TestCase):
+
+    def test_sort_requirements(self):
+        """Requirements are sorted once, and other items do not repeat
+        the clashing ones."""
+        item = KitchenItem('Tremblay', 'Marie')
+        item.incompatible_ingredients.update(['Pork', 'Garlic'])
+        item.other_ingredients.update(['Pork', 'Onion', 'Celery'])
+        item.other_ingredients.add('Onion')
+        item.preparation.update(['Cut up meat', 'Puree all'])
+        item.sort_requirements()
+        self.assertEqual(item.incompatible_ingredients, ['Garlic', 'Pork'])
+        self.assertEqual(item.other_ingredients, ['Celery', 'Onion'])
+        self.assertEqual(item.preparation, ['Cut up meat', 'Puree all'])
+        self.assertEqual(item.restricted_items, [])
+
+    def test_no_instance_dictionary(self):
+        """Kitchen items only hold their slots."""
+        item = KitchenItem()
+        self.assertFalse(hasattr(item, '__dict__'))
+        with self.assertRaises(AttributeError):
+            item.unknown = True
+
+
 class OrderItemTestCase(TestCase):
 
     @classmethod
@@ -181,6 +219,224 @@ class OrderCreateOnDefaultsTestCase(TestCase):
         # check that old orders not overridden
         self.assertEqual(len(new), len(clients) - numold)
 
+    def test_items_on_defaults(self):
+        """The order items are those of the meal defaults, the main
+        dishes making as many side dishes free."""
+        delivery_date = date(2016, 7, 15)
+        clients = Client.objects.all()
+        Order.create_orders_on_defaults(
+            date(2016, 7, 8), delivery_date, clients)
+        prices = {RATE_TYPE_LOW_INCOME: (MAIN_PRICE_LOW_INCOME,
+                                         SIDE_PRICE_LOW_INCOME),
+                  RATE_TYPE_SOLIDARY: (MAIN_PRICE_SOLIDARY,
+                                       SIDE_PRICE_SOLIDARY)}
+        for client in clients:
+            main_price, side_price = prices.get(
+                client.rate_type, (MAIN_PRICE_DEFAULT, SIDE_PRICE_DEFAULT))
+            free = Client.get_meal_defaults(
+                client, COMPONENT_GROUP_CHOICES_MAIN_DISH, 4)[0]
+            expected = []
+            for component_group, label in COMPONENT_GROUP_CHOICES:
+                quantity, size = Client.get_meal_defaults(
+                    client, component_group, 4)
+                if not quantity:
+                    continue
+                if component_group == COMPONENT_GROUP_CHOICES_MAIN_DISH:
+                    expected.append((component_group, size, quantity, 0,
+                                     quantity * main_price))
+                else:
+                    free_quantity = min(free, quantity)
+                    free -= free_quantity
+                    expected.append((
+                        component_group, size, quantity, free_quantity,
+                        (quantity - free_quantity) * side_price))
+            order = Order.objects.get(
+                client=client, delivery_date=delivery_date)
+            self.assertEqual(
+                sorted(order.orders.values_list(
+                    'component_group', 'size', 'total_quantity',
+                    'free_quantity', 'price')),
+                sorted((group, size, quantity, free, Decimal(str(price)))
+                       for group, size, quantity, free, price in expected))
+            self.assertEqual(order.status, 'O')
+
+    def test_create_orders_queries(self):
+        """The orders are created with the same number of queries,
+        whatever the number of clients, and announced by the
+        orders_created signal."""
+        clients = list(Client.objects.all())
+        # the receivers of the signal are left out of the count
+        with mock.patch.object(orders_created, 'send') as send:
+            with self.assertNumQueries(6):
+                self.assertEqual(Order.create_orders_on_defaults(
+                    date(2016, 7, 8), date(2016, 7, 15), clients[:1]), 1)
+            send.assert_called_once_with(
+                sender=Order, delivery_date=date(2016, 7, 15),
+                client_ids=[clients[0].id])
+            with self.assertNumQueries(6):
+                self.assertEqual(Order.create_orders_on_defaults(
+                    date(2016, 7, 8), date(2016, 7, 22), clients),
+                    len(clients))
+            with self.assertNumQueries(1):
+                self.assertEqual(Order.create_orders_on_defaults(
+                    date(2016, 7, 8), date(2016, 7, 22), clients), 0)
+            self.assertEqual(send.call_count, 2)
+
+
+class GenerateOrdersTestCase(TestCase):
+
+    fixtures = ['routes.json']
+
+    @classmethod
+    def setUpTestData(cls):
+        clients = ClientFactory.create_batch(5, status=Client.ACTIVE)
+        for client in clients:
+            for day in range(7):
+                client.set_meal_defaults('main_dish', day, 1, 'R')
+            client.save()
+
+    def test_date_range(self):
+        """The orders of each date are created in chunks of clients."""
+        dates = date_range(date(2016, 7, 11), date(2016, 7, 13))
+        self.assertEqual(len(dates), 3)
+        clients = Client.active.count()
+        results = generate_orders(date(2016, 7, 8), dates, workers=1,
+                                  chunk_size=2)
+        self.assertEqual([(result.delivery_date, result.orders)
+                          for result in results],
+                         [(delivery_date, clients) for delivery_date in dates])
+        for delivery_date in dates:
+            self.assertEqual(Order.objects.filter(
+                delivery_date=delivery_date).count(), clients)
+
+        # generating again only creates the missing orders
+        Order.objects.filter(delivery_date=dates[1]).first().delete()
+        results = generate_orders(date(2016, 7, 8), dates, workers=1,
+                                  chunk_size=2)
+        self.assertEqual([result.orders for result in results], [0, 1, 0])
+
+    def test_command(self):
+        """The command reports the orders created for each date."""
+        out = StringIO()
+        call_command('generateorders', '2016-07-11',
+                     '--end_date', '2016-07-12', '--workers', '1',
+                     stdout=out)
+        output = out.getvalue()
+        clients = Client.active.count()
+        self.assertIn('created {} orders to be delivered on 2016-07-11'.format(
+            clients), output)
+        self.assertIn('created {} orders to be delivered on 2016-07-12'.format(
+            clients), output)
+        self.assertIn('{} orders created for 2 date(s)'.format(2 * clients),
+                      output)
+        with self.assertRaises(CommandError):
+            call_command('generateorders', '2016-07-11',
+                         '--end_date', '2016-07-10', stdout=out)
+
+
+class RefreshOrdersTestCase(TestCase):
+
+    fixtures = ['routes.json']
+
+    @classmethod
+    def setUpTestData(cls):
+        clients = ClientFactory.create_batch(4, status=Client.ACTIVE)
+        for client in clients:
+            for day in range(7):
+                client.set_meal_defaults('main_dish', day, 1, 'R')
+            client.save()
+
+    def setUp(self):
+        self.delivery_date = date(2016, 7, 15)
+        self.client_a = Client.active.first()
+        # the clients changed well before the refreshes of the tests
+        Client.objects.update(
+            meals_changed_at=timezone.now() - timedelta(days=2))
+
+    def refresh(self, replace=False):
+        return refresh_orders(date(2016, 7, 8), self.delivery_date, replace)
+
+    def test_only_changed_clients(self):
+        """After the first refresh, only the clients whose meals changed
+        are considered."""
+        self.assertEqual(self.refresh(), (0, Client.active.count()))
+        Order.objects.filter(delivery_date=self.delivery_date).delete()
+        # nobody changed
+        self.assertEqual(self.refresh(), (0, 0))
+
+        self.client_a.set_meal_defaults('dessert', 4, 5)
+        self.client_a.save()
+        self.assertEqual(self.refresh(), (0, 1))
+        self.assertEqual(self.refresh(), (0, 0))
+
+    def test_replace(self):
+        """The orders of the changed clients that are not delivered are
+        created again on their new meal defaults."""
+        self.refresh()
+        self.client_a.set_meal_defaults('main_dish', 4, 2, 'L')
+        self.client_a.save()
+        self.assertEqual(self.refresh(replace=True), (1, 1))
+        order = Order.objects.get(client=self.client_a,
+                                  delivery_date=self.delivery_date)
+        self.assertEqual(order.orders.get(
+            component_group='main_dish').total_quantity, 2)
+
+        # a stopped client has no order anymore
+        self.client_a.status = Client.STOPCONTACT
+        self.client_a.save()
+        self.assertEqual(self.refresh(replace=True), (1, 0))
+
+        # delivered orders are kept
+        client = Client.active.exclude(id=self.client_a.id).first()
+        Order.objects.filter(client=client).update(status='D')
+        client.set_meal_defaults('main_dish', 4, 2, 'L')
+        client.save()
+        self.assertEqual(self.refresh(replace=True), (0, 0))
+
+    def test_replace_generated(self):
+        """The orders generated for a date are replaced when the meals
+        of their clients change afterwards."""
+        generate_orders(date(2016, 7, 8), [self.delivery_date], workers=1)
+        self.assertEqual(self.refresh(replace=True), (0, 0))
+        self.client_a.set_meal_defaults('main_dish', 4, 2, 'L')
+        self.client_a.save()
+        self.assertEqual(self.refresh(replace=True), (1, 1))
+
+    def test_replace_first_refresh(self):
+        """On the first refresh of a date, the orders created before the
+        meals of their clients changed are replaced."""
+        Order.create_orders_on_defaults(
+            date.today(), self.delivery_date, Client.active.all())
+        Client.objects.update(
+            meals_changed_at=timezone.now() - timedelta(days=2))
+        self.client_a.set_meal_defaults('main_dish', 4, 2, 'L')
+        self.client_a.save()
+        self.assertEqual(self.refresh(replace=True), (1, 1))
+        order = Order.objects.get(client=self.client_a,
+                                  delivery_date=self.delivery_date)
+        self.assertEqual(order.orders.get(
+            component_group='main_dish').total_quantity, 2)
+
+    def test_change_committed_during_refresh(self):
+        """A change stamped before a refresh started, but committed after
+        it, is considered by the next refresh."""
+        Client.objects.filter(id=self.client_a.id).update(
+            status=Client.PAUSED)
+        self.assertEqual(self.refresh(), (0, Client.active.count()))
+        refreshed_at = OrderRefresh.objects.get(
+            delivery_date=self.delivery_date).refreshed_at
+        Client.objects.filter(id=self.client_a.id).update(
+            status=Client.ACTIVE,
+            meals_changed_at=refreshed_at - timedelta(seconds=1))
+        self.assertEqual(self.refresh(), (0, 1))
+        self.assertEqual(self.refresh(), (0, 0))
+
+    def test_queries(self):
+        """A refresh without changes takes a fixed number of queries."""
+        self.refresh()
+        with self.assertNumQueries(7):
+            self.refresh()
+
 
 class OrderFormTestCase(TestCase):
 
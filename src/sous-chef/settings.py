@@ -114,6 +114,21 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/1.10/topics/cache/
+# Shared on disk by all the workers of the web container.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/1.9/ref/settings/#auth-password-validators
 
@@ -180,3 +195,28 @@ STATICFILES_DIRS = (
     BASE_DIR + '/sous-chef/static/',
 )
 STATIC_URL = '/static/'
+
+
+# Delivery routes
+# CSV edge list of the local road network used to sequence the routes
+# (see delivery.roads.RoadGraph.from_csv), None for great-circle
+# distances. Durations between addresses are kept in
+# DELIVERY_DURATION_CACHE.
+DELIVERY_ROAD_NETWORK = None
+
+DELIVERY_DURATION_CACHE = os.path.join(BASE_DIR, 'cache', 'durations.db')
+
+# Meal labels
+# Directory of the label files of each delivery date (see
+# delivery.meal_labels)
+MEAL_LABELS_DIR = os.path.join(BASE_DIR, 'labels')
+
+# URL prefix of the internal nginx location serving MEAL_LABELS_DIR
+#   (see tools/nginx/nginx.conf), e.g. '/protected-labels/'. When set,
+#   label downloads are sent by nginx instead of the application.
+MEAL_LABELS_ACCEL_REDIRECT = None
+
+# Jobs
+# Run the jobs queued by the pages (see delivery.jobs) at once in the
+#   request, instead of leaving them to the runjobs command
+DELIVERY_JOBS_EAGER = False
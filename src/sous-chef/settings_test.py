@@ -1,3 +1,6 @@
+import os
+import tempfile
+
 from .settings import *
 
 
@@ -12,3 +15,13 @@ DATABASES = {
         'NAME': ':memory:',
     }
 }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+MEAL_LABELS_DIR = os.path.join(tempfile.gettempdir(), 'sous-chef-test-labels')
+
+DELIVERY_JOBS_EAGER = True
@@ -285,6 +285,47 @@ $(function() {
         window.location.replace($url+value);
     });
 
+    // Rank the main dishes by the number of clients they clash with
+    var $dish = $('.field.dish.selection');
+    var showClashes = function (candidates) {
+        var $menu = $dish.find('.menu');
+        $.each(candidates, function (i, candidate) {
+            var $item = $menu.find('.item[data-value="' + candidate.id + '"]');
+            $item.find('.description').remove();
+            if (candidate.clients) {
+                $item.prepend($('<span class="description"></span>').text(
+                    candidate.clients + ' clients, ' + candidate.meals + ' meals'));
+            }
+        });
+    };
+    if ($dish.data('clashes-url')) {
+        $.getJSON($dish.data('clashes-url'), function (data) {
+            var $menu = $dish.find('.menu');
+            showClashes(data.candidates);
+            $.each(data.candidates, function (i, candidate) {
+                $menu.append($menu.find('.item[data-value="' + candidate.id + '"]'));
+            });
+        });
+        // Count again the clashes of the chosen dish with its ingredients
+        $('.field.ingredients.selection select').change(function () {
+            $.ajax({
+                type: 'POST',
+                url: $dish.data('clashes-url'),
+                contentType: 'application/json',
+                data: JSON.stringify({
+                    candidates: [{
+                        component: $dish.find('select').val(),
+                        ingredients: $(this).val() || []
+                    }]
+                }),
+                dataType: 'json',
+                success: function (data) {
+                    showClashes(data.candidates);
+                }
+            });
+        });
+    }
+
 });
 
 $(function() {